@@ -0,0 +1,200 @@
+"""Offline stand-ins for the LLM providers, Serper and scraped pages.
+
+Used by the benchmarks so the orchestration in ``main.py`` can be measured
+without network access. Everything is seeded, so two runs with the same
+profile make the same calls with the same latency draws.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+import types
+import typing
+
+import httpx
+from pydantic import BaseModel
+
+from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+from crewai.llms.base_llm import BaseLLM, LLMCallType, get_current_call_id, llm_call_context
+from crewai_tools import SerperDevTool
+
+CHARS_PER_TOKEN = 4
+WORDS = (
+    "old town harbour market museum garden temple river walk food tour view "
+    "square gallery castle beach street night local quiet early late morning"
+).split()
+
+
+# ---------- LATENCY / SIZE PROFILE ----------
+class Profile:
+    """Lognormal latency around ``latency_ms`` and output size around ``tokens``.
+
+    ``per_model`` overrides either value for one model, e.g.
+    ``{"ollama/llama3": {"latency_ms": 900}}``.
+    """
+
+    def __init__(self, latency_ms: float = 300, sigma: float = 0.25, tokens: int = 250,
+                 tool_calls: int = 0, per_model: dict | None = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.tokens = tokens
+        self.tool_calls = tool_calls
+        self.per_model = per_model or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self, model: str) -> tuple[float, int]:
+        settings = self.per_model.get(model, {})
+        median = settings.get("latency_ms", self.latency_ms) / 1000
+        tokens = settings.get("tokens", self.tokens)
+        with self._lock:
+            seconds = median * math.exp(self._rng.gauss(0, self.sigma))
+            size = max(1, int(tokens * math.exp(self._rng.gauss(0, self.sigma))))
+        return seconds, size
+
+
+# ---------- STRUCTURED OUTPUT ----------
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def sample_payload(model: type[BaseModel], rng: random.Random, words: int, days: int | None = None) -> dict:
+    """A valid instance of ``model`` padded to roughly ``words`` words of text."""
+    fields = model.model_fields
+    text_fields = sum(1 for f in fields.values() if f.annotation in (str, str | None)) or 1
+    payload = {}
+    for name, info in fields.items():
+        payload[name] = _sample_value(info.annotation, rng, max(2, words // text_fields), name, days)
+    return payload
+
+
+def _sample_value(annotation, rng, words, name, days):
+    origin = typing.get_origin(annotation)
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if origin in (typing.Union, types.UnionType):
+        return _sample_value(args[0], rng, words, name, days)
+    if origin is list:
+        count = days if name == "days" and days else rng.randint(5, 7)
+        items = [_sample_value(args[0], rng, max(2, words // count), name, days) for _ in range(count)]
+        if name == "days":
+            for number, item in enumerate(items, start=1):
+                item["day"] = number
+        return items
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return sample_payload(annotation, rng, words, days)
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return rng.randint(1, 9)
+    if annotation is float:
+        return float(rng.randint(10, 500))
+    if name == "currency":
+        return "INR"
+    return _words(rng, words)
+
+
+# ---------- FAKE LLM ----------
+class ScriptedLLM(BaseLLM):
+    """Sleeps for a drawn latency and answers in the task's output format.
+
+    Agents with tools first make ``profile.tool_calls`` ReAct tool calls, so
+    the tool wrappers (cache, single flight, page fetcher) are exercised too.
+    Emits the same call events as a real provider, so tracing still works;
+    built with ``stream=True`` it also emits the answer as stream chunks.
+    """
+
+    profile: typing.Any = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            seconds, size = self.profile.draw(self.model)
+            time.sleep(seconds)
+            answer = self._answer(messages, from_task, from_agent, size)
+            if self.stream:
+                for start in range(0, len(answer), 16):
+                    crewai_event_bus.emit(self, event=LLMStreamChunkEvent(
+                        chunk=answer[start:start + 16],
+                        from_task=from_task,
+                        from_agent=from_agent,
+                        call_type=LLMCallType.LLM_CALL,
+                        call_id=get_current_call_id(),
+                    ))
+            prompt_tokens = len(json.dumps(messages, default=str)) // CHARS_PER_TOKEN
+            self._emit_call_completed_event(
+                answer,
+                LLMCallType.LLM_CALL,
+                from_task=from_task,
+                from_agent=from_agent,
+                usage={"prompt_tokens": prompt_tokens, "completion_tokens": len(answer) // CHARS_PER_TOKEN},
+            )
+            return answer
+
+    def _answer(self, messages, task, agent, size: int) -> str:
+        tools = list(getattr(agent, "tools", None) or [])
+        # The system prompt explains "Observation:" too; count only the replies.
+        history = messages[2:] if isinstance(messages, list) else []
+        calls_made = str(history).count("Observation:")
+        if tools and calls_made < self.profile.tool_calls:
+            tool = tools[calls_made % len(tools)]
+            subject = getattr(task, "description", "")[:60].strip() or "travel"
+            arguments = (
+                {"website_url": f"https://pages.bench/{random.Random(subject).randint(0, 999)}"}
+                if "website" in tool.name.lower()
+                else {"search_query": " ".join(subject.split()[:6])}
+            )
+            return f"Thought: I need more detail.\nAction: {tool.name}\nAction Input: {json.dumps(arguments)}"
+
+        rng = random.Random(f"{self.model}|{getattr(task, 'description', '')}")
+        words = max(1, size * CHARS_PER_TOKEN // 6)
+        model = getattr(task, "output_pydantic", None)
+        if model is not None:
+            description = getattr(task, "description", "")
+            match = re.search(r"Days to plan: (\d+)", description) or re.search(r"Trip duration: (\d+)", description)
+            payload = sample_payload(model, rng, words, int(match.group(1)) if match else None)
+            return "Final Answer: " + json.dumps(payload)
+        return "Final Answer: " + _words(rng, words)
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return False
+
+    def get_context_window_size(self):
+        return 32000
+
+
+def scripted_llm_class(profile: Profile):
+    # Drop-in for AgentRegistry.llm_class; provider settings are ignored.
+    return lambda **config: ScriptedLLM(model=config["model"], profile=profile, stream=config.get("stream", False))
+
+
+# ---------- FAKE SEARCH / PAGES ----------
+def install_fake_web(search_ms: float = 150, page_ms: float = 200, page_words: int = 600):
+    """Route Serper and page fetches to local fakes with fixed latency."""
+    from tools.scrape_tools import page_fetcher
+
+    def fake_search(tool, search_query, search_type):
+        time.sleep(search_ms / 1000)
+        rng = random.Random(search_query)
+        return {
+            "organic": [
+                {"title": _words(rng, 4), "link": f"https://pages.bench/{rng.randint(0, 999)}",
+                 "snippet": _words(rng, 25), "position": i + 1}
+                for i in range(5)
+            ]
+        }
+
+    def fake_page(request: httpx.Request) -> httpx.Response:
+        time.sleep(page_ms / 1000)
+        rng = random.Random(str(request.url))
+        body = "".join(f"<p>{_words(rng, 30)}</p>" for _ in range(max(1, page_words // 30)))
+        return httpx.Response(200, html=f"<html><body>{body}</body></html>", headers={"etag": '"bench"'})
+
+    SerperDevTool._make_api_request = fake_search
+    page_fetcher.client = httpx.Client(transport=httpx.MockTransport(fake_page))
+    page_fetcher.allow_private = True
@@ -0,0 +1,195 @@
+"""Load test of the FastAPI app, in process, against the fake LLM backend.
+
+Closed-loop virtual users POST a realistic TripRequest mix to
+/api/plan-trip through an ASGI transport (no sockets, no uvicorn), one
+concurrency level at a time. Run from the backend directory:
+
+    python -m bench.load --levels 1,2,4,8,16,32
+    python -m bench.load --levels 4,16,64 --no-reuse --json
+
+Each level reports throughput, p50/p95/p99, error rate, how busy the
+threadpool that runs the sync endpoints was, and process CPU. The knee is
+the level with the best throughput per second of median latency: past it,
+more concurrency mostly adds queueing.
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import threading
+import time
+
+import anyio
+import httpx
+
+from crewai.events.event_bus import crewai_event_bus
+
+try:
+    from backend.bench.orchestration import add_profile_arguments, app, percentile, quiet, setup
+except ImportError:
+    from bench.orchestration import add_profile_arguments, app, percentile, quiet, setup
+
+# Rough popularity order; requests follow a Zipf distribution over it.
+DESTINATIONS = (
+    "Paris", "Tokyo", "Bali", "London", "New York", "Dubai", "Rome", "Barcelona",
+    "Bangkok", "Singapore", "Goa", "Istanbul", "Amsterdam", "Prague", "Kyoto",
+    "Lisbon", "Cape Town", "Reykjavik", "Hanoi", "Queenstown",
+)
+ORIGINS = ("Chennai", "Mumbai", "Delhi", "Bangalore", "USA", "London", "Singapore")
+BUDGETS = ("Low", "Medium", "High")
+STYLES = ("Relaxed", "Balanced", "Adventure")
+
+
+# ---------- WORKLOAD ----------
+class RequestMix:
+    def __init__(self, seed: int = 0, skew: float = 1.1):
+        self._rng = random.Random(seed)
+        self._weights = [1 / (rank ** skew) for rank in range(1, len(DESTINATIONS) + 1)]
+        self._lock = threading.Lock()
+
+    def next(self) -> dict:
+        with self._lock:
+            return {
+                "destination": self._rng.choices(DESTINATIONS, self._weights)[0],
+                "start_location": self._rng.choice(ORIGINS),
+                "days": self._rng.randint(1, 30),
+                "budget": self._rng.choice(BUDGETS),
+                "style": self._rng.choice(STYLES),
+            }
+
+
+# ---------- UTILIZATION ----------
+class Sampler:
+    """Samples the endpoint threadpool and thread count while a level runs."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.busy = []
+        self.threads = []
+
+    async def run(self):
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            self.busy.append(limiter.borrowed_tokens / limiter.total_tokens)
+            self.threads.append(threading.active_count())
+            await asyncio.sleep(self.interval)
+
+    def summary(self) -> dict:
+        return {
+            "pool_busy_mean": round(sum(self.busy) / len(self.busy), 3) if self.busy else 0.0,
+            "pool_busy_max": round(max(self.busy, default=0.0), 3),
+            "threads_max": max(self.threads, default=0),
+        }
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+# ---------- LOAD ----------
+async def run_level(client: httpx.AsyncClient, mix: RequestMix, concurrency: int, per_user: int) -> dict:
+    latencies, errors, statuses = [], 0, {}
+
+    async def user():
+        nonlocal errors
+        for _ in range(per_user):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/plan-trip", json=mix.next())
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "timeout"
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    sampler = Sampler()
+    sampling = asyncio.create_task(sampler.run())
+    cpu_start, started = cpu_seconds(), time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_start
+    sampling.cancel()
+
+    total = concurrency * per_user
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "error_rate": round(errors / total, 4),
+        "throughput_rps": round(len(latencies) / wall, 3),
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "p99_s": round(percentile(latencies, 0.99), 3),
+        "cpu_pct": round(100 * cpu / wall, 1),
+        **sampler.summary(),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+    }
+
+
+def find_knee(rows: list[dict]) -> dict | None:
+    """Level with the highest throughput / p50 ("power"); ignores erroring levels."""
+    healthy = [r for r in rows if r["p50_s"] > 0 and r["error_rate"] < 0.01]
+    if not healthy:
+        return None
+    return max(healthy, key=lambda r: r["throughput_rps"] / r["p50_s"])
+
+
+def disable_reuse():
+    # Every request does the full work: no LLM cache, knowledge or similar plans.
+    app.llm_cache = app.build_cache(max_entries=0)
+    app.knowledge = app.KnowledgeStore(max_age=0)
+    app.PLAN_SIMILARITY = 2.0
+
+
+async def sweep(args) -> list[dict]:
+    mix = RequestMix(seed=args.seed, skew=args.skew)
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+        rows = []
+        for concurrency in (int(c) for c in args.levels.split(",")):
+            rows.append(await run_level(client, mix, concurrency, args.per_user))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", default="1,2,4,8,16")
+    parser.add_argument("--per-user", type=int, default=3, help="requests each virtual user sends per level")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of destination popularity")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--no-reuse", action="store_true", help="disable caches that would serve repeat destinations")
+    parser.add_argument("--json", action="store_true")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    setup(args)
+    if args.no_reuse:
+        disable_reuse()
+
+    with quiet(args.verbose):
+        app.plan_trip(app.TripRequest(**RequestMix(seed=-1).next()))  # imports and first-use costs
+        rows = asyncio.run(sweep(args))
+        crewai_event_bus.flush()
+    knee = find_knee(rows)
+
+    if args.json:
+        print(json.dumps({"rows": rows, "knee": knee["concurrency"] if knee else None}, indent=2))
+        return
+
+    columns = ("concurrency", "requests", "error_rate", "throughput_rps", "p50_s", "p95_s", "p99_s",
+               "cpu_pct", "pool_busy_mean", "pool_busy_max", "threads_max")
+    print("".join(f"{c:>15}" for c in columns))
+    for row in rows:
+        print("".join(f"{str(row[c]):>15}" for c in columns))
+    if knee:
+        print(f"knee: concurrency {knee['concurrency']} ({knee['throughput_rps']} rps at p50 {knee['p50_s']} s)")
+    else:
+        print("knee: none (every level had errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Orchestration overhead of plan_trip against a scripted fake LLM.
+
+No provider, Serper or website is contacted: LLM calls sleep for a seeded
+lognormal latency and answer in each task's output format, and searches and
+page fetches go to local fakes. Run from the backend directory:
+
+    python -m bench.orchestration --requests 24 --concurrency 1,4,8
+    python -m bench.orchestration --json > baseline.json
+    python -m bench.orchestration --compare baseline.json
+
+With ``--compare`` the exit status is 1 when throughput drops or p95 grows
+by more than ``--tolerance`` at any concurrency level.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from crewai.events.event_bus import crewai_event_bus
+
+for key in ("GROQ_API_KEY", "GEMINI_API_KEY", "SERPER_API_KEY"):
+    os.environ.setdefault(key, "bench")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+try:
+    import backend.main as app
+    from backend.core.ratelimit import PROVIDER_LIMITS, ProviderLimiter
+    from backend.bench.fakes import Profile, install_fake_web, scripted_llm_class
+except ImportError:
+    import main as app
+    from core.ratelimit import PROVIDER_LIMITS, ProviderLimiter
+    from bench.fakes import Profile, install_fake_web, scripted_llm_class
+
+SYLLABLES = "ka lo mi ra ven tor sa quel bri dan os ul fen gar ith mor pel zan".split()
+BUDGETS = ("Low", "Medium", "High")
+STYLES = ("Relaxed", "Balanced", "Adventure")
+
+
+# ---------- WORKLOAD ----------
+def place_name(rng: random.Random) -> str:
+    # Made-up names, far apart for the semantic index, so plans are not reused.
+    return "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+
+
+def make_requests(count: int, seed: int = 0, repeat_ratio: float = 0.0, days: int = 3) -> list:
+    """``count`` trip requests; ``repeat_ratio`` of them repeat an earlier one."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        if requests and rng.random() < repeat_ratio:
+            requests.append(rng.choice(requests))
+            continue
+        requests.append(app.TripRequest(
+            destination=place_name(rng),
+            start_location=place_name(rng),
+            days=days,
+            budget=rng.choice(BUDGETS),
+            style=rng.choice(STYLES),
+        ))
+    return requests
+
+
+# ---------- MEASUREMENT ----------
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_level(requests: list, concurrency: int, trace_memory: bool = False) -> dict:
+    latencies, errors = [], 0
+
+    def one(request):
+        start = time.perf_counter()
+        app.plan_trip(request)
+        return time.perf_counter() - start
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one, r) for r in requests]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    wall = time.perf_counter() - started
+    heap_peak = None
+    if trace_memory:
+        heap_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "p99_s": round(percentile(latencies, 0.99), 3),
+        "heap_peak_mb": heap_peak,
+        "rss_peak_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def regressions(current: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    found = []
+    before = {row["concurrency"]: row for row in baseline}
+    for row in current:
+        old = before.get(row["concurrency"])
+        if old is None:
+            continue
+        if row["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            found.append(f"c={row['concurrency']}: throughput {old['throughput_rps']} -> {row['throughput_rps']} rps")
+        if row["p95_s"] > old["p95_s"] * (1 + tolerance):
+            found.append(f"c={row['concurrency']}: p95 {old['p95_s']} -> {row['p95_s']} s")
+    return found
+
+
+def setup(args) -> Profile:
+    profile = Profile(
+        latency_ms=args.latency_ms,
+        sigma=args.sigma,
+        tokens=args.tokens,
+        tool_calls=args.tool_calls,
+        seed=args.seed,
+    )
+    app.registry.llm_class = scripted_llm_class(profile)
+    app.registry.reset()
+    app.EXECUTION_MODE = args.mode
+    if not args.provider_limits:
+        # Measure orchestration, not the configured provider quotas.
+        app.limiter = ProviderLimiter({name: {"rate": 1e6, "burst": 10**6} for name in PROVIDER_LIMITS})
+    install_fake_web(search_ms=args.search_ms, page_ms=args.page_ms)
+    return profile
+
+
+def quiet(verbose: bool):
+    # crewai prints a panel per task and tool call; keep the report readable.
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=300, help="median fake LLM latency")
+    parser.add_argument("--sigma", type=float, default=0.25, help="lognormal spread of latency and size")
+    parser.add_argument("--tokens", type=int, default=250, help="median output tokens per call")
+    parser.add_argument("--tool-calls", type=int, default=1, help="tool calls per agent that has tools")
+    parser.add_argument("--search-ms", type=float, default=150)
+    parser.add_argument("--page-ms", type=float, default=200)
+    parser.add_argument("--mode", choices=("parallel", "sequential"), default=app.EXECUTION_MODE)
+    parser.add_argument("--provider-limits", action="store_true", help="keep the real per-provider rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep crewai's console output")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=24, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="share of requests repeating an earlier one")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python heap peak (slower)")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    setup(args)
+    rows = []
+    with quiet(args.verbose):
+        app.plan_trip(make_requests(1, seed=-1)[0])  # imports and first-use costs
+        for level, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+            # Fresh destinations per level so earlier levels do not warm the caches.
+            requests = make_requests(args.requests, seed=args.seed * 1000 + level, repeat_ratio=args.repeat_ratio, days=args.days)
+            rows.append(run_level(requests, concurrency, trace_memory=args.tracemalloc))
+        crewai_event_bus.flush()
+
+    if args.json:
+        print(json.dumps({"mode": args.mode, "latency_ms": args.latency_ms, "rows": rows}, indent=2))
+    else:
+        columns = ("concurrency", "requests", "errors", "throughput_rps", "p50_s", "p95_s", "p99_s", "heap_peak_mb", "rss_peak_mb")
+        print("".join(f"{c:>15}" for c in columns))
+        for row in rows:
+            print("".join(f"{str(row[c]):>15}" for c in columns))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            found = regressions(rows, json.load(f)["rows"], args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Prompt-prefix cache report: hit ratio and time to first token per layout.
+
+Plans the same requests once with the old prompt layout (request fields
+first) and once with the static-first one (see task.prompts), recording
+every prompt sent to the fake LLM. Run from the backend directory:
+
+    python -m bench.prefix --requests 12
+    python -m bench.prefix --requests 4 --live llama
+
+Offline, the prompts go through an idealized provider cache that keeps
+every prompt prefix it has seen per model, in blocks of ``--block`` tokens,
+and time to first token is modelled as ``--ttft-ms`` plus ``--prefill-ms``
+per prompt token that missed the cache. With ``--live MODEL`` the recorded
+prompts are replayed in order against that entry of LLM_CONFIGS (Ollama is
+kept loaded with keep-alive), streaming one token to time the first chunk
+and reading cached prompt tokens from the usage when the provider reports
+them.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import threading
+import time
+
+from crewai.events.event_bus import crewai_event_bus
+from crewai.events.types.llm_events import LLMCallStartedEvent
+
+try:
+    from backend.bench.fakes import CHARS_PER_TOKEN
+    from backend.bench.load import disable_reuse
+    from backend.bench.orchestration import add_profile_arguments, app, make_requests, percentile, quiet, setup
+    from backend.core.registry import LLM_CONFIGS
+    from backend.core.tracing import cached_tokens
+except ImportError:
+    from bench.fakes import CHARS_PER_TOKEN
+    from bench.load import disable_reuse
+    from bench.orchestration import add_profile_arguments, app, make_requests, percentile, quiet, setup
+    from core.registry import LLM_CONFIGS
+    from core.tracing import cached_tokens
+
+LAYOUTS = ("fields-first", "static-first")
+
+
+# ---------- CAPTURE ----------
+class PromptRecorder:
+    """Every LLM call's messages, in the order the calls started."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+        self.active = False
+
+    def install(self):
+        crewai_event_bus.register_handler(LLMCallStartedEvent, self._on_start)
+
+    def _on_start(self, source, event):
+        if not self.active:
+            return
+        with self._lock:
+            self.calls.append({
+                "at": event.timestamp,
+                "model": event.model or "",
+                "agent": getattr(event, "agent_role", None) or "",
+                "messages": event.messages if isinstance(event.messages, list) else [
+                    {"role": "user", "content": str(event.messages)}
+                ],
+            })
+
+    def take(self) -> list[dict]:
+        crewai_event_bus.flush()
+        with self._lock:
+            calls, self.calls = sorted(self.calls, key=lambda c: c["at"]), []
+        return calls
+
+
+def prompt_text(messages: list[dict]) -> str:
+    return "".join(f"<{m.get('role')}>{m.get('content')}" for m in messages)
+
+
+# ---------- OFFLINE CACHE ----------
+class PrefixCache:
+    """Block-hashed prompt prefixes per model, like provider/KV prefix caches.
+
+    A block is reused only if every block before it matched too, so one
+    differing byte early in the prompt misses everything after it.
+    """
+
+    def __init__(self, block_tokens: int = 16, min_tokens: int = 0):
+        self.block_chars = block_tokens * CHARS_PER_TOKEN
+        self.min_tokens = min_tokens
+        self._seen = {}
+
+    def lookup(self, model: str, text: str) -> int:
+        """Cached prompt tokens for ``text``; the prompt is then cached too."""
+        seen = self._seen.setdefault(model, set())
+        digest, hit_chars, matching = b"", 0, True
+        for start in range(0, len(text) - self.block_chars + 1, self.block_chars):
+            digest = hashlib.blake2b(digest + text[start:start + self.block_chars].encode(), digest_size=16).digest()
+            if matching and digest in seen:
+                hit_chars += self.block_chars
+            else:
+                matching = False
+                seen.add(digest)
+        hit = hit_chars // CHARS_PER_TOKEN
+        return hit if hit >= self.min_tokens else 0
+
+
+def simulate(calls: list[dict], args) -> dict:
+    cache = PrefixCache(args.block, args.min_tokens)
+    prompt = cached = 0
+    ttfts = []
+    for call in calls:
+        text = prompt_text(call["messages"])
+        tokens = len(text) // CHARS_PER_TOKEN
+        hit = cache.lookup(call["model"], text)
+        prompt += tokens
+        cached += hit
+        ttfts.append((args.ttft_ms + (tokens - hit) * args.prefill_ms) / 1000)
+    return summarize(len(calls), prompt, cached, ttfts)
+
+
+# ---------- LIVE ----------
+def replay(calls: list[dict], model: str) -> dict:
+    import litellm
+
+    config = dict(LLM_CONFIGS[model])
+    config.pop("provider", None)
+    config["max_tokens"] = 1
+    prompt = cached = 0
+    ttfts = []
+    for call in calls:
+        started = time.perf_counter()
+        first = None
+        usage = {}
+        for chunk in litellm.completion(messages=call["messages"], stream=True,
+                                        stream_options={"include_usage": True}, **config):
+            if first is None:
+                first = time.perf_counter() - started
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage.model_dump() if hasattr(chunk.usage, "model_dump") else dict(chunk.usage)
+        ttfts.append(first or time.perf_counter() - started)
+        prompt += usage.get("prompt_tokens", 0)
+        cached += cached_tokens(usage)
+    return summarize(len(calls), prompt, cached, ttfts)
+
+
+def summarize(calls: int, prompt: int, cached: int, ttfts: list[float]) -> dict:
+    return {
+        "calls": calls,
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "hit_ratio": round(cached / prompt, 3) if prompt else 0.0,
+        "ttft_p50_s": round(percentile(ttfts, 0.50), 3),
+        "ttft_p95_s": round(percentile(ttfts, 0.95), 3),
+    }
+
+
+# ---------- RUN ----------
+def record(layout: str, requests: list, recorder: PromptRecorder, verbose: bool) -> list[dict]:
+    # Task modules read the layout when they build their description.
+    importlib.import_module("task.prompts").PROMPT_LAYOUT = layout
+    recorder.active = True
+    with quiet(verbose):
+        for request in requests:
+            app.plan_trip(request)
+    recorder.active = False
+    return recorder.take()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--block", type=int, default=16, help="cache block size in tokens")
+    parser.add_argument("--min-tokens", type=int, default=0, help="shortest prefix the provider caches")
+    parser.add_argument("--ttft-ms", type=float, default=80, help="modelled time to first token with a full hit")
+    parser.add_argument("--prefill-ms", type=float, default=0.5, help="modelled cost per uncached prompt token")
+    parser.add_argument("--live", metavar="MODEL", choices=sorted(LLM_CONFIGS), help="replay against this model")
+    parser.add_argument("--json", action="store_true")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    setup(args)
+    disable_reuse()
+    recorder = PromptRecorder()
+    recorder.install()
+    requests = make_requests(args.requests, seed=args.seed)
+
+    report = {}
+    for layout in LAYOUTS:
+        calls = record(layout, requests, recorder, args.verbose)
+        report[layout] = replay(calls, args.live) if args.live else simulate(calls, args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    columns = ("calls", "prompt_tokens", "cached_tokens", "hit_ratio", "ttft_p50_s", "ttft_p95_s")
+    print(f"{'layout':<15}" + "".join(f"{c:>15}" for c in columns))
+    for layout, row in report.items():
+        print(f"{layout:<15}" + "".join(f"{str(row[c]):>15}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-request setup cost: fresh LLM clients + agents vs the shared registry.
+
+Run from the backend directory:
+
+    python -m bench.setup_cost --iterations 200
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Client construction only; no provider is called.
+for key in ("GROQ_API_KEY", "GEMINI_API_KEY", "SERPER_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+try:
+    from backend.main import AGENT_FACTORIES, AGENT_MODELS
+    from backend.core.registry import AgentRegistry
+except ImportError:
+    from main import AGENT_FACTORIES, AGENT_MODELS
+    from core.registry import AgentRegistry
+
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def per_request():
+    # What plan_trip used to do: three new clients and six agents every call.
+    AgentRegistry(AGENT_FACTORIES, AGENT_MODELS).agents()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    shared = AgentRegistry(AGENT_FACTORIES, AGENT_MODELS)
+    shared.warm_up()
+    per_request()  # pay import/first-use costs outside the measurement
+
+    before = measure(per_request, args.iterations)
+    after = measure(shared.agents, args.iterations)
+
+    print(f"{'':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, row in (("per-request", before), ("registry", after)):
+        print(f"{label:<12}{row['mean_ms']:>10.3f}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}")
+    print(f"speedup: {before['mean_ms'] / after['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
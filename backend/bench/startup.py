@@ -0,0 +1,134 @@
+"""Cold-start report: what importing the app costs, and how soon it serves.
+
+Every measurement runs in a fresh interpreter, as a new container would.
+Run from the backend directory:
+
+    python -m bench.startup
+    python -m bench.startup --module main --top 15 --no-serve
+
+The import breakdown comes from ``python -X importtime``: self time is
+summed per top-level package (so the rows add up to the total) and the
+slowest individual imports are listed by cumulative time. Unless
+``--no-serve`` is given, uvicorn is also started on a free port and the
+report gives the time until /api/health answers and until /api/ready does,
+i.e. until agents, tools and crewai are loaded.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+# ---------- IMPORT TIME ----------
+def import_profile(module: str) -> list[tuple[str, int, int, int]]:
+    """(name, self_us, cumulative_us, depth) for every module imported by ``module``."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return rows
+
+
+def by_package(rows) -> list[tuple[str, float]]:
+    totals = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(((p, us / 1e6) for p, us in totals.items()), key=lambda row: -row[1])
+
+
+def slowest(rows, top: int) -> list[tuple[str, float]]:
+    return [(name, cumulative / 1e6) for name, _, cumulative, _ in sorted(rows, key=lambda r: -r[2])[:top]]
+
+
+# ---------- SERVING ----------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_times(module: str, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    times = {"health_s": None, "ready_s": None, "preload_s": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - started < timeout and times["ready_s"] is None:
+                try:
+                    if times["health_s"] is None and client.get("/api/health").status_code == 200:
+                        times["health_s"] = round(time.perf_counter() - started, 3)
+                    response = client.get("/api/ready")
+                    if response.status_code == 200:
+                        times["ready_s"] = round(time.perf_counter() - started, 3)
+                        times["preload_s"] = response.json().get("preload_seconds")
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main", help="module to import / serve (module:app)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-serve", action="store_true", help="only profile the import")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = import_profile(args.module)
+    total = next((cumulative for name, _, cumulative, depth in rows if name == args.module and depth == 0), 0) / 1e6
+    report = {
+        "module": args.module,
+        "import_s": round(total, 3),
+        "modules": len(rows),
+        "by_package": [(p, round(s, 3)) for p, s in by_package(rows)[: args.top]],
+        "slowest": [(n, round(s, 3)) for n, s in slowest(rows, args.top)],
+    }
+    if not args.no_serve:
+        report.update(serve_times(args.module, args.timeout))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {args.module}: {report['import_s']} s, {report['modules']} modules")
+    print(f"\n{'package (self time)':<40}{'s':>8}")
+    for package, seconds in report["by_package"]:
+        print(f"{package:<40}{seconds:>8.3f}")
+    print(f"\n{'import (cumulative)':<40}{'s':>8}")
+    for name, seconds in report["slowest"]:
+        print(f"{name:<40}{seconds:>8.3f}")
+    if not args.no_serve:
+        print(f"\nhealth after {report['health_s']} s, ready after {report['ready_s']} s"
+              f" (preload {report['preload_s']} s)")
+
+
+if __name__ == "__main__":
+    main()
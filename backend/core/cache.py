@@ -0,0 +1,295 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .dag import NodeResult, execute_task
+
+# ---------- TTL CONFIG (seconds) ----------
+# Destination-only tasks change slowly; anything built on upstream output is
+# keyed on that output too, so a short TTL is enough there.
+DEFAULT_TTLS = {
+    "destination": 24 * 3600,
+    "attractions": 7 * 24 * 3600,
+    "tips": 7 * 24 * 3600,
+    "budget": 24 * 3600,
+    "itinerary": 3600,
+    "summary": 3600,
+}
+
+
+def parse_ttls(text: str | None, defaults=None) -> dict:
+    """``"itinerary=7200,summary=0"`` over ``defaults``; 0 turns caching off for a task."""
+    ttls = dict(DEFAULT_TTLS if defaults is None else defaults)
+    for part in (text or "").split(","):
+        name, sep, seconds = part.partition("=")
+        if not part.strip():
+            continue
+        if not sep:
+            raise ValueError(f"Expected task=seconds, got {part!r}")
+        ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+def cache_key(role: str, model: str, description: str, context: str | None = None) -> str:
+    payload = "\x1f".join([role, model, description, context or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------- BACKENDS ----------
+class MemoryCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk LRU so warm entries survive a restart."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_entry(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0]), row[1]
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: dict, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class KVCache:
+    """LLM outputs in a shared key-value store (see ``core.shared``).
+
+    Every worker process reads and writes the same entries, so a task
+    answered by one worker is a hit for all of them. Expiry is left to the
+    store (Redis evicts expired keys; the SQLite and in-memory stores purge
+    them as they are written to), so size is bounded by the TTLs rather
+    than an LRU.
+    """
+
+    def __init__(self, kv, prefix: str = "llm:"):
+        self.kv = kv
+        self.prefix = prefix
+
+    def get_entry(self, key: str):
+        stored = self.kv.get(self.prefix + key)
+        if stored is None:
+            return None
+        entry = json.loads(stored)
+        return entry["value"], entry["expires_at"]
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: dict, ttl: float):
+        entry = {"value": value, "expires_at": time.time() + ttl}
+        self.kv.set(self.prefix + key, json.dumps(entry), ex=max(1, int(ttl)))
+
+    def clear(self):
+        keys = list(self.kv.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.kv.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.kv.scan_iter(match=self.prefix + "*"))
+
+
+class TieredCache:
+    """Memory LRU in front of a slower persistent backend."""
+
+    def __init__(self, front: MemoryCache, back):
+        self.front = front
+        self.back = back
+
+    def get(self, key: str):
+        value = self.front.get(key)
+        if value is None:
+            entry = self.back.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.front.set(key, value, expires_at - time.time())
+        return value
+
+    def set(self, key: str, value: dict, ttl: float):
+        self.front.set(key, value, ttl)
+        self.back.set(key, value, ttl)
+
+    def clear(self):
+        self.front.clear()
+        self.back.clear()
+
+    def __len__(self):
+        return len(self.back)
+
+
+# ---------- LLM OUTPUT CACHE ----------
+class LLMCache:
+    """Task outputs keyed on the agent, prompt, context and the model that wrote them.
+
+    Outputs are stored under the model that actually served the call (the
+    router reports it as ``extra["model_id"]``), not the agent's preferred
+    one. ``models(node)`` lists other models whose outputs may answer a
+    node, e.g. the router's fallbacks; the agent's own model is always
+    tried first.
+    """
+
+    def __init__(self, backend=None, ttls=None, models=None):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.models = models
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, field: str):
+        with self._lock:
+            counts = self._stats.setdefault(name, {"hits": 0, "misses": 0})
+            counts[field] += 1
+
+    @staticmethod
+    def model_of(node) -> str:
+        llm = getattr(node.task.agent, "llm", None)
+        return getattr(llm, "model", None) or str(llm)
+
+    def key_for(self, node, context: str | None, model: str | None = None) -> str:
+        return cache_key(node.task.agent.role, model or self.model_of(node), node.task.description, context)
+
+    def _lookup(self, node, context):
+        models = [self.model_of(node), *(self.models(node) if self.models else ())]
+        for model in dict.fromkeys(models):
+            hit = self.backend.get(self.key_for(node, context, model))
+            if hit is not None:
+                return hit
+        return None
+
+    def wrap(self, execute=execute_task):
+        # Returns a drop-in replacement for the DAG's execute function.
+        def cached_execute(node, context):
+            ttl = self.ttls.get(node.name)
+            if not ttl:
+                return execute(node, context)
+
+            hit = self._lookup(node, context)
+            if hit is not None:
+                self._count(node.name, "hits")
+                return NodeResult(
+                    name=node.name,
+                    agent=hit["agent"],
+                    content=hit["content"],
+                    data=hit.get("data"),
+                    extra={"cache": "hit"},
+                )
+
+            self._count(node.name, "misses")
+            result = execute(node, context)
+            if result.content:
+                key = self.key_for(node, context, result.extra.get("model_id"))
+                self.backend.set(key, {"agent": result.agent, "content": result.content, "data": result.data}, ttl)
+            result.extra["cache"] = "miss"
+            return result
+
+        return cached_execute
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_task = {name: dict(counts) for name, counts in self._stats.items()}
+        hits = sum(c["hits"] for c in per_task.values())
+        misses = sum(c["misses"] for c in per_task.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entries": len(self.backend),
+            "by_task": per_task,
+        }
+
+
+def build_cache(
+    path: str | None = None,
+    max_entries: int = 1024,
+    ttls=None,
+    shared=None,
+    models=None,
+    disk_entries: int = 10000,
+) -> LLMCache:
+    front = MemoryCache(max_entries=max_entries)
+    if shared is not None:
+        backend = TieredCache(front, KVCache(shared))
+    else:
+        backend = TieredCache(front, SQLiteCache(path, max_entries=disk_entries)) if path else front
+    return LLMCache(backend, ttls=ttls, models=models)
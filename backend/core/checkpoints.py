@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .dag import NodeResult
+
+RUNNING, DONE, FAILED, CANCELLED = "running", "done", "failed", "cancelled"
+
+# Runs untouched for this long are deleted, whatever their status.
+MAX_AGE = 7 * 24 * 3600
+
+
+class RunFailed(Exception):
+    """A checkpointed run failed; ``run_id`` can be passed to resume."""
+
+    def __init__(self, run_id: str, message: str):
+        super().__init__(message)
+        self.run_id = run_id
+
+
+def _restore(name: str, saved: dict) -> NodeResult:
+    return NodeResult(
+        name=name,
+        agent=saved["agent"],
+        content=saved["content"],
+        data=saved.get("data"),
+        extra={**saved.get("extra", {}), "cache": "checkpoint"},
+    )
+
+
+def _snapshot(result: NodeResult) -> dict:
+    extra = {k: v for k, v in result.extra.items() if k != "cache"}
+    return {"agent": result.agent, "content": result.content, "data": result.data, "extra": extra}
+
+
+# ---------- MEMORY ----------
+class MemoryCheckpointStore:
+    def __init__(self, max_runs: int = 1000, max_age: float = MAX_AGE):
+        self.max_runs = max_runs
+        self.max_age = max_age
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, run_id: str, request: dict):
+        with self._lock:
+            self._runs[run_id] = {
+                "run_id": run_id,
+                "request": request,
+                "status": RUNNING,
+                "error": None,
+                "outputs": {},
+                "updated_at": time.time(),
+            }
+            self._runs.move_to_end(run_id)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+            cutoff = time.time() - self.max_age
+            for old in [key for key, run in self._runs.items() if run["updated_at"] < cutoff]:
+                del self._runs[old]
+
+    def save_output(self, run_id: str, result: NodeResult):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                run["outputs"][result.name] = _snapshot(result)
+                run["updated_at"] = time.time()
+
+    def finish(self, run_id: str, status: str, error: str | None = None):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                run["status"] = status
+                run["error"] = error
+                run["updated_at"] = time.time()
+
+    def load(self, run_id: str) -> dict | None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return None
+            return {
+                **run,
+                "outputs": {name: _restore(name, saved) for name, saved in run["outputs"].items()},
+            }
+
+
+# ---------- SQLITE ----------
+class SQLiteCheckpointStore:
+    def __init__(self, path: str, max_age: float = MAX_AGE, prune_interval: float = 3600):
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY, request TEXT NOT NULL, status TEXT NOT NULL,"
+            " error TEXT, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS runs_updated_at ON runs (updated_at);"
+            "CREATE TABLE IF NOT EXISTS run_outputs ("
+            " run_id TEXT NOT NULL, name TEXT NOT NULL, output TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, name));"
+        )
+        self._conn.commit()
+
+    def create(self, run_id: str, request: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, request, status, error, updated_at) VALUES (?, ?, ?, NULL, ?)",
+                (run_id, json.dumps(request), RUNNING, time.time()),
+            )
+            self._conn.execute("DELETE FROM run_outputs WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+
+    def prune(self) -> int:
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            self._pruned_at = time.monotonic()
+            self._conn.execute(
+                "DELETE FROM run_outputs WHERE run_id IN (SELECT run_id FROM runs WHERE updated_at < ?)", (cutoff,)
+            )
+            deleted = self._conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def save_output(self, run_id: str, result: NodeResult):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_outputs (run_id, name, output) VALUES (?, ?, ?)",
+                (run_id, result.name, json.dumps(_snapshot(result))),
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (time.time(), run_id))
+            self._conn.commit()
+
+    def finish(self, run_id: str, status: str, error: str | None = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                (status, error, time.time(), run_id),
+            )
+            self._conn.commit()
+
+    def load(self, run_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT request, status, error, updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            outputs = self._conn.execute(
+                "SELECT name, output FROM run_outputs WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {
+            "run_id": run_id,
+            "request": json.loads(row[0]),
+            "status": row[1],
+            "error": row[2],
+            "updated_at": row[3],
+            "outputs": {name: _restore(name, json.loads(output)) for name, output in outputs},
+        }
+
+
+# ---------- SHARED ----------
+class SharedCheckpointStore:
+    """Runs in the shared key-value store, so any worker can load or resume them.
+
+    Each run is one key; every write renews its expiry. A run's outputs are
+    saved one after another by the worker running it, so read-modify-write
+    is safe here.
+    """
+
+    def __init__(self, kv, max_age: float = MAX_AGE, prefix: str = "run:"):
+        self.kv = kv
+        self.max_age = max_age
+        self.prefix = prefix
+
+    def _get(self, run_id: str) -> dict | None:
+        stored = self.kv.get(self.prefix + run_id)
+        return json.loads(stored) if stored else None
+
+    def _put(self, run_id: str, run: dict):
+        run["updated_at"] = time.time()
+        self.kv.set(self.prefix + run_id, json.dumps(run), ex=max(1, int(self.max_age)))
+
+    def create(self, run_id: str, request: dict):
+        self._put(run_id, {"run_id": run_id, "request": request, "status": RUNNING, "error": None, "outputs": {}})
+
+    def save_output(self, run_id: str, result: NodeResult):
+        run = self._get(run_id)
+        if run is not None:
+            run["outputs"][result.name] = _snapshot(result)
+            self._put(run_id, run)
+
+    def finish(self, run_id: str, status: str, error: str | None = None):
+        run = self._get(run_id)
+        if run is not None:
+            run["status"] = status
+            run["error"] = error
+            self._put(run_id, run)
+
+    def load(self, run_id: str) -> dict | None:
+        run = self._get(run_id)
+        if run is None:
+            return None
+        return {**run, "outputs": {name: _restore(name, saved) for name, saved in run["outputs"].items()}}
+
+
+def build_checkpoints(path: str | None = None, max_age: float = MAX_AGE, shared=None):
+    """A SQLite file when ``path`` is set, else the shared store when there is one, else memory."""
+    if path:
+        return SQLiteCheckpointStore(path, max_age=max_age)
+    if shared is not None:
+        return SharedCheckpointStore(shared, max_age=max_age)
+    return MemoryCheckpointStore(max_age=max_age)
+
+
+def is_stale(run: dict, stale_after: float) -> bool:
+    """A run still marked running that has not saved anything for ``stale_after`` seconds.
+
+    Its process most likely died (a restart, a crash), so it may be resumed.
+    """
+    return run["status"] == RUNNING and time.time() - run["updated_at"] > stale_after
@@ -0,0 +1,149 @@
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Same divider crewai uses when it aggregates upstream task outputs.
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+
+class DagCancelled(Exception):
+    pass
+
+
+# ---------- GRAPH ----------
+@dataclass
+class TaskNode:
+    name: str
+    task: object
+    depends_on: tuple[str, ...] = ()
+    # Rebuilds the task for another agent (used when rerouting to a model).
+    factory: object = None
+    # Runs the task as independent parts instead (see core.itinerary.DayWindows).
+    split: object = None
+
+
+@dataclass
+class NodeResult:
+    name: str
+    agent: str
+    content: str
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    extra: dict = field(default_factory=dict)
+    # Structured output (task output_pydantic), when the task declares one.
+    data: dict | None = None
+
+    @property
+    def seconds(self) -> float:
+        return self.finished_at - self.started_at
+
+
+def topological_order(nodes: list[TaskNode]) -> list[TaskNode]:
+    by_name = {}
+    for node in nodes:
+        if node.name in by_name:
+            raise ValueError(f"Duplicate task name: {node.name}")
+        by_name[node.name] = node
+
+    for node in nodes:
+        for dep in node.depends_on:
+            if dep not in by_name:
+                raise ValueError(f"Task '{node.name}' depends on unknown task '{dep}'")
+
+    ordered, done, visiting = [], set(), set()
+
+    def visit(node):
+        if node.name in done:
+            return
+        if node.name in visiting:
+            raise ValueError(f"Dependency cycle at task '{node.name}'")
+        visiting.add(node.name)
+        for dep in node.depends_on:
+            visit(by_name[dep])
+        visiting.discard(node.name)
+        done.add(node.name)
+        ordered.append(node)
+
+    for node in nodes:
+        visit(node)
+    return ordered
+
+
+def context_entry(result: NodeResult) -> str:
+    # Typed payloads go downstream as compact JSON rather than prose.
+    if result.data is not None:
+        return f"{result.name}: " + json.dumps(result.data, ensure_ascii=False, separators=(",", ":"))
+    return result.content
+
+
+def build_context(node: TaskNode, results: dict[str, NodeResult]) -> str | None:
+    parts = [context_entry(results[dep]) for dep in node.depends_on if results[dep].content]
+    return CONTEXT_DIVIDER.join(parts) or None
+
+
+# ---------- EXECUTION ----------
+def execute_task(node: TaskNode, context: str | None) -> NodeResult:
+    output = node.task.execute_sync(context=context)
+    agent = getattr(output, "agent", None) or getattr(node.task.agent, "role", node.name)
+
+    structured = getattr(output, "pydantic", None)
+    if structured is not None:
+        content = structured.to_markdown() if hasattr(structured, "to_markdown") else output.raw
+        data = structured.model_dump()
+    else:
+        content, data = output.raw, None
+    return NodeResult(name=node.name, agent=str(agent), content=(content or "").strip(), data=data)
+
+
+def _timed(execute, node, context, clock_start):
+    started = time.perf_counter() - clock_start
+    result = execute(node, context)
+    result.started_at = started
+    result.finished_at = time.perf_counter() - clock_start
+    return result
+
+
+def run_dag(nodes, execute=execute_task, max_workers=None, on_complete=None, cancel=None, done=None):
+    """Run every node as soon as its dependencies finished.
+
+    Returns results in the declared node order, with start/finish offsets in
+    seconds relative to the start of the run. ``max_workers=1`` gives a plain
+    sequential run over the same graph. Setting the ``cancel`` event stops
+    new nodes from being scheduled and raises ``DagCancelled``; calls already
+    in flight are left to finish. Results passed in ``done`` (e.g. from a
+    checkpoint) are reused and their nodes are not run again.
+    """
+    topological_order(nodes)
+    clock_start = time.perf_counter()
+
+    results: dict[str, NodeResult] = dict(done or {})
+    pending = {node.name: node for node in nodes if node.name not in results}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(pending) or 1) as pool:
+        try:
+            while pending or running:
+                if cancel is not None and cancel.is_set():
+                    raise DagCancelled("Run cancelled")
+
+                for name, node in list(pending.items()):
+                    if all(dep in results for dep in node.depends_on):
+                        context = build_context(node, results)
+                        future = pool.submit(_timed, execute, node, context, clock_start)
+                        running[future] = name
+                        del pending[name]
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+                    result = future.result()
+                    results[result.name] = result
+                    if on_complete:
+                        on_complete(result)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+    return [results[node.name] for node in nodes]
@@ -0,0 +1,220 @@
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field
+
+import numpy as np
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ---------- EMBEDDERS ----------
+class HashingEmbedder:
+    """Feature-hashed words and character trigrams; no model, no downloads.
+
+    Trigrams make "Tokyo" close to "Tokyo, Japan" while keeping unrelated
+    places apart. Hashes are stable across processes (crc32, not hash()).
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str):
+        for word in WORD.findall(text.casefold()):
+            yield "w:" + word, 1.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return _normalize(np.asarray(self.model.encode(texts), dtype=np.float32))
+
+
+def build_embedder(model_name: str | None = None):
+    # A local sentence-transformers model when configured and installed.
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            pass
+    return HashingEmbedder()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def chunk_text(text: str, max_chars: int = 800) -> list[str]:
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {paragraph}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ---------- INDEX ----------
+@dataclass
+class Match:
+    score: float
+    text: str
+    kind: str
+    meta: dict = field(default_factory=dict)
+
+
+class VectorIndex:
+    """In-memory cosine index: brute force, or IVF once it gets large.
+
+    Up to ``ann_threshold`` items every search is one matrix-vector product.
+    Past that, vectors are clustered with k-means and a search only scores
+    the ``nprobe`` closest clusters. Items added after the last training
+    are always scored exactly; the clusters are retrained when the index
+    has doubled. Beyond ``max_items`` the oldest items are dropped.
+    """
+
+    def __init__(self, embedder=None, max_items: int = 20000, ann_threshold: int = 5000, nprobe: int = 8):
+        self.embedder = embedder or HashingEmbedder()
+        self.max_items = max_items
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._items = []
+        self._keys = {}
+        self._centroids = None
+        self._assignments = None
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def contains(self, kind: str, key: str) -> bool:
+        with self._lock:
+            return (kind, key) in self._keys
+
+    def similarity(self, a: str, b: str) -> float:
+        vectors = self.embedder.embed([a, b])
+        return float(vectors[0] @ vectors[1])
+
+    def add(self, texts: list[str], kind: str, meta: dict | None = None, key: str | None = None):
+        """Index ``texts``; re-adding the same ``key`` replaces its earlier items."""
+        texts = [t for t in texts if t and t.strip()]
+        if not texts:
+            return
+        vectors = self.embedder.embed(texts)
+        with self._lock:
+            if key is not None and (kind, key) in self._keys:
+                self._drop(lambda item: item[2] == (kind, key))
+            items = [(text, kind, (kind, key), dict(meta or {})) for text in texts]
+            self._vectors = np.vstack([self._vectors, vectors])
+            self._items.extend(items)
+            if key is not None:
+                self._keys[(kind, key)] = True
+            if len(self._items) > self.max_items:
+                overflow = len(self._items) - self.max_items
+                self._keep(np.arange(overflow, len(self._items)))
+            if len(self._items) >= self.ann_threshold and len(self._items) >= 2 * self._trained_size:
+                self._train()
+
+    def search(self, query: str, k: int = 5, kinds=None, min_score: float = 0.0) -> list[Match]:
+        vector = self.embedder.embed([query])[0]
+        with self._lock:
+            if not self._items:
+                return []
+            candidates = self._candidates(vector)
+            scores = self._vectors[candidates] @ vector
+            order = np.argsort(-scores)
+            matches = []
+            for i in order:
+                score = float(scores[i])
+                if score < min_score:
+                    break
+                text, kind, _, meta = self._items[candidates[i]]
+                if kinds and kind not in kinds:
+                    continue
+                matches.append(Match(score=score, text=text, kind=kind, meta=dict(meta)))
+                if len(matches) == k:
+                    break
+            return matches
+
+    def stats(self) -> dict:
+        with self._lock:
+            kinds = {}
+            for _, kind, _, _ in self._items:
+                kinds[kind] = kinds.get(kind, 0) + 1
+            return {
+                "items": len(self._items),
+                "by_kind": kinds,
+                "embedder": self.embedder.name,
+                "ann": self._centroids is not None,
+            }
+
+    # -- internals (called with the lock held) --
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        everything = np.arange(len(self._items))
+        if self._centroids is None:
+            return everything
+        nearest = np.argsort(-(self._centroids @ vector))[: self.nprobe]
+        trained = everything[: len(self._assignments)]
+        probed = trained[np.isin(self._assignments, nearest)]
+        return np.concatenate([probed, everything[len(self._assignments):]])
+
+    def _train(self, iterations: int = 10):
+        n = len(self._items)
+        clusters = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self._vectors[rng.choice(n, clusters, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+            for c in range(clusters):
+                members = self._vectors[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self._centroids = centroids
+        self._assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._trained_size = n
+
+    def _keep(self, rows: np.ndarray):
+        self._vectors = self._vectors[rows]
+        self._items = [self._items[i] for i in rows]
+        self._keys = {item[2]: True for item in self._items if item[2][1] is not None}
+        if self._centroids is not None:
+            # Rows stay in order, so the trained rows remain a prefix.
+            self._assignments = self._assignments[rows[rows < len(self._assignments)]]
+
+    def _drop(self, predicate):
+        self._keep(np.array([i for i, item in enumerate(self._items) if not predicate(item)], dtype=int))
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from .dag import CONTEXT_DIVIDER, NodeResult, TaskNode
+from .streaming import follow_task
+
+SLOTS = ("morning", "afternoon", "evening")
+
+# Longer windows bring back the truncation that windows exist to avoid.
+MIN_WINDOW_DAYS, MAX_WINDOW_DAYS = 3, 5
+
+
+class IncompleteItinerary(Exception):
+    """Days were still missing after the retry; the plan is not stitched short."""
+
+    def __init__(self, missing_days: list[int]):
+        super().__init__(f"Itinerary is missing days {missing_days} after a retry")
+        self.missing_days = missing_days
+
+
+# ---------- WINDOWS ----------
+@dataclass
+class DayWindows:
+    """How to plan a long itinerary as windows of ``size`` days.
+
+    ``build(agent, first_day, last_day, attractions, avoid, repeated, retry)``
+    creates the task for one window; ``agent()`` makes a fresh agent, since
+    agents cannot be shared by calls running at the same time.
+    """
+
+    days: int
+    size: int
+    build: object
+    agent: object
+
+
+def day_windows(days: int, size: int) -> list[tuple[int, int]]:
+    # Evenly sized: 10 days in windows of 4 is 4/3/3, not 4/4/2.
+    count = -(-days // max(1, size))
+    base, extra = divmod(days, count)
+    windows, first = [], 1
+    for i in range(count):
+        last = first + base + (1 if i < extra else 0) - 1
+        windows.append((first, last))
+        first = last + 1
+    return windows
+
+
+def attraction_names(context: str | None) -> list[str]:
+    """Attraction names from the itinerary's upstream context."""
+    names = []
+    for entry in (context or "").split(CONTEXT_DIVIDER):
+        if entry.startswith("attractions: "):
+            try:
+                payload = json.loads(entry[len("attractions: "):])
+                names += [a["name"] for a in payload.get("attractions", []) if a.get("name")]
+                continue
+            except (ValueError, TypeError, KeyError):
+                pass
+        for line in entry.splitlines():
+            match = re.match(r"^\s*(?:[•*-]|\d+\.)\s+(.+?)(?:\s+[–—-]\s+.*)?$", line)
+            if match:
+                names.append(match.group(1).strip("* "))
+    seen = set()
+    return [n for n in names if not (n.casefold() in seen or seen.add(n.casefold()))]
+
+
+def assign_attractions(names: list[str], windows: list[tuple[int, int]]) -> list[list[str]]:
+    # Spread evenly over the trip, so each window gets the ones whose day falls in it.
+    days = windows[-1][1]
+    shares = [[] for _ in windows]
+    for i, name in enumerate(names):
+        day = 1 + i * days // len(names)
+        index = next(w for w, (first, last) in enumerate(windows) if first <= day <= last)
+        shares[index].append(name)
+    return shares
+
+
+def find_repeats(day_plans: list[dict], names: list[str]) -> dict[str, list[int]]:
+    """Attractions that show up on more than one day, with those days."""
+    repeats = {}
+    for name in names:
+        needle = name.casefold()
+        days = [d["day"] for d in day_plans if any(needle in str(d.get(s, "")).casefold() for s in SLOTS)]
+        if len(days) > 1:
+            repeats[name] = days
+    return repeats
+
+
+# ---------- EXECUTION ----------
+class ChunkedItinerary:
+    """Runs a long itinerary as concurrent day windows and stitches them.
+
+    Attractions are split between windows up front, so each window plans only
+    its own. After stitching, a window that is missing days or revisits an
+    attraction is rerun once: told to avoid the ones planned elsewhere, and to
+    visit its own repeats only once; days still missing after that raise
+    ``IncompleteItinerary``. Each window goes through the wrapped ``execute``
+    (cache, routing, rate limits) like any other task, so windows past the
+    provider's burst wait for their quota.
+
+    Windows stay between ``MIN_WINDOW_DAYS`` and ``MAX_WINDOW_DAYS`` long,
+    whatever the spec asks for.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+
+    def wrap(self, execute):
+        def chunked(node, context):
+            spec = node.split
+            size = min(max(spec.size, MIN_WINDOW_DAYS), MAX_WINDOW_DAYS) if spec is not None else 0
+            if spec is None or spec.days <= size:
+                return execute(node, context)
+
+            windows = day_windows(spec.days, size)
+            names = attraction_names(context)
+            shares = assign_attractions(names, windows) if names else [[] for _ in windows]
+            avoid = [[] for _ in windows]
+            repeated = [[] for _ in windows]
+
+            def run(index, retry=False):
+                first, last = windows[index]
+                build = lambda agent: spec.build(agent, first, last, shares[index], avoid[index], repeated[index], retry)
+                window = TaskNode(node.name, build(spec.agent()), factory=build)
+                if index == 0 and not retry:
+                    # Streamed tokens show the first days while the rest is
+                    # planned; interleaving all windows would be unreadable.
+                    follow_task(node.task, window.task)
+                return execute(window, None)
+
+            results = self._run_all(run, range(len(windows)))
+            retry = self._needs_retry(results, windows, shares, names, avoid, repeated)
+            if retry:
+                for index, result in zip(retry, self._run_all(lambda i: run(i, retry=True), retry)):
+                    results[index] = result
+            return self._stitch(node, results, windows, names, retried=len(retry))
+
+        return chunked
+
+    def _run_all(self, run, indexes) -> list[NodeResult]:
+        indexes = list(indexes)
+        with ThreadPoolExecutor(max_workers=min(len(indexes), self.max_workers)) as pool:
+            # Copy the context so tracing spans nest under the itinerary task.
+            futures = [pool.submit(contextvars.copy_context().run, run, i) for i in indexes]
+            return [f.result() for f in futures]
+
+    def _needs_retry(self, results, windows, shares, names, avoid, repeated) -> list[int]:
+        retry = set()
+        owner = {name: w for w, share in enumerate(shares) for name in share}
+        for index, (result, (first, last)) in enumerate(zip(results, windows)):
+            if len((result.data or {}).get("days", [])) < last - first + 1:
+                retry.add(index)
+        plans = self._day_plans(results, windows)
+        for name, days in find_repeats(plans, names).items():
+            # Kept by the window it was assigned to (or the first to use it);
+            # only other windows are asked to drop it.
+            keep = owner.get(name, self._window_of(days[0], windows))
+            in_windows = [self._window_of(day, windows) for day in days]
+            for index in set(in_windows) - {keep}:
+                if name not in avoid[index]:
+                    avoid[index].append(name)
+                retry.add(index)
+            if in_windows.count(keep) > 1:
+                # Repeated within the window that keeps it.
+                if name not in repeated[keep]:
+                    repeated[keep].append(name)
+                retry.add(keep)
+        return sorted(retry)
+
+    @staticmethod
+    def _window_of(day: int, windows) -> int:
+        return next(w for w, (first, last) in enumerate(windows) if first <= day <= last)
+
+    @staticmethod
+    def _day_plans(results, windows) -> list[dict]:
+        plans = []
+        for result, (first, last) in zip(results, windows):
+            for offset, plan in enumerate((result.data or {}).get("days", [])[: last - first + 1]):
+                plans.append({**plan, "day": first + offset})
+        return plans
+
+    def _stitch(self, node, results, windows, names, retried: int) -> NodeResult:
+        plans = self._day_plans(results, windows)
+        model = getattr(node.task, "output_pydantic", None)
+        missing = sorted(set(range(1, windows[-1][1] + 1)) - {p["day"] for p in plans})
+        if model is not None and missing:
+            raise IncompleteItinerary(missing)
+        extra = {
+            "cache": "hit" if all(r.extra.get("cache") == "hit" for r in results) else "miss",
+            "model": results[0].extra.get("model"),
+            "chunks": len(results),
+            "chunks_retried": retried,
+            "repeats": find_repeats(plans, names),
+        }
+        tokens = [r.extra.get("tokens", {}) for r in results]
+        if any(tokens):
+            extra["tokens"] = {
+                "in": sum(t.get("in", 0) for t in tokens),
+                "out": sum(t.get("out", 0) for t in tokens),
+                "cached": sum(t.get("cached", 0) for t in tokens),
+            }
+        stops = [r.extra["early_stop"] for r in results if "early_stop" in r.extra]
+        if stops:
+            extra["early_stop"] = {
+                "holdout": any(e["holdout"] for e in stops),
+                "stopped": sum(e["stopped"] for e in stops),
+                "tokens_saved": sum(e["tokens_saved"] for e in stops),
+            }
+
+        if model is not None:
+            itinerary = model(days=plans)
+            data, content = itinerary.model_dump(), itinerary.to_markdown()
+        else:
+            data, content = None, "\n\n".join(r.content for r in results if r.content)
+        return NodeResult(name=node.name, agent=results[0].agent, content=content, data=data, extra=extra)
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .dag import DagCancelled
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class QueueFull(Exception):
+    pass
+
+
+# ---------- JOB ----------
+@dataclass
+class Job:
+    id: str
+    request: dict
+    status: str = QUEUED
+    sections: list = field(default_factory=list)
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "sections": list(self.sections),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# ---------- STORE ----------
+class JobStore(ABC):
+    """Where job state lives. Swap in a shared store to run several workers."""
+
+    @abstractmethod
+    def save(self, job: Job):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None:
+        ...
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            # Drop the oldest finished jobs first; never evict live ones.
+            while len(self._jobs) > self.max_jobs:
+                oldest = next((j for j in self._jobs.values() if j.finished), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest.id]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+class SharedJobStore(JobStore):
+    """Job state in a shared key-value store, visible to every worker process.
+
+    Jobs still run on the worker that accepted them. A cancel requested
+    through another worker is recorded in the store; the owning worker sees
+    it on its next save (after every finished section) and sets the job's
+    cancel event, so the DAG stops before starting another task.
+    """
+
+    def __init__(self, kv, ttl: int = 24 * 3600, prefix: str = "job:"):
+        self.kv = kv
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def save(self, job: Job):
+        # The cancel flag has its own key: it is only ever set, so a worker
+        # saving progress cannot overwrite a cancel made elsewhere.
+        cancel_key = f"{self.prefix}{job.id}:cancel"
+        if job.cancel_event.is_set():
+            self.kv.set(cancel_key, "1", ex=self.ttl)
+        elif self.kv.get(cancel_key):
+            job.cancel_event.set()
+        payload = {**job.to_dict(), "request": job.request}
+        self.kv.set(self.prefix + job.id, json.dumps(payload), ex=self.ttl)
+
+    def get(self, job_id: str) -> Job | None:
+        stored = self.kv.get(self.prefix + job_id)
+        if stored is None:
+            return None
+        job = Job(**json.loads(stored))
+        if self.kv.get(f"{self.prefix}{job_id}:cancel"):
+            job.cancel_event.set()
+        return job
+
+
+# ---------- QUEUE ----------
+class JobQueue:
+    """Bounded asyncio queue drained by a fixed number of workers.
+
+    ``runner(request, on_section, cancel_event)`` does the blocking work on a
+    dedicated thread pool sized to the worker count, so plans never compete
+    with FastAPI's own request threads. ``max_depth`` bounds the jobs still
+    waiting; a job cancelled while queued frees its place at once, even
+    though a worker only skips its id later.
+    """
+
+    def __init__(self, runner, workers: int = 4, max_depth: int = 32, store: JobStore | None = None):
+        self.runner = runner
+        self.workers = workers
+        self.max_depth = max_depth
+        self.store = store or MemoryJobStore()
+        self._queue = None
+        self._waiting = set()
+        self._tasks = []
+        self._pool = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trip-job")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiting)
+
+    def submit(self, request: dict) -> Job:
+        """Queue a job; must be called on the event loop.
+
+        asyncio queues are not thread-safe: called from another thread, the
+        put may not wake a waiting worker until something else wakes the loop.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if len(self._waiting) >= self.max_depth:
+            raise QueueFull(f"Job queue is full ({self.max_depth} waiting)")
+        job = Job(id=uuid.uuid4().hex, request=request)
+        # Saved first, so a worker picking the id up always finds the job.
+        self.store.save(job)
+        self._waiting.add(job.id)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.store.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._waiting.discard(job_id)
+        self.store.save(job)
+        return job
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self._queue.get()
+            self._waiting.discard(job_id)
+            try:
+                job = self.store.get(job_id)
+                if job is None or job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+                self.store.save(job)
+
+                def on_section(section, job=job):
+                    job.sections.append(section)
+                    self.store.save(job)
+
+                try:
+                    job.result = await loop.run_in_executor(
+                        self._pool, self.runner, job.request, on_section, job.cancel_event
+                    )
+                    job.status = DONE
+                except DagCancelled:
+                    job.status = CANCELLED
+                except Exception as e:
+                    job.status = FAILED
+                    job.error = str(e)
+                job.finished_at = time.time()
+                self.store.save(job)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self.depth, "max_depth": self.max_depth}
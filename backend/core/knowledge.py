@@ -0,0 +1,296 @@
+import functools
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from .dag import NodeResult
+
+logger = logging.getLogger(__name__)
+
+
+def destination_key(destination: str) -> str:
+    return " ".join(destination.split()).casefold()
+
+
+def place_key(name: str) -> frozenset:
+    # "Tokyo, Japan" and "japan tokyo" name the same place; "Paris" and
+    # "Paris, Texas" do not, however close their embeddings are.
+    return frozenset(re.findall(r"\w+", name.casefold()))
+
+
+def _artifact(task: str, saved: dict) -> NodeResult:
+    return NodeResult(
+        name=task,
+        agent=saved["agent"],
+        content=saved["content"],
+        data=saved.get("data"),
+        extra={"cache": "knowledge"},
+    )
+
+
+# ---------- STORE ----------
+class KnowledgeStore:
+    """Per-destination artifacts for tasks that only read the destination.
+
+    Also counts requests per destination so the warmer knows which ones are
+    worth keeping fresh. ``path=":memory:"`` keeps everything in process.
+    """
+
+    def __init__(self, path: str = ":memory:", max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " destination TEXT NOT NULL, task TEXT NOT NULL, output TEXT NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (destination, task));"
+            "CREATE TABLE IF NOT EXISTS demand ("
+            " destination TEXT PRIMARY KEY, display TEXT NOT NULL,"
+            " requests INTEGER NOT NULL, last_requested REAL NOT NULL);"
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "saved": 0}
+
+    def record_request(self, destination: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO demand (destination, display, requests, last_requested) VALUES (?, ?, 1, ?)"
+                " ON CONFLICT(destination) DO UPDATE SET requests = requests + 1, last_requested = excluded.last_requested",
+                (destination_key(destination), destination.strip(), time.time()),
+            )
+            self._conn.commit()
+
+    def popular(self, limit: int) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT display FROM demand ORDER BY requests DESC, last_requested DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ages(self, destination: str) -> dict[str, float]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task, updated_at FROM artifacts WHERE destination = ?", (destination_key(destination),)
+            ).fetchall()
+        return {task: now - updated_at for task, updated_at in rows}
+
+    def get(self, destination: str, tasks) -> dict[str, NodeResult]:
+        """Fresh artifacts for ``destination``; missing or stale tasks are left out."""
+        oldest = time.time() - self.max_age
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task, output FROM artifacts WHERE destination = ? AND updated_at >= ?",
+                (destination_key(destination), oldest),
+            ).fetchall()
+        found = {}
+        for task, output in rows:
+            if task in tasks:
+                found[task] = _artifact(task, json.loads(output))
+        with self._lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(set(tasks) - set(found))
+        return found
+
+    def save(self, destination: str, result: NodeResult):
+        if not result.content:
+            return
+        output = {"agent": result.agent, "content": result.content, "data": result.data}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (destination, task, output, updated_at) VALUES (?, ?, ?, ?)",
+                (destination_key(destination), result.name, json.dumps(output), time.time()),
+            )
+            self._conn.commit()
+            self._stats["saved"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            destinations = self._conn.execute("SELECT COUNT(DISTINCT destination) FROM artifacts").fetchone()[0]
+            tracked = self._conn.execute("SELECT COUNT(*) FROM demand").fetchone()[0]
+            return {**self._stats, "destinations": destinations, "tracked": tracked}
+
+
+class SharedKnowledgeStore:
+    """``KnowledgeStore`` over the shared key-value store, so every worker sees every artifact.
+
+    One key per destination holds its artifacts and one its demand. Writes
+    are read-modify-write: two workers saving the same destination at once
+    may lose one update, which only means that task is fetched again later.
+    """
+
+    def __init__(self, kv, max_age: float = 7 * 24 * 3600, demand_ttl: float = 30 * 24 * 3600,
+                 prefix: str = "knowledge:"):
+        self.kv = kv
+        self.max_age = max_age
+        self.demand_ttl = demand_ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "saved": 0}
+
+    def _load(self, key: str) -> dict:
+        stored = self.kv.get(key)
+        return json.loads(stored) if stored else {}
+
+    def record_request(self, destination: str):
+        key = f"{self.prefix}demand:{destination_key(destination)}"
+        demand = self._load(key) or {"display": destination.strip(), "requests": 0}
+        demand["requests"] += 1
+        demand["last_requested"] = time.time()
+        self.kv.set(key, json.dumps(demand), ex=max(1, int(self.demand_ttl)))
+
+    def popular(self, limit: int) -> list[str]:
+        demand = [self._load(key) for key in self.kv.scan_iter(match=f"{self.prefix}demand:*")]
+        demand = sorted((d for d in demand if d), key=lambda d: (d["requests"], d["last_requested"]), reverse=True)
+        return [d["display"] for d in demand[:limit]]
+
+    def ages(self, destination: str) -> dict[str, float]:
+        now = time.time()
+        artifacts = self._load(f"{self.prefix}artifacts:{destination_key(destination)}")
+        return {task: now - saved["updated_at"] for task, saved in artifacts.items()}
+
+    def get(self, destination: str, tasks) -> dict[str, NodeResult]:
+        """Fresh artifacts for ``destination``; missing or stale tasks are left out."""
+        oldest = time.time() - self.max_age
+        artifacts = self._load(f"{self.prefix}artifacts:{destination_key(destination)}")
+        found = {
+            task: _artifact(task, saved)
+            for task, saved in artifacts.items()
+            if task in tasks and saved["updated_at"] >= oldest
+        }
+        with self._lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(set(tasks) - set(found))
+        return found
+
+    def save(self, destination: str, result: NodeResult):
+        if not result.content:
+            return
+        key = f"{self.prefix}artifacts:{destination_key(destination)}"
+        artifacts = self._load(key)
+        artifacts[result.name] = {
+            "agent": result.agent, "content": result.content, "data": result.data, "updated_at": time.time(),
+        }
+        self.kv.set(key, json.dumps(artifacts), ex=max(1, int(self.max_age)))
+        with self._lock:
+            self._stats["saved"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        destinations = sum(1 for _ in self.kv.scan_iter(match=f"{self.prefix}artifacts:*"))
+        tracked = sum(1 for _ in self.kv.scan_iter(match=f"{self.prefix}demand:*"))
+        return {**stats, "destinations": destinations, "tracked": tracked}
+
+
+def build_knowledge(path: str | None = None, max_age: float = 7 * 24 * 3600, shared=None):
+    """A SQLite file when ``path`` is set, else the shared store when there is one, else memory."""
+    if path or shared is None:
+        return KnowledgeStore(path or ":memory:", max_age=max_age)
+    return SharedKnowledgeStore(shared, max_age=max_age)
+
+
+# ---------- WARM-UP ----------
+class ActiveRuns:
+    """Counts the plans running in this process, for the warmer's idle check.
+
+    Every entry point that spends LLM quota (plans, jobs, session reruns,
+    resumes, comparisons) is wrapped with ``track``.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def track(self, fn):
+        @functools.wraps(fn)
+        def tracked(*args, **kwargs):
+            with self._lock:
+                self._count += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._count -= 1
+
+        return tracked
+
+    def __len__(self):
+        return self._count
+
+
+class KnowledgeWarmer:
+    """Background thread that keeps the top destinations fresh.
+
+    Once at startup and then every ``interval`` seconds it refreshes the
+    ``top_n`` most requested destinations (plus ``seeds``) whose artifacts
+    are missing or older than ``refresh_after``. ``produce(destination)``
+    runs the tasks and returns their results. Work only starts while
+    ``is_idle()`` holds, so refreshes fill quiet periods instead of
+    competing with live requests.
+    """
+
+    def __init__(self, store: KnowledgeStore, produce, tasks, top_n: int = 10,
+                 interval: float = 6 * 3600, refresh_after: float | None = None,
+                 seeds=(), is_idle=lambda: True, idle_poll: float = 5):
+        self.store = store
+        self.produce = produce
+        self.tasks = tuple(tasks)
+        self.top_n = top_n
+        self.interval = interval
+        self.refresh_after = refresh_after if refresh_after is not None else store.max_age / 2
+        self.seeds = tuple(seeds)
+        self.is_idle = is_idle
+        self.idle_poll = idle_poll
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshed = 0
+
+    def due(self) -> list[str]:
+        candidates = list(dict.fromkeys([*self.seeds, *self.store.popular(self.top_n)]))
+        due = []
+        for destination in candidates:
+            ages = self.store.ages(destination)
+            if any(ages.get(task, float("inf")) > self.refresh_after for task in self.tasks):
+                due.append(destination)
+        return due
+
+    def refresh(self) -> int:
+        count = 0
+        for destination in self.due():
+            if self._stop.is_set() or not self.is_idle():
+                break
+            try:
+                for result in self.produce(destination):
+                    self.store.save(destination, result)
+                count += 1
+            except Exception as e:
+                logger.warning("Knowledge refresh for %s failed: %s", destination, e)
+        self.refreshed += count
+        return count
+
+    def _loop(self):
+        # A first pass at startup warms the seeds and the destinations that
+        # were popular before the restart, as soon as the service is idle.
+        while not self._stop.wait(self.idle_poll) and not self.is_idle():
+            pass
+        if not self._stop.is_set():
+            self.refresh()
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="knowledge-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
@@ -0,0 +1,103 @@
+import threading
+
+# Seconds; trip plans take tens of seconds, single calls well under one.
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float("inf"))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            pairs = list(zip(self.label_names, key))
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            lines.append(f"{self.name}{_labels(list(zip(self.label_names, key)))} {value}")
+        return lines
+
+
+class PlanMetrics:
+    """Prometheus-style latency histograms fed from finished tracing spans."""
+
+    def __init__(self, prefix: str = "trip_planner"):
+        self.plan_seconds = Histogram(f"{prefix}_plan_seconds", "End-to-end plan latency.", ("mode",))
+        self.task_seconds = Histogram(f"{prefix}_task_seconds", "Task latency by agent.", ("task", "agent", "cache"))
+        self.llm_seconds = Histogram(f"{prefix}_llm_call_seconds", "LLM call latency.", ("provider", "model", "status"))
+        self.tool_seconds = Histogram(f"{prefix}_tool_seconds", "Tool call latency.", ("tool", "cached"))
+        self.llm_tokens = Counter(f"{prefix}_llm_tokens_total", "LLM tokens by provider.", ("provider", "direction"))
+        self._all = (self.plan_seconds, self.task_seconds, self.llm_seconds, self.tool_seconds, self.llm_tokens)
+
+    def observe(self, span):
+        a = span.attributes
+        if span.kind_name == "plan":
+            self.plan_seconds.observe(span.seconds, mode=a.get("plan.mode", ""))
+        elif span.kind_name == "task":
+            self.task_seconds.observe(span.seconds, task=a.get("task.name", ""), agent=a.get("agent.role", ""), cache=a.get("cache", ""))
+        elif span.kind_name == "llm":
+            provider = a.get("llm.provider", "")
+            self.llm_seconds.observe(span.seconds, provider=provider, model=a.get("llm.model", ""), status="error" if span.error else "ok")
+            self.llm_tokens.inc(a.get("llm.tokens_in", 0), provider=provider, direction="in")
+            self.llm_tokens.inc(a.get("llm.tokens_out", 0), provider=provider, direction="out")
+            self.llm_tokens.inc(a.get("llm.tokens_cached", 0), provider=provider, direction="cached")
+        elif span.kind_name == "tool":
+            self.tool_seconds.observe(span.seconds, tool=a.get("tool.name", ""), cached=str(a.get("tool.cached", False)).lower())
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._all for line in metric.render()) + "\n"
@@ -0,0 +1,185 @@
+import base64
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from .singleflight import normalize_request
+
+try:
+    import brotli
+except ImportError:  # optional: without it plans are served gzip-only
+    brotli = None
+
+
+def plan_id(request: dict, models: dict) -> str:
+    """Stable id of a plan: the normalized request plus the models that write it."""
+    payload = json.dumps({"request": normalize_request(request), "models": models}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def encode(body: bytes) -> tuple[str, bytes, bytes | None]:
+    """ETag, gzip and (when brotli is installed) br copies of a plan body."""
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    br = brotli.compress(body, quality=5) if brotli is not None else None
+    return etag, gzip.compress(body, compresslevel=6), br
+
+
+# ---------- STORE ----------
+class PlanStore:
+    """Finished plans as JSON, with compressed copies made once at save time.
+
+    Saving the same id again replaces the plan (and so its ETag). Saves also
+    delete plans older than ``max_age`` and the oldest past ``max_plans``, at
+    most every ``prune_interval`` seconds. ``path=":memory:"`` keeps
+    everything in process.
+    """
+
+    def __init__(self, path: str = ":memory:", max_age: float = 30 * 24 * 3600, max_plans: int = 10000,
+                 prune_interval: float = 3600):
+        self.path = path
+        self.max_age = max_age
+        self.max_plans = max_plans
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " id TEXT PRIMARY KEY, request TEXT NOT NULL, etag TEXT NOT NULL,"
+            " body BLOB NOT NULL, gzip BLOB NOT NULL, br BLOB, saved_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS plans_saved_at ON plans (saved_at);"
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "saved": 0}
+
+    def save(self, plan_id: str, request: dict, body: bytes) -> str:
+        etag, compressed, br = encode(body)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (id, request, etag, body, gzip, br, saved_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (plan_id, json.dumps(request), etag, body, compressed, br, time.time()),
+            )
+            self._conn.commit()
+            self._stats["saved"] += 1
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+        return etag
+
+    def prune(self) -> int:
+        with self._lock:
+            self._pruned_at = time.monotonic()
+            deleted = self._conn.execute(
+                "DELETE FROM plans WHERE saved_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM plans WHERE id IN (SELECT id FROM plans ORDER BY saved_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_plans,),
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def get(self, plan_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, body, gzip, br FROM plans WHERE id = ? AND saved_at >= ?",
+                (plan_id, time.time() - self.max_age),
+            ).fetchone()
+            self._stats["hits" if row else "misses"] += 1
+        if row is None:
+            return None
+        etag, body, compressed, br = row
+        return {"etag": etag, "identity": body, "gzip": compressed, "br": br}
+
+    def not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["plans"] = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        return {**stats, "brotli": brotli is not None}
+
+
+class SharedPlanStore:
+    """``PlanStore`` over the shared key-value store, so every worker serves every plan.
+
+    Bodies are base64 in one JSON value per plan; the store expires them
+    after ``max_age``.
+    """
+
+    def __init__(self, kv, max_age: float = 30 * 24 * 3600, prefix: str = "plan:"):
+        self.kv = kv
+        self.max_age = max_age
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "saved": 0}
+
+    def save(self, plan_id: str, request: dict, body: bytes) -> str:
+        etag, compressed, br = encode(body)
+        copies = {"identity": body, "gzip": compressed, "br": br}
+        payload = {"request": request, "etag": etag}
+        payload.update({name: base64.b64encode(data).decode("ascii") if data is not None else None for name, data in copies.items()})
+        self.kv.set(self.prefix + plan_id, json.dumps(payload), ex=max(1, int(self.max_age)))
+        with self._lock:
+            self._stats["saved"] += 1
+        return etag
+
+    def get(self, plan_id: str) -> dict | None:
+        stored = self.kv.get(self.prefix + plan_id)
+        with self._lock:
+            self._stats["hits" if stored else "misses"] += 1
+        if stored is None:
+            return None
+        payload = json.loads(stored)
+        plan = {name: base64.b64decode(payload[name]) if payload[name] is not None else None for name in ("identity", "gzip", "br")}
+        return {"etag": payload["etag"], **plan}
+
+    def not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["plans"] = sum(1 for _ in self.kv.scan_iter(match=self.prefix + "*"))
+        return {**stats, "brotli": brotli is not None}
+
+
+def build_plans(path: str | None = None, max_age: float = 30 * 24 * 3600, max_plans: int = 10000, shared=None):
+    """A SQLite file when ``path`` is set, else the shared store when there is one, else memory."""
+    if path or shared is None:
+        return PlanStore(path or ":memory:", max_age=max_age, max_plans=max_plans)
+    return SharedPlanStore(shared, max_age=max_age)
+
+
+# ---------- HTTP ----------
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def pick_encoding(accept_encoding: str | None, available) -> str:
+    """Best of ``available`` ("br", "gzip") the client accepts; "identity" otherwise."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
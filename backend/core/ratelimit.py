@@ -0,0 +1,219 @@
+import contextvars
+import email.utils
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ---------- PROVIDER LIMITS ----------
+# rate = sustained requests/second, burst = bucket size. The limiter lowers
+# the rate on 429s and creeps back up on success (AIMD), never above these.
+PROVIDER_LIMITS = {
+    "groq": {"rate": 0.5, "burst": 5},
+    "gemini": {"rate": 10 / 60, "burst": 2},
+    "ollama": {"rate": 2.0, "burst": 4},
+}
+DEFAULT_LIMIT = {"rate": 1.0, "burst": 2}
+
+RETRYABLE_NAMES = ("RateLimitError", "APIConnectionError", "Timeout", "ServiceUnavailableError", "InternalServerError")
+
+
+def provider_of(model: str) -> str:
+    return model.split("/", 1)[0] if "/" in model else model
+
+
+# ---------- TOKEN BUCKET ----------
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def penalize(self, retry_after: float | None):
+        with self._lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+# ---------- ERRORS ----------
+def _error_chain(error: BaseException):
+    # crewai sometimes re-raises provider errors wrapped in its own.
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_retryable(error: Exception) -> bool:
+    for each in _error_chain(error):
+        if getattr(each, "status_code", None) in (429, 500, 502, 503, 504):
+            return True
+        if type(each).__name__ in RETRYABLE_NAMES:
+            return True
+    return False
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    for each in _error_chain(error):
+        headers = getattr(each, "litellm_response_headers", None)
+        if headers is None:
+            headers = getattr(getattr(each, "response", None), "headers", None)
+        value = headers.get("retry-after") if headers else None
+        if not value:
+            continue
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                continue
+            return max(parsed.timestamp() - time.time(), 0.0)
+    return None
+
+
+# ---------- CALL HOOK ----------
+_limiter = contextvars.ContextVar("provider_limiter", default=None)
+_install_lock = threading.Lock()
+_limited_classes = set()
+
+
+def install_call_limit(llm_class):
+    """Send every ``call`` of ``llm_class`` made under ``ProviderLimiter.wrap`` through it.
+
+    Quotas count provider requests, and a task makes one per ReAct round
+    (several with tools), so the bucket is taken per call, not per task.
+    Calls made outside ``wrap`` pass through unchanged.
+    """
+    if llm_class in _limited_classes:
+        return
+    with _install_lock:
+        if llm_class in _limited_classes:
+            return
+        call = llm_class.call
+
+        def limited_call(llm, *args, **kwargs):
+            limiter = _limiter.get()
+            if limiter is None:
+                return call(llm, *args, **kwargs)
+            # Anything nested (a subclass calling its parent) is this same request.
+            token = _limiter.set(None)
+            try:
+                model = getattr(llm, "model", None) or str(llm)
+                return limiter.call(provider_of(model), lambda: call(llm, *args, **kwargs))
+            finally:
+                _limiter.reset(token)
+
+        llm_class.call = limited_call
+        _limited_classes.add(llm_class)
+
+
+# ---------- LIMITER ----------
+class ProviderLimiter:
+    """One bucket per provider, shared by every request in the process."""
+
+    def __init__(self, limits=None, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.limits = dict(PROVIDER_LIMITS if limits is None else limits)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._retries = {}
+
+    def bucket(self, provider: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(provider)
+            if bucket is None:
+                bucket = TokenBucket(**self.limits.get(provider, DEFAULT_LIMIT))
+                self._buckets[provider] = bucket
+            return bucket
+
+    def backoff(self, attempt: int, retry_after: float | None) -> float:
+        # Full jitter, but never earlier than the provider asked for.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, provider: str, fn):
+        bucket = self.bucket(provider)
+        with self._lock:
+            self._calls[provider] = self._calls.get(provider, 0) + 1
+        for attempt in range(self.max_attempts):
+            bucket.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                retry_after = retry_after_seconds(e)
+                bucket.penalize(retry_after)
+                delay = self.backoff(attempt, retry_after)
+                with self._lock:
+                    self._retries[provider] = self._retries.get(provider, 0) + 1
+                logger.warning("%s: %s, retrying in %.1fs", provider, type(e).__name__, delay)
+                time.sleep(delay)
+            else:
+                bucket.reward()
+                return result
+
+    def wrap(self, execute):
+        # Each LLM call of the task takes a token and is retried on its own;
+        # earlier calls (tool rounds) and finished tasks are not redone.
+        def limited(node, context):
+            llm = getattr(node.task.agent, "llm", None)
+            if llm is not None:
+                install_call_limit(type(llm))
+            token = _limiter.set(self)
+            try:
+                return execute(node, context)
+            finally:
+                _limiter.reset(token)
+
+        return limited
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+            calls = dict(self._calls)
+            retries = dict(self._retries)
+        return {
+            name: {
+                "rate": round(bucket.rate, 4),
+                "max_rate": bucket.max_rate,
+                "calls": calls.get(name, 0),
+                "retries": retries.get(name, 0),
+            }
+            for name, bucket in buckets.items()
+        }
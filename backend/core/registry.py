@@ -0,0 +1,140 @@
+import importlib
+import logging
+import os
+import threading
+
+# ---------- MODEL CONFIG ----------
+# How long Ollama keeps a model (and the KV cache of its last prompt) loaded
+# after a call; its own default of 5 minutes unloads it between quiet spells.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+
+LLM_CONFIGS = {
+    # GROQ (FAST, SHORT OUTPUT)
+    "groq": {"model": "groq/llama-3.1-8b-instant", "temperature": 0.2},
+    # GEMINI (REASONING)
+    "gemini": {"model": "gemini/gemini-2.5-flash", "provider": "litellm", "temperature": 0.2},
+    # LOCAL LLAMA (LONG THINKING)
+    "llama": {"model": "ollama/llama3", "provider": "litellm", "temperature": 0.2, "keep_alive": OLLAMA_KEEP_ALIVE},
+}
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_LIMITS = {"max_connections": 50, "max_keepalive_connections": 20}
+
+
+# ---------- LAZY IMPORTS ----------
+def import_object(path: str):
+    """Resolve ``"package.module:name"``, trying ``backend.package.module`` first.
+
+    Agent and task modules pull in crewai and crewai_tools, which take
+    seconds to import; naming them by path defers that to first use.
+    """
+    module_name, _, name = path.partition(":")
+    try:
+        module = importlib.import_module(f"backend.{module_name}")
+    except ImportError:
+        module = importlib.import_module(module_name)
+    return getattr(module, name)
+
+
+def default_llm_class():
+    from crewai import LLM
+
+    return LLM
+
+
+# ---------- SHARED HTTP POOL ----------
+def install_http_pool():
+    # litellm opens a fresh client per call unless a session is set, which
+    # means a new TLS handshake with the provider on every request.
+    try:
+        import httpx
+        import litellm
+    except ImportError:
+        return None
+
+    if litellm.client_session is None:
+        litellm.client_session = httpx.Client(limits=httpx.Limits(**HTTP_POOL_LIMITS))
+    return litellm.client_session
+
+
+def load_ollama_model(config: dict, timeout: float = 120):
+    # A generate call without a prompt just loads the model and starts its
+    # keep-alive, so the first real request does not pay for the load.
+    import httpx
+
+    base = (config.get("api_base") or config.get("base_url") or OLLAMA_HOST).rstrip("/")
+    response = httpx.post(
+        f"{base}/api/generate",
+        json={"model": config["model"].split("/", 1)[1], "keep_alive": config.get("keep_alive", OLLAMA_KEEP_ALIVE)},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+
+
+# ---------- REGISTRY ----------
+class AgentRegistry:
+    """Builds LLM clients once per process and hands out fresh agents.
+
+    Agents keep per-run state (executor, tool handler), so every request gets
+    its own instances; only the LLM clients and tools behind them are shared.
+    Factories may be given as ``"module:function"`` paths and are imported on
+    first use.
+    """
+
+    def __init__(self, agent_factories, agent_models, llm_configs=None, llm_class=None):
+        self.agent_factories = dict(agent_factories)
+        self.agent_models = agent_models
+        self.llm_configs = llm_configs or LLM_CONFIGS
+        self.llm_class = llm_class
+        self._llms = {}
+        self._lock = threading.Lock()
+
+    def llm(self, name: str, **overrides):
+        # Variants (e.g. stream=True) are cached next to the base client.
+        key = (name, tuple(sorted(overrides.items())))
+        llm = self._llms.get(key)
+        if llm is None:
+            with self._lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    llm_class = self.llm_class or default_llm_class()
+                    llm = llm_class(**{**self.llm_configs[name], **overrides})
+                    self._llms[key] = llm
+        return llm
+
+    def factory(self, task_name: str):
+        factory = self.agent_factories[task_name]
+        if isinstance(factory, str):
+            factory = self.agent_factories[task_name] = import_object(factory)
+        return factory
+
+    def agent(self, task_name: str, model: str | None = None, **llm_overrides):
+        factory = self.factory(task_name)
+        return factory(self.llm(model or self.agent_models[task_name], **llm_overrides))
+
+    def agents(self) -> dict:
+        return {name: self.agent(name) for name in self.agent_factories}
+
+    def load(self):
+        # Imports everything the first request would: agents, their tools, crewai.
+        for name in self.agent_factories:
+            self.factory(name)
+        if self.llm_class is None:
+            default_llm_class()
+
+    def warm_up(self):
+        install_http_pool()
+        for name in sorted(set(self.agent_models.values())):
+            try:
+                self.llm(name)
+                if self.llm_class is None and self.llm_configs[name]["model"].startswith("ollama/"):
+                    load_ollama_model(self.llm_configs[name])
+            except Exception as e:
+                # Leave it to the first request to surface a missing key.
+                logger.warning("Could not warm up LLM %s: %s", name, e)
+
+    def reset(self):
+        with self._lock:
+            self._llms.clear()
@@ -0,0 +1,248 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from .dag import TaskNode
+from .streaming import follow_task
+
+logger = logging.getLogger(__name__)
+
+# ---------- ROUTING CONFIG ----------
+# First entry is the preferred (cheapest) model for the agent; the others are
+# allowed fallbacks.
+ALLOWED_MODELS = {
+    "destination": ("llama", "groq", "gemini"),
+    "attractions": ("llama", "groq", "gemini"),
+    "budget": ("llama", "groq", "gemini"),
+    "tips": ("llama", "groq", "gemini"),
+    "itinerary": ("gemini", "groq", "llama"),
+    "summary": ("groq", "gemini", "llama"),
+}
+
+# How many calls a backend serves in parallel before requests queue up.
+BACKEND_CONCURRENCY = {"llama": 1, "gemini": 8, "groq": 8}
+
+HEDGED_TASKS = ("summary",)
+
+WINDOW = 20
+MIN_SAMPLES = 4
+MAX_ERROR_RATE = 0.5
+COOLDOWN = 30.0
+# Leave the preferred model only when another is this much faster.
+SWITCH_RATIO = 1.5
+
+
+# ---------- HEALTH ----------
+class BackendHealth:
+    def __init__(self, name: str, concurrency: int = 1):
+        self.name = name
+        self.concurrency = concurrency
+        self.samples = deque(maxlen=WINDOW)
+        self.in_flight = 0
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, seconds: float, ok: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.samples.append((seconds, ok))
+            if self._error_rate() > MAX_ERROR_RATE and len(self.samples) >= MIN_SAMPLES:
+                self.down_until = time.monotonic() + COOLDOWN
+
+    def _error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def healthy(self) -> bool:
+        # After the cooldown one probe is let through to test recovery.
+        return time.monotonic() >= self.down_until
+
+    def latency(self) -> float | None:
+        ok = sorted(seconds for seconds, ok in self.samples if ok)
+        return ok[len(ok) // 2] if ok else None
+
+    def expected_seconds(self) -> float | None:
+        latency = self.latency()
+        if latency is None:
+            return None
+        return latency * (1 + self.in_flight / self.concurrency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "healthy": self.healthy(),
+                "in_flight": self.in_flight,
+                "median_seconds": self.latency(),
+                "error_rate": round(self._error_rate(), 3),
+                "samples": len(self.samples),
+            }
+
+
+# ---------- ROUTER ----------
+def _spawn(fn, *args) -> Future:
+    # One thread per hedged attempt rather than a shared pool: a pool sized
+    # for some number of plans queues the primaries of the next ones, and
+    # the hedge timer then fires while they are still waiting for a thread.
+    future = Future()
+    # Copy the context so tracing spans follow the hedged attempt.
+    run = contextvars.copy_context().run
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name="router-hedge", daemon=True).start()
+    return future
+
+
+class ModelRouter:
+    def __init__(self, registry, allowed=None, hedged=HEDGED_TASKS, hedge_after: float | None = None, log_size: int = 200):
+        self.registry = registry
+        self.allowed = dict(ALLOWED_MODELS if allowed is None else allowed)
+        self.hedged = set(hedged)
+        self.hedge_after = hedge_after
+        self.backends = {}
+        self.decisions = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+
+    def backend(self, name: str) -> BackendHealth:
+        with self._lock:
+            health = self.backends.get(name)
+            if health is None:
+                health = BackendHealth(name, BACKEND_CONCURRENCY.get(name, 4))
+                self.backends[name] = health
+            return health
+
+    def rank(self, task_name: str) -> list[str]:
+        allowed = [
+            m for m in self.allowed.get(task_name, ())
+            if m in self.registry.llm_configs
+        ] or [self.registry.agent_models[task_name]]
+        healthy = [m for m in allowed if self.backend(m).healthy()] or list(allowed)
+        preferred = healthy[0]
+
+        expected = {m: self.backend(m).expected_seconds() for m in healthy}
+        known = [m for m in healthy if expected[m] is not None]
+        fastest = min(known, key=lambda m: expected[m]) if known else preferred
+        if (
+            fastest != preferred
+            and expected[preferred] is not None
+            and expected[preferred] > expected[fastest] * SWITCH_RATIO
+        ):
+            return [fastest] + [m for m in healthy if m != fastest]
+        return healthy
+
+    def _log(self, record: dict):
+        record["at"] = time.time()
+        self.decisions.append(record)
+        logger.info("route %s", json.dumps(record))
+
+    def _serves(self, node, model, llm_overrides) -> bool:
+        # Whether the node's own task already runs on this model.
+        llm = getattr(getattr(node.task, "agent", None), "llm", None)
+        return any(llm is self.registry.llm(model, **o) for o in ({}, llm_overrides))
+
+    def _attempt(self, node, context, model, execute, llm_overrides):
+        if not self._serves(node, model, llm_overrides):
+            agent = self.registry.agent(node.name, model=model, **llm_overrides)
+            routed = TaskNode(node.name, node.factory(agent), node.depends_on, node.factory)
+            follow_task(node.task, routed.task)
+        else:
+            routed = node
+        health = self.backend(model)
+        health.start()
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = execute(routed, context)
+            ok = True
+            result.extra["model"] = model
+            result.extra["model_id"] = self.registry.llm_configs[model]["model"]
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            health.finish(seconds, ok)
+            self._log({"task": node.name, "model": model, "seconds": round(seconds, 3), "ok": ok})
+
+    def _hedge_delay(self, model: str) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        latency = self.backend(model).latency()
+        return max(1.0, latency * 1.2) if latency else 5.0
+
+    def _hedged(self, node, context, candidates, execute, overrides):
+        # Start the primary; if it hasn't answered by its usual latency (or
+        # fails), race the next model and take whichever succeeds first.
+        remaining = list(candidates)
+        running = {}
+        last_error = None
+
+        def launch(reason):
+            model = remaining.pop(0)
+            self._log({"task": node.name, "launch": model, "reason": reason})
+            running[_spawn(self._attempt, node, context, model, execute, overrides)] = model
+
+        launch("primary")
+        done, _ = wait(running, timeout=self._hedge_delay(running[next(iter(running))]))
+        if not done and remaining:
+            launch("hedge")
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            if not running and remaining:
+                launch("failover")
+        raise last_error
+
+    def wrap(self, execute):
+        def routed(node, context):
+            if node.factory is None:
+                return execute(node, context)
+
+            llm = getattr(node.task.agent, "llm", None)
+            overrides = {"stream": True} if getattr(llm, "stream", False) else {}
+            candidates = self.rank(node.name)
+            self._log({
+                "task": node.name,
+                "candidates": candidates,
+                "expected": {m: self.backend(m).expected_seconds() for m in candidates},
+            })
+
+            if node.name in self.hedged and len(candidates) > 1:
+                return self._hedged(node, context, candidates, execute, overrides)
+
+            last_error = None
+            for model in candidates:
+                try:
+                    return self._attempt(node, context, model, execute, overrides)
+                except Exception as e:
+                    last_error = e
+            raise last_error
+
+        return routed
+
+    def stats(self) -> dict:
+        with self._lock:
+            backends = dict(self.backends)
+        return {
+            "backends": {name: health.snapshot() for name, health in backends.items()},
+            "recent": list(self.decisions)[-20:],
+        }
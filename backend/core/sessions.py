@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ---------- DIFF ----------
+def changed_fields(previous: dict, current: dict) -> set[str]:
+    keys = previous.keys() | current.keys()
+    return {key for key in keys if previous.get(key) != current.get(key)}
+
+
+def affected_tasks(changed: set[str], task_inputs: dict, graph: dict) -> set[str]:
+    """Tasks that read a changed field, plus everything downstream of them."""
+    affected = {name for name, fields in task_inputs.items() if changed & set(fields)}
+    grew = True
+    while grew:
+        grew = False
+        for name, deps in graph.items():
+            if name not in affected and affected & set(deps):
+                affected.add(name)
+                grew = True
+    return affected
+
+
+# ---------- STORE ----------
+class SessionStore:
+    """Maps a session id to the run that holds its latest complete plan.
+
+    Outputs themselves stay in the checkpoint store; a session only remembers
+    which run to diff the next request against.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 24 * 3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> str | None:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            run_id, saved_at = entry
+            if time.time() - saved_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return run_id
+
+    def save(self, session_id: str, run_id: str):
+        with self._lock:
+            self._sessions[session_id] = (run_id, time.time())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+
+class SharedSessionStore:
+    """``SessionStore`` over a shared key-value store, for multi-worker deployments."""
+
+    def __init__(self, kv, ttl: int = 24 * 3600, prefix: str = "session:"):
+        self.kv = kv
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id: str) -> str | None:
+        return self.kv.get(self.prefix + session_id)
+
+    def save(self, session_id: str, run_id: str):
+        self.kv.set(self.prefix + session_id, run_id, ex=self.ttl)
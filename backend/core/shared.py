@@ -0,0 +1,140 @@
+import fnmatch
+import sqlite3
+import threading
+import time
+
+
+# ---------- BACKENDS ----------
+# The subset of the Redis client API the shared stores rely on: string
+# values, ``set(ex=, nx=)``, ``delete`` and ``scan_iter(match=)``. A real
+# ``redis.Redis(decode_responses=True)`` works wherever these do.
+class MemoryKV:
+    """In-process stand-in for Redis: one worker, or tests."""
+
+    def __init__(self, purge_interval: float = 60):
+        self.purge_interval = purge_interval
+        self._data = {}
+        self._lock = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ex if ex else None)
+            self._purge_due()
+            return True
+
+    def _purge_due(self):
+        # Keys that are never read again (cache entries, flight outcomes)
+        # would otherwise stay forever; sweep on writes, at most this often.
+        if time.monotonic() - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = time.monotonic()
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at < now]:
+            del self._data[key]
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match: str = "*"):
+        with self._lock:
+            keys = [key for key in list(self._data) if self._live(key) and fnmatch.fnmatchcase(key, match)]
+        yield from keys
+
+
+class SQLiteKV:
+    """Key-value table in a WAL-mode SQLite file shared by every worker on a host.
+
+    Expired rows are hidden from reads and deleted by ``purge_expired``,
+    which writes run at most every ``purge_interval`` seconds.
+    """
+
+    def __init__(self, path: str, timeout: float = 30, purge_interval: float = 60):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._purged_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self.purge_expired()
+        now = time.time()
+        expires_at = now + ex if ex else None
+        with self._lock:
+            if not nx:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+                )
+                return True
+            # One statement, so two workers racing for the same key cannot both win.
+            cursor = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+                " WHERE kv.expires_at IS NOT NULL AND kv.expires_at < ?",
+                (key, value, expires_at, now),
+            )
+            return cursor.rowcount > 0
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._conn.execute("DELETE FROM kv WHERE key = ?", (key,)).rowcount for key in keys)
+
+    def scan_iter(self, match: str = "*"):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM kv WHERE key GLOB ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (match, time.time()),
+            ).fetchall()
+        yield from (row[0] for row in rows)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            self._purged_at = time.monotonic()
+            return self._conn.execute(
+                "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            ).rowcount
+
+
+def build_shared_store(url: str | None = None):
+    """``sqlite:///path/state.db``, ``redis://host:6379/0`` or ``memory``; None when unset."""
+    if not url:
+        return None
+    if url == "memory":
+        return MemoryKV()
+    if url.startswith("sqlite:///"):
+        return SQLiteKV(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return redis.Redis.from_url(url, decode_responses=True)
+    raise ValueError(f"Unsupported shared state URL: {url}")
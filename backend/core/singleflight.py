@@ -0,0 +1,168 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+
+def normalize_request(fields: dict) -> dict:
+    # "  Paris " and "paris" are the same trip.
+    return {
+        key: " ".join(value.split()).casefold() if isinstance(value, str) else value
+        for key, value in sorted(fields.items())
+    }
+
+
+def request_key(fields: dict, *extra) -> str:
+    payload = json.dumps([normalize_request(fields), *extra], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.events = []
+        self.listeners = []
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    ``fn(publish)`` runs once per key at a time. Events it publishes are fanned
+    out to every caller's ``listener``; callers that join late get the events
+    published so far replayed first. All callers receive the same result or
+    exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn, listener=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                self._coalesced += 1
+            if listener is not None:
+                for event in call.events:
+                    listener(event)
+                call.listeners.append(listener)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        def publish(event):
+            with self._lock:
+                call.events.append(event)
+                listeners = list(call.listeners)
+            for each in listeners:
+                each(event)
+
+        try:
+            call.result = fn(publish)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class FlightFailed(Exception):
+    """The run a caller joined in another worker process failed."""
+
+
+class SharedSingleFlight:
+    """SingleFlight across worker processes sharing a key-value store.
+
+    Within a process calls coalesce as in ``SingleFlight``. Across processes
+    the first caller takes a lease on the key; callers in other workers poll
+    until it is released, then replay the leader's events and decode its
+    result. If a leader dies, its lease expires after ``lease`` seconds and
+    the next caller takes over.
+    """
+
+    def __init__(self, kv, encode=lambda r: r, decode=lambda r: r, lease: int = 600,
+                 keep: int = 60, poll: float = 0.25, prefix: str = "flight:"):
+        self.kv = kv
+        self.encode = encode
+        self.decode = decode
+        self.lease = lease
+        self.keep = keep
+        self.poll = poll
+        self.prefix = prefix
+        self.local = SingleFlight()
+        self._lock = threading.Lock()
+        self._remote_joins = 0
+
+    def do(self, key: str, fn, listener=None):
+        (result, joined), shared = self.local.do(key, lambda publish: self._across(key, fn, publish), listener)
+        return result, shared or joined
+
+    def _across(self, key: str, fn, publish):
+        lock_key = self.prefix + key
+        while True:
+            token = uuid.uuid4().hex
+            if self.kv.set(lock_key, token, ex=self.lease, nx=True):
+                return self._lead(lock_key, token, fn, publish), False
+            leader = self.kv.get(lock_key)
+            while leader is not None and self.kv.get(lock_key) == leader:
+                time.sleep(self.poll)
+            stored = self.kv.get(f"{lock_key}:{leader}") if leader else None
+            if stored is None:
+                continue  # released without a result (lease expired); try to lead
+            with self._lock:
+                self._remote_joins += 1
+            outcome = json.loads(stored)
+            for event in outcome["events"]:
+                publish(event)
+            if "error" in outcome:
+                raise FlightFailed(outcome["error"])
+            return self.decode(outcome["result"]), True
+
+    def _lead(self, lock_key: str, token: str, fn, publish):
+        events = []
+
+        def record(event):
+            events.append(event)
+            publish(event)
+
+        outcome = {"events": events}
+        try:
+            result = fn(record)
+            outcome["result"] = self.encode(result)
+            return result
+        except BaseException as e:
+            outcome["error"] = str(e)
+            raise
+        finally:
+            # Result first, so a follower never sees the lease gone and no result.
+            self.kv.set(f"{lock_key}:{token}", json.dumps(outcome, default=str), ex=self.keep)
+            if self.kv.get(lock_key) == token:
+                self.kv.delete(lock_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.local.stats(), "remote_joins": self._remote_joins}
@@ -0,0 +1,300 @@
+import contextvars
+import copy
+import random
+import threading
+from dataclasses import dataclass, field
+
+from .tokens import count_tokens
+
+FINAL_ANSWER = "Final Answer:"
+
+# Both end right after the answer's closing brace (which the stop sequence
+# swallows; it is added back when the stream ends).
+JSON_STOPS = ("}\n```", "}\n\n")
+
+
+# ---------- ANSWER SPECS ----------
+@dataclass(frozen=True)
+class AnswerSpec:
+    """What a complete answer looks like for one task.
+
+    ``limits`` caps top-level lists of the JSON answer (e.g. 8 attractions):
+    once the last allowed item closes, the answer is cut there and closed,
+    so only use it for the last list of a schema.
+    """
+
+    limits: dict = field(default_factory=dict)
+    stop: tuple[str, ...] = JSON_STOPS
+
+
+class StructureWatcher:
+    """Reads a streamed answer and tells when its JSON structure is complete.
+
+    The answer starts at the first ``{`` after "Final Answer:" (or at the
+    start of the response when it opens with the JSON). Strings and escapes
+    are tracked so braces inside values do not count.
+    """
+
+    def __init__(self, spec: AnswerSpec):
+        self.spec = spec
+        self.text = ""
+        self.start = None
+        self.end = None
+        self.suffix = ""
+        self._pos = 0
+        self._stack = []
+        self._string_at = None
+        self._escape = False
+        self._last_string = None
+        self._key = None
+        self._counts = {}
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        if self.start is None:
+            self.start = self._find_start()
+            if self.start is None:
+                return False
+            self._pos = self.start
+        while self.end is None and self._pos < len(self.text):
+            self._step(self._pos)
+            self._pos += 1
+        return self.complete
+
+    def answer(self) -> str:
+        """What to keep: the text up to the end of the structure, closed."""
+        if self.end is None:
+            return self.text + self.closers()
+        return self.text[: self.end] + self.suffix
+
+    def closers(self) -> str:
+        if self.start is None or self._string_at is not None:
+            return ""
+        return "".join("}" if opener == "{" else "]" for opener, _ in reversed(self._stack))
+
+    def tail_tokens(self) -> int:
+        """Tokens received after the structure was complete (thrown away)."""
+        return count_tokens(self.text[self.end:]) if self.end is not None else 0
+
+    def _find_start(self):
+        marker = self.text.find(FINAL_ANSWER)
+        offset = marker + len(FINAL_ANSWER) if marker >= 0 else 0
+        head = self.text[offset:]
+        if marker < 0 and not head.lstrip().lstrip("`").removeprefix("json").lstrip().startswith("{"):
+            return None
+        brace = head.find("{")
+        return offset + brace if brace >= 0 else None
+
+    def _step(self, i: int):
+        c = self.text[i]
+        if self._string_at is not None:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._last_string = self.text[self._string_at + 1: i]
+                self._string_at = None
+                self._item_closed(i)
+            return
+        if c == '"':
+            self._string_at = i
+        elif c == ":" and len(self._stack) == 1:
+            self._key = self._last_string
+        elif c in "{[":
+            self._stack.append((c, self._key if len(self._stack) == 1 else None))
+        elif c in "}]" and self._stack:
+            self._stack.pop()
+            if not self._stack:
+                self.end = i + 1
+            else:
+                self._item_closed(i)
+
+    def _item_closed(self, i: int):
+        # An item of a limited top-level list just ended.
+        if len(self._stack) != 2 or self._stack[-1][0] != "[":
+            return
+        key = self._stack[-1][1]
+        limit = self.spec.limits.get(key)
+        if limit is None:
+            return
+        self._counts[key] = self._counts.get(key, 0) + 1
+        if self._counts[key] >= limit:
+            self.end = i + 1
+            self.suffix = self.closers()
+
+
+# ---------- STREAM HOOK ----------
+_watch = contextvars.ContextVar("answer_watch", default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _content(chunk):
+    choices = getattr(chunk, "choices", None) or []
+    delta = getattr(choices[0], "delta", None) if choices else None
+    return getattr(delta, "content", None) if delta is not None else None
+
+
+def _set_content(chunk, text: str):
+    chunk.choices[0].delta.content = text
+    return chunk
+
+
+def _close(stream):
+    for target in (getattr(stream, "completion_stream", None), stream):
+        close = getattr(target, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+def _watched(stream, watch):
+    watcher = StructureWatcher(watch.spec)
+    kept, template = 0, None
+    for chunk in stream:
+        text = _content(chunk)
+        if text:
+            template = chunk
+            watcher.feed(text)
+            if watcher.complete and not watch.holdout:
+                yield _set_content(chunk, watcher.answer()[kept:])
+                watch.record(watcher, stopped=True)
+                _close(stream)
+                return
+            kept += len(text)
+        yield chunk
+    if watch.stop and watcher.start is not None and template is not None:
+        # Ended by a stop sequence that took the closing brace with it.
+        closers = watcher.closers()
+        if closers:
+            yield _set_content(copy.deepcopy(template), closers)
+    watch.record(watcher, stopped=False)
+
+
+def install_stream_watch():
+    """Route streamed completions through the answer watcher of the running task.
+
+    crewai calls ``litellm.completion`` with no way to stop a stream early,
+    so the function is wrapped once; calls made outside ``EarlyStop.wrap``,
+    without streaming or with native tool calls pass through unchanged.
+    """
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        import litellm
+
+        completion = litellm.completion
+
+        def watched_completion(*args, **kwargs):
+            watch = _watch.get()
+            if watch is None or not kwargs.get("stream") or kwargs.get("tools"):
+                return completion(*args, **kwargs)
+            if watch.stop and kwargs.get("stop"):
+                # crewai only sends stop words to models that support them.
+                kwargs["stop"] = list(dict.fromkeys([*kwargs["stop"], *watch.stop]))
+            return _watched(completion(*args, **kwargs), watch)
+
+        litellm.completion = watched_completion
+        _installed = True
+
+
+# ---------- EARLY STOP ----------
+class _Watch:
+    def __init__(self, spec: AnswerSpec, holdout: bool, stop: tuple[str, ...]):
+        self.spec = spec
+        self.holdout = holdout
+        self.stop = stop
+        self.calls = []
+
+    def record(self, watcher: StructureWatcher, stopped: bool):
+        self.calls.append({
+            "stopped": stopped,
+            "complete": watcher.complete,
+            "tail": watcher.tail_tokens(),
+        })
+
+
+class EarlyStop:
+    """Ends task answers as soon as their structure is complete.
+
+    Streamed answers of tasks with an ``AnswerSpec`` are watched: the stream
+    is closed once the JSON closes or a list reaches its limit, and the
+    spec's stop sequences are sent along so the provider stops on its own
+    as well. A ``sample`` of calls runs unchanged to measure how many tokens
+    follow a complete answer per task; stopped calls are credited that many
+    tokens saved.
+    """
+
+    def __init__(self, specs: dict, sample: float = 0.05, seed=None):
+        self.specs = dict(specs)
+        self.sample = sample
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def wrap(self, execute):
+        def stopping(node, context):
+            spec = self.specs.get(node.name)
+            if spec is None:
+                return execute(node, context)
+            install_stream_watch()
+            with self._lock:
+                holdout = self._rng.random() < self.sample
+            # Tool-using agents also write JSON tool inputs, which the stop
+            # sequences could cut; they only get the stream watcher.
+            tools = getattr(getattr(node.task, "agent", None), "tools", None)
+            watch = _Watch(spec, holdout, () if holdout or tools else spec.stop)
+            token = _watch.set(watch)
+            try:
+                result = execute(node, context)
+            finally:
+                _watch.reset(token)
+            saved = self._account(node.name, watch)
+            if watch.calls:
+                result.extra["early_stop"] = {
+                    "holdout": holdout,
+                    "stopped": sum(c["stopped"] for c in watch.calls),
+                    "tokens_saved": saved,
+                }
+            return result
+
+        return stopping
+
+    def _account(self, name: str, watch: _Watch) -> int:
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "calls": 0, "stopped": 0, "holdout_calls": 0, "holdout_tail_tokens": 0, "tokens_saved": 0,
+            })
+            saved = 0
+            for call in watch.calls:
+                stats["calls"] += 1
+                if watch.holdout:
+                    if call["complete"]:
+                        stats["holdout_calls"] += 1
+                        stats["holdout_tail_tokens"] += call["tail"]
+                    continue
+                if call["complete"] and stats["holdout_calls"]:
+                    saved += round(stats["holdout_tail_tokens"] / stats["holdout_calls"])
+                stats["stopped"] += call["stopped"]
+            stats["tokens_saved"] += saved
+            return saved
+
+    def stats(self) -> dict:
+        with self._lock:
+            tasks = {}
+            for name, s in self._stats.items():
+                tasks[name] = {
+                    **s,
+                    "tail_tokens_mean": round(s["holdout_tail_tokens"] / s["holdout_calls"], 1) if s["holdout_calls"] else None,
+                }
+        return {"sample": self.sample, "tasks": tasks}
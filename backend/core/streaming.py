@@ -0,0 +1,84 @@
+import json
+import queue
+import threading
+from contextlib import contextmanager
+
+_DONE = object()
+
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def stream_events(run):
+    """Run ``run(emit)`` on a worker thread and yield its events as NDJSON.
+
+    ``run`` pushes event dicts through ``emit`` as work completes and returns
+    a dict that becomes the closing ``done`` event. A failure is reported as
+    an ``error`` event instead of tearing down the open response.
+    """
+    events = queue.Queue()
+
+    def worker():
+        try:
+            final = run(events.put)
+            events.put({"event": "done", **(final or {})})
+        except Exception as e:
+            # A failed checkpointed run carries its id, to resume it with.
+            run_id = getattr(e, "run_id", None)
+            events.put({"event": "error", "detail": str(e), **({"run_id": run_id} if run_id else {})})
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    while True:
+        event = events.get()
+        if event is _DONE:
+            return
+        yield ndjson(event)
+
+
+_streams = []
+_streams_lock = threading.Lock()
+
+
+def follow_task(task, rebuilt):
+    """Stream ``rebuilt`` under the section of ``task`` it stands in for.
+
+    The router (another model) and day windows run a rebuilt copy of a task,
+    which gets a new id; without this its chunks would not be forwarded.
+    """
+    original, new = str(task.id), str(rebuilt.id)
+    with _streams_lock:
+        for task_names in _streams:
+            if original in task_names:
+                task_names[new] = task_names[original]
+
+
+@contextmanager
+def token_stream(task_names: dict, emit):
+    """Forward LLM stream chunks for the given tasks while the block runs.
+
+    ``task_names`` maps ``str(task.id)`` to the section name reported to the
+    client; tasks rebuilt from them are added through ``follow_task``. Only
+    LLMs built with ``stream=True`` emit chunks.
+    """
+    from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+
+    task_names = dict(task_names)
+
+    def handler(source, event):
+        name = task_names.get(getattr(event, "task_id", None))
+        if name and event.chunk and event.tool_call is None:
+            emit({"event": "token", "name": name, "chunk": event.chunk})
+
+    crewai_event_bus.register_handler(LLMStreamChunkEvent, handler)
+    with _streams_lock:
+        _streams.append(task_names)
+    try:
+        yield
+    finally:
+        with _streams_lock:
+            _streams[:] = [names for names in _streams if names is not task_names]
+        crewai_event_bus.off(LLMStreamChunkEvent, handler)
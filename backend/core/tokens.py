@@ -0,0 +1,281 @@
+import contextvars
+import re
+import threading
+
+from .dag import CONTEXT_DIVIDER
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional; fall back to the ~4 chars/token rule
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4
+
+# ---------- INPUT BUDGETS (prompt tokens) ----------
+# Keep the local model's prompt small: Ollama latency grows with input size.
+INPUT_BUDGETS = {
+    "ollama/llama3": 3000,
+    "gemini/gemini-2.5-flash": 32000,
+    "groq/llama-3.1-8b-instant": 6000,
+}
+DEFAULT_INPUT_BUDGET = 8000
+
+# crewai's ReAct scaffolding (format instructions, "Thought:/Action:" rules)
+# on top of the agent and task text, until a real call has been measured.
+FORMAT_RESERVE = 400
+
+# Lines shorter than this ("Morning:", "Day 2:") are structure, not boilerplate.
+MIN_DEDUPE_CHARS = 40
+
+BOILERPLATE = re.compile(
+    r"cookie|subscribe|newsletter|sign in|log in|privacy policy|terms of|all rights reserved|©|advertis",
+    re.IGNORECASE,
+)
+
+
+def count_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# ---------- COMPRESSION ----------
+def dedupe_lines(sections: list[str]) -> list[str]:
+    seen, result = set(), []
+    for section in sections:
+        kept = []
+        for line in section.splitlines():
+            key = " ".join(line.split()).casefold()
+            if len(key) >= MIN_DEDUPE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        result.append("\n".join(kept))
+    return result
+
+
+def _line_score(index: int, line: str) -> float:
+    words = len(line.split())
+    if not words:
+        return -1.0
+    score = min(words, 40) - index * 0.05  # favour content and the lead
+    if BOILERPLATE.search(line):
+        score -= 50
+    return score
+
+
+def extractive_trim(text: str, max_tokens: int) -> str:
+    """Keep the most informative lines that fit, in their original order."""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    ranked = sorted(range(len(lines)), key=lambda i: _line_score(i, lines[i]), reverse=True)
+    keep, used = set(), 0
+    for i in ranked:
+        if _line_score(i, lines[i]) < 0:
+            break
+        cost = count_tokens(lines[i]) + 1
+        if used + cost > max_tokens:
+            continue
+        keep.add(i)
+        used += cost
+    return "\n".join(lines[i] for i in sorted(keep)) + "\n[trimmed]"
+
+
+def compress_context(context: str, max_tokens: int) -> str:
+    sections = dedupe_lines(context.split(CONTEXT_DIVIDER))
+    if count_tokens(CONTEXT_DIVIDER.join(sections)) <= max_tokens:
+        return CONTEXT_DIVIDER.join(sections)
+
+    # Split the budget evenly, handing what short sections leave over to
+    # the longer ones.
+    sizes = [count_tokens(s) for s in sections]
+    remaining, share = max_tokens, {}
+    for i in sorted(range(len(sections)), key=lambda i: sizes[i]):
+        fair = remaining // (len(sections) - len(share))
+        share[i] = min(sizes[i], fair)
+        remaining -= share[i]
+    return CONTEXT_DIVIDER.join(extractive_trim(s, share[i]) for i, s in enumerate(sections))
+
+
+# ---------- PROMPT SIZE ----------
+def _model_name(agent) -> str:
+    llm = getattr(agent, "llm", None)
+    return getattr(llm, "model", None) or str(llm)
+
+
+def _agent_usage(agent):
+    process = getattr(agent, "_token_process", None)
+    if process is None:
+        return 0, 0, 0
+    summary = process.get_summary()
+    return summary.prompt_tokens, summary.completion_tokens, summary.cached_prompt_tokens
+
+
+def prompt_overhead(task) -> int:
+    """Estimated prompt tokens of ``task`` besides its context.
+
+    crewai sends the agent's role, goal and backstory, its tools'
+    descriptions and the ReAct format as a system prompt, and renders the
+    task with its expected output (and schema) as the first user message.
+    """
+    agent = task.agent
+    parts = [getattr(agent, name, None) for name in ("role", "goal", "backstory")]
+    parts += [getattr(tool, "description", None) for tool in getattr(agent, "tools", None) or ()]
+    try:
+        parts.append(task.prompt())
+    except Exception:
+        parts += [task.description, task.expected_output]
+    return sum(count_tokens(part) for part in parts if isinstance(part, str)) + FORMAT_RESERVE
+
+
+def count_message_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return count_tokens(messages)
+    return sum(count_tokens(m.get("content")) for m in messages if isinstance(m.get("content"), str))
+
+
+def fit_messages(messages, budget: int):
+    """Trim tool observations, largest first, until ``messages`` fit ``budget``.
+
+    Tool rounds are appended to the conversation as "Observation: <result>"
+    and scraped pages make them the bulk of later calls. The system prompt,
+    the task prompt and the agent's own actions are never cut.
+    """
+    excess = count_message_tokens(messages) - budget
+    if excess <= 0 or isinstance(messages, str):
+        return messages
+
+    messages = [dict(m) for m in messages]
+    observations = []
+    for i, message in enumerate(messages):
+        content = message.get("content")
+        if message.get("role") == "assistant" and isinstance(content, str) and "\nObservation:" in content:
+            head, _, observation = content.rpartition("\nObservation:")
+            observations.append((count_tokens(observation), i, head, observation))
+
+    for size, i, head, observation in sorted(observations, key=lambda o: o[0], reverse=True):
+        if excess <= 0:
+            break
+        trimmed = extractive_trim(observation, max(size - excess, 0))
+        excess -= size - count_tokens(trimmed)
+        messages[i]["content"] = f"{head}\nObservation:{trimmed}"
+    return messages
+
+
+# ---------- CALL HOOK ----------
+_budget = contextvars.ContextVar("token_budget", default=None)
+_install_lock = threading.Lock()
+_budgeted_classes = set()
+
+
+def install_input_budget(llm_class):
+    """Fit every ``call`` of ``llm_class`` made under ``TokenBudget.wrap`` to the budget.
+
+    The context is trimmed before the task starts, but tool rounds grow the
+    conversation after that, so each call is checked again as it is sent.
+    Calls made outside ``wrap`` pass through unchanged.
+    """
+    if llm_class in _budgeted_classes:
+        return
+    with _install_lock:
+        if llm_class in _budgeted_classes:
+            return
+        call = llm_class.call
+
+        def budgeted_call(llm, messages, *args, **kwargs):
+            state = _budget.get()
+            if state is None:
+                return call(llm, messages, *args, **kwargs)
+            token = _budget.set(None)
+            try:
+                return call(llm, state.fit(llm, messages), *args, **kwargs)
+            finally:
+                _budget.reset(token)
+
+        llm_class.call = budgeted_call
+        _budgeted_classes.add(llm_class)
+
+
+class _TaskBudget:
+    # Per-run state the hook reads: the first call measures the real prompt
+    # overhead for the next run of the same task.
+    def __init__(self, owner, name: str, context_tokens: int):
+        self.owner = owner
+        self.name = name
+        self.context_tokens = context_tokens
+        self.calls = 0
+        self.trimmed_calls = 0
+
+    def fit(self, llm, messages):
+        size = count_message_tokens(messages)
+        if self.calls == 0:
+            self.owner._overhead[self.name] = max(size - self.context_tokens, 0)
+        self.calls += 1
+        budget = self.owner.budget_for(getattr(llm, "model", None) or str(llm))
+        if size <= budget:
+            return messages
+        self.trimmed_calls += 1
+        return fit_messages(messages, budget)
+
+
+# ---------- BUDGET ----------
+class TokenBudget:
+    def __init__(self, budgets=None, default: int = DEFAULT_INPUT_BUDGET):
+        self.budgets = dict(INPUT_BUDGETS if budgets is None else budgets)
+        self.default = default
+        self._overhead = {}
+
+    def budget_for(self, model: str) -> int:
+        return self.budgets.get(model, self.default)
+
+    def overhead(self, node) -> int:
+        """Prompt tokens besides the context: measured on the last run, else estimated."""
+        return self._overhead.get(node.name) or prompt_overhead(node.task)
+
+    def wrap(self, execute):
+        # Trims upstream context to the model's input budget before the task
+        # starts, checks every LLM call of it against the budget, and records
+        # tokens in/out on the result.
+        def budgeted(node, context):
+            task = node.task
+            llm = getattr(task.agent, "llm", None)
+            if llm is not None:
+                install_input_budget(type(llm))
+            budget = self.budget_for(_model_name(task.agent))
+            overhead = self.overhead(node)
+            context_tokens = count_tokens(context)
+
+            trimmed = False
+            if context and overhead + context_tokens > budget:
+                context = compress_context(context, max(budget - overhead, 0))
+                trimmed = True
+
+            state = _TaskBudget(self, node.name, count_tokens(context))
+            token = _budget.set(state)
+            try:
+                result = execute(node, context)
+            finally:
+                _budget.reset(token)
+
+            # Prefer crewai's own accounting (covers tool rounds); estimate
+            # when the provider didn't report usage.
+            used_in, used_out, cached = _agent_usage(task.agent)
+            result.extra["tokens"] = {
+                "in": used_in or overhead + count_tokens(context),
+                "out": used_out or count_tokens(result.content),
+                "cached": cached,
+                "context_before": context_tokens,
+                "context_after": count_tokens(context),
+                "trimmed": trimmed,
+                "trimmed_calls": state.trimmed_calls,
+            }
+            return result
+
+        return budgeted
@@ -0,0 +1,316 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from .ratelimit import provider_of
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds.
+INTERNAL, CLIENT = 1, 3
+
+_current = contextvars.ContextVar("trip_span", default=None)
+
+
+def cached_tokens(usage: dict) -> int:
+    # Prompt tokens served from the provider's prefix cache, under whichever
+    # key the provider reports them (0 when it does not).
+    details = usage.get("prompt_tokens_details") or {}
+    if not isinstance(details, dict):
+        details = {"cached_tokens": getattr(details, "cached_tokens", None)}
+    return usage.get("cached_prompt_tokens") or details.get("cached_tokens") or 0
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+# ---------- SPAN ----------
+class Span:
+    def __init__(self, name: str, kind_name: str, trace_id: str, parent, kind: int = INTERNAL,
+                 attributes: dict | None = None, start_ns: int | None = None):
+        self.name = name
+        self.kind_name = kind_name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.root = parent.root if parent else self
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.exported = False
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def to_otel(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+# ---------- EXPORTERS ----------
+class JsonlExporter:
+    """One OTLP/JSON span per line, appended to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]):
+        lines = "".join(json.dumps(span.to_otel()) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OtlpHttpExporter:
+    """Posts finished traces to an OTLP/HTTP collector (JSON encoding).
+
+    Sending happens on a background thread so a slow collector never adds
+    latency to a plan; traces are dropped when the backlog is full.
+    """
+
+    def __init__(self, endpoint: str, service_name: str, max_backlog: int = 256, timeout: float = 5):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=timeout)
+        self._queue = queue.Queue(maxsize=max_backlog)
+        threading.Thread(target=self._send_loop, name="otlp-exporter", daemon=True).start()
+
+    def export(self, spans: list[Span]):
+        try:
+            self._queue.put_nowait([span.to_otel() for span in spans])
+        except queue.Full:
+            logger.warning("Dropping trace: OTLP export backlog is full")
+
+    def _send_loop(self):
+        while True:
+            spans = self._queue.get()
+            payload = {
+                "resourceSpans": [{
+                    "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "trip-planner"}, "spans": spans}],
+                }]
+            }
+            try:
+                self.client.post(self.url, json=payload).raise_for_status()
+            except Exception as e:
+                logger.warning("OTLP export failed: %s", e)
+
+
+# ---------- TRACER ----------
+class Tracer:
+    """Spans for plans, tasks, tools and LLM calls.
+
+    Plan and task spans are opened in code; LLM and tool spans are rebuilt
+    from crewai's events, which carry the emitting thread's context, so they
+    nest under the task that made the call. A trace is exported once its
+    root span ends. Every finished span is also handed to ``metrics``.
+    """
+
+    def __init__(self, exporters=(), metrics=None):
+        self.exporters = list(exporters)
+        self.metrics = metrics
+        self._traces = {}
+        self._llm_calls = {}
+        self._lock = threading.Lock()
+        self._installed = False
+        self._install_lock = threading.Lock()
+
+    def current(self) -> Span | None:
+        return _current.get()
+
+    @contextmanager
+    def span(self, name: str, kind_name: str = "internal", parent=None, kind: int = INTERNAL, **attributes):
+        parent = parent or _current.get()
+        span = Span(name, kind_name, parent.trace_id if parent else os.urandom(16).hex(), parent, kind, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, kind_name: str, parent: Span, start_ns: int, end_ns: int,
+               kind: int = CLIENT, error: str | None = None, **attributes):
+        span = Span(name, kind_name, parent.trace_id, parent, kind, attributes, start_ns)
+        span.end_ns = max(end_ns, start_ns)
+        span.error = error
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        if span.end_ns is None:
+            span.end_ns = time.time_ns()
+        if self.metrics is not None:
+            self.metrics.observe(span)
+        if not self.exporters:
+            return
+
+        with self._lock:
+            straggler = span.root.exported
+            if not straggler:
+                self._traces.setdefault(span.trace_id, []).append(span)
+        if straggler:
+            # Arrived after its trace was exported: send it on its own.
+            self._export([span])
+            return
+        if span.root is not span:
+            return
+        if self._installed:
+            # Let event handlers for this trace's last LLM/tool calls land first.
+            from crewai.events.event_bus import crewai_event_bus
+
+            crewai_event_bus.flush(timeout=2)
+        with self._lock:
+            spans = self._traces.pop(span.trace_id, [])
+            span.exported = True
+        self._export(spans)
+
+    def _export(self, spans: list[Span]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.warning("Trace export failed: %s", e)
+
+    def wrap(self, execute):
+        # Captures the caller's span: DAG worker threads do not inherit it.
+        parent = _current.get()
+
+        def traced(node, context):
+            agent = getattr(node.task, "agent", None)
+            with self.span(f"task {node.name}", "task", parent=parent, **{"task.name": node.name}) as span:
+                result = execute(node, context)
+                tokens = result.extra.get("tokens", {})
+                span.set(**{
+                    "agent.role": result.agent or getattr(agent, "role", None),
+                    "cache": result.extra.get("cache") or "none",
+                    "llm.model": result.extra.get("model"),
+                    "tokens.in": tokens.get("in"),
+                    "tokens.out": tokens.get("out"),
+                })
+                return result
+
+        return traced
+
+    # ---------- CREWAI EVENTS ----------
+    def install(self):
+        """Turn crewai LLM and tool events into spans under the current task.
+
+        Imports crewai, so it is called on first use; later calls are free.
+        """
+        if self._installed:
+            return
+        with self._install_lock:
+            if self._installed:
+                return
+            from crewai.events.event_bus import crewai_event_bus
+            from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent
+            from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageFinishedEvent
+
+            crewai_event_bus.register_handler(LLMCallStartedEvent, self._on_llm_event)
+            crewai_event_bus.register_handler(LLMCallCompletedEvent, self._on_llm_event)
+            crewai_event_bus.register_handler(LLMCallFailedEvent, self._on_llm_event)
+            crewai_event_bus.register_handler(ToolUsageFinishedEvent, self._on_tool_finished)
+            crewai_event_bus.register_handler(ToolUsageErrorEvent, self._on_tool_error)
+            self._installed = True
+
+    def _on_llm_event(self, source, event):
+        # Handlers run on a pool, so start and end can arrive in either order.
+        with self._lock:
+            call = self._llm_calls.setdefault(event.call_id, {})
+            if event.type == "llm_call_started":
+                call["start"] = event.timestamp
+                call["parent"] = _current.get()
+            else:
+                call["end"] = event
+            if "start" not in call or "end" not in call:
+                return
+            del self._llm_calls[event.call_id]
+
+        parent, end = call["parent"], call["end"]
+        if parent is None:
+            return
+        usage = getattr(end, "usage", None) or {}
+        model = end.model or ""
+        self.record(
+            f"llm {model}",
+            "llm",
+            parent,
+            int(call["start"].timestamp() * 1e9),
+            int(end.timestamp.timestamp() * 1e9),
+            error=getattr(end, "error", None),
+            **{
+                "llm.model": model,
+                "llm.provider": provider_of(model),
+                "llm.call_id": end.call_id,
+                "llm.tokens_in": usage.get("prompt_tokens", 0),
+                "llm.tokens_out": usage.get("completion_tokens", 0),
+                "llm.tokens_cached": cached_tokens(usage),
+            },
+        )
+
+    def _on_tool_finished(self, source, event):
+        parent = _current.get()
+        if parent is None:
+            return
+        self.record(
+            f"tool {event.tool_name}",
+            "tool",
+            parent,
+            int(event.started_at.timestamp() * 1e9),
+            int(event.finished_at.timestamp() * 1e9),
+            **{"tool.name": event.tool_name, "tool.cached": bool(event.from_cache)},
+        )
+
+    def _on_tool_error(self, source, event):
+        parent = _current.get()
+        if parent is None:
+            return
+        at = int(event.timestamp.timestamp() * 1e9)
+        self.record(f"tool {event.tool_name}", "tool", parent, at, at, error=str(event.error),
+                    **{"tool.name": event.tool_name})
+
+
+def build_exporters(jsonl_path: str | None = None, otlp_endpoint: str | None = None,
+                    service_name: str = "ai-trip-planner") -> list:
+    exporters = []
+    if jsonl_path:
+        exporters.append(JsonlExporter(jsonl_path))
+    if otlp_endpoint:
+        exporters.append(OtlpHttpExporter(otlp_endpoint, service_name))
+    return exporters
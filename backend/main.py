@@ -1,43 +1,194 @@
-from fastapi import FastAPI, HTTPException
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from crewai import Crew, LLM
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# ---------- IMPORT AGENTS & TASKS ----------
+# ---------- IMPORTS ----------
+# Agents and tasks (and with them crewai and crewai_tools) are imported on
+# first use; see AGENT_FACTORIES, TASK_FACTORIES and preload().
 try:
-    from backend.agents.destination_agent import create_destination_agent
-    from backend.agents.attraction_agent import create_attraction_agent
-    from backend.agents.budget_agent import create_budget_agent
-    from backend.agents.travels_trips_agent import create_travel_tips_agent
-    from backend.agents.itinerary_agent import create_itinerary_agent
-    from backend.agents.summary_agent import create_summary_agent
-
-    from backend.task.destination_task import create_destination_task
-    from backend.task.attraction_task import create_attraction_task
-    from backend.task.budget_task import create_budget_task
-    from backend.task.travels_tips_task import create_travel_tips_task
-    from backend.task.itinerary_ask import create_itinerary_task
-    from backend.task.summary_task import create_summary_task
+    from backend.core.dag import CONTEXT_DIVIDER, DagCancelled, TaskNode, context_entry, execute_task, run_dag
+    from backend.core.checkpoints import CANCELLED, DONE, FAILED, RUNNING, RunFailed, build_checkpoints, is_stale
+    from backend.core.tokens import TokenBudget
+    from backend.core.ratelimit import ProviderLimiter
+    from backend.core.router import ModelRouter
+    from backend.core.registry import LLM_CONFIGS, AgentRegistry, import_object
+    from backend.core.cache import build_cache, parse_ttls
+    from backend.core.itinerary import ChunkedItinerary, DayWindows
+    from backend.core.stopping import AnswerSpec, EarlyStop
+    from backend.core.streaming import stream_events, token_stream
+    from backend.core.jobs import JobQueue, MemoryJobStore, QueueFull, SharedJobStore
+    from backend.core.singleflight import SharedSingleFlight, SingleFlight, normalize_request, request_key
+    from backend.core.sessions import SessionStore, SharedSessionStore, affected_tasks, changed_fields
+    from backend.core.shared import build_shared_store
+    from backend.core.knowledge import ActiveRuns, KnowledgeStore, KnowledgeWarmer, build_knowledge, destination_key, place_key
+    from backend.core.plans import build_plans, etag_matches, pick_encoding, plan_id
+    from backend.core.embeddings import chunk_text
+    from backend.core.metrics import PlanMetrics
+    from backend.core.tracing import Tracer, build_exporters
 except ImportError:
-    from agents.destination_agent import create_destination_agent
-    from agents.attraction_agent import create_attraction_agent
-    from agents.budget_agent import create_budget_agent
-    from agents.travels_trips_agent import create_travel_tips_agent
-    from agents.itinerary_agent import create_itinerary_agent
-    from agents.summary_agent import create_summary_agent
-
-    from task.destination_task import create_destination_task
-    from task.attraction_task import create_attraction_task
-    from task.budget_task import create_budget_task
-    from task.travels_tips_task import create_travel_tips_task
-    from task.itinerary_ask import create_itinerary_task
-    from task.summary_task import create_summary_task
+    from core.dag import CONTEXT_DIVIDER, DagCancelled, TaskNode, context_entry, execute_task, run_dag
+    from core.checkpoints import CANCELLED, DONE, FAILED, RUNNING, RunFailed, build_checkpoints, is_stale
+    from core.tokens import TokenBudget
+    from core.ratelimit import ProviderLimiter
+    from core.router import ModelRouter
+    from core.registry import LLM_CONFIGS, AgentRegistry, import_object
+    from core.cache import build_cache, parse_ttls
+    from core.itinerary import ChunkedItinerary, DayWindows
+    from core.stopping import AnswerSpec, EarlyStop
+    from core.streaming import stream_events, token_stream
+    from core.jobs import JobQueue, MemoryJobStore, QueueFull, SharedJobStore
+    from core.singleflight import SharedSingleFlight, SingleFlight, normalize_request, request_key
+    from core.sessions import SessionStore, SharedSessionStore, affected_tasks, changed_fields
+    from core.shared import build_shared_store
+    from core.knowledge import ActiveRuns, KnowledgeStore, KnowledgeWarmer, build_knowledge, destination_key, place_key
+    from core.plans import build_plans, etag_matches, pick_encoding, plan_id
+    from core.embeddings import chunk_text
+    from core.metrics import PlanMetrics
+    from core.tracing import Tracer, build_exporters
+
+# Agents import their tools as top-level ``tools``; share the same index module.
+from tools.retrieval import semantic_index
+
+# ---------- AGENT REGISTRY ----------
+AGENT_FACTORIES = {
+    "destination": "agents.destination_agent:create_destination_agent",
+    "attractions": "agents.attraction_agent:create_attraction_agent",
+    "budget": "agents.budget_agent:create_budget_agent",
+    "tips": "agents.travels_trips_agent:create_travel_tips_agent",
+    "itinerary": "agents.itinerary_agent:create_itinerary_agent",
+    "summary": "agents.summary_agent:create_summary_agent",
+}
+
+TASK_FACTORIES = {
+    "destination": "task.destination_task:create_destination_task",
+    "attractions": "task.attraction_task:create_attraction_task",
+    "budget": "task.budget_task:create_budget_task",
+    "tips": "task.travels_tips_task:create_travel_tips_task",
+    "itinerary": "task.itinerary_ask:create_itinerary_task",
+    "itinerary_window": "task.itinerary_ask:create_itinerary_window_task",
+    "summary": "task.summary_task:create_summary_task",
+    "comparison": "task.comparison_task:create_comparison_task",
+}
+
+AGENT_MODELS = {
+    "destination": "llama",
+    "attractions": "llama",
+    "budget": "llama",
+    "tips": "llama",
+    "itinerary": "gemini",
+    "summary": "groq",
+}
+
+# Answers are streamed so EarlyStop (below) can end them once complete.
+EARLY_STOP = os.getenv("EARLY_STOP", "1") == "1"
+registry = AgentRegistry(
+    AGENT_FACTORIES,
+    AGENT_MODELS,
+    llm_configs={name: {**config, "stream": True} for name, config in LLM_CONFIGS.items()} if EARLY_STOP else None,
+)
+
+# ---------- SHARED STATE ----------
+# Several uvicorn workers share the LLM cache, single-flight leases, job status
+# and sessions through SHARED_STATE_URL: sqlite:///path/state.db for workers
+# on one host, redis://... across hosts. Unset keeps everything in process.
+shared_state = build_shared_store(os.getenv("SHARED_STATE_URL"))
+
+# ---------- LLM OUTPUT CACHE ----------
+# Set LLM_CACHE_PATH to a SQLite file to keep warm entries across restarts;
+# LLM_CACHE_DISK_ENTRIES caps its size (LLM_CACHE_MAX_ENTRIES caps memory).
+# LLM_CACHE_TTLS overrides the per-task TTLs, e.g. "itinerary=7200,summary=0".
+# Outputs are keyed on the model that wrote them; a lookup also accepts the
+# outputs of any model the router may pick for the task.
+llm_cache = build_cache(
+    path=os.getenv("LLM_CACHE_PATH"),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+    disk_entries=int(os.getenv("LLM_CACHE_DISK_ENTRIES", "10000")),
+    ttls=parse_ttls(os.getenv("LLM_CACHE_TTLS")),
+    shared=shared_state,
+    models=lambda node: [registry.llm_configs[model]["model"] for model in router.rank(node.name)],
+)
+
+# ---------- TOKEN BUDGET ----------
+# Upstream context is trimmed to each model's input budget, and every LLM
+# call (tool rounds included) is held to it; cache hits skip the LLM
+# entirely, so they report zero tokens.
+token_budget = TokenBudget()
+
+# ---------- RATE LIMITS ----------
+# One token bucket per provider shared by all requests; a rate-limited task
+# backs off (honouring Retry-After) and is retried on its own.
+limiter = ProviderLimiter(max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")))
+
+# ---------- MODEL ROUTING ----------
+# Each task goes to its preferred model unless that backend is unhealthy or
+# clearly slower than another allowed one; the summary is hedged.
+router = ModelRouter(registry)
+
+# ---------- CHECKPOINTS ----------
+# Every finished task is saved under the run id; a failed run can be resumed
+# and only re-executes what is missing. CHECKPOINT_PATH persists to SQLite;
+# otherwise, with SHARED_STATE_URL set, runs go to the shared store so every
+# worker can load and resume them.
+# Runs are deleted after CHECKPOINT_MAX_AGE; one still marked running that
+# has saved nothing for RUN_STALE_AFTER is taken as dead and can be resumed.
+checkpoints = build_checkpoints(
+    os.getenv("CHECKPOINT_PATH"),
+    max_age=float(os.getenv("CHECKPOINT_MAX_AGE", str(7 * 24 * 3600))),
+    shared=shared_state,
+)
+RUN_STALE_AFTER = float(os.getenv("RUN_STALE_AFTER", "900"))
+
+# ---------- TRACING ----------
+# Spans for every plan, task, tool call and LLM call. TRACE_JSONL_PATH appends
+# them to a local file as OTLP/JSON; OTEL_EXPORTER_OTLP_ENDPOINT sends them to
+# a collector. Latency histograms are served at /api/metrics either way.
+metrics = PlanMetrics()
+tracer = Tracer(
+    build_exporters(os.getenv("TRACE_JSONL_PATH"), os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")),
+    metrics=metrics,
+)
+
+# ---------- STARTUP ----------
+# Importing crewai and crewai_tools takes seconds, so the app starts without
+# them and preload() brings them in on a background thread: /api/health
+# answers at once, /api/ready once the first plan will not pay for imports.
+# A request that arrives earlier simply waits on the same imports.
+startup = {"started_at": time.time(), "ready": threading.Event(), "preload_seconds": None}
+
+
+def preload():
+    started = time.perf_counter()
+    registry.load()
+    for path in TASK_FACTORIES.values():
+        import_object(path)
+    tracer.install()
+    registry.warm_up()
+    startup["preload_seconds"] = round(time.perf_counter() - started, 3)
+    startup["ready"].set()
+
 
 # ---------- FASTAPI ----------
-app = FastAPI(title="AI Trip Planner API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=preload, name="preload", daemon=True).start()
+    await job_queue.start()
+    knowledge_warmer.start()
+    yield
+    knowledge_warmer.stop()
+    await job_queue.stop()
+
+app = FastAPI(title="AI Trip Planner API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +196,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Run-Id"],
 )
 
 # ---------- SCHEMAS ----------
@@ -58,54 +210,151 @@ class TripRequest(BaseModel):
 class AgentOutput(BaseModel):
     agent: str
     content: str
+    data: dict | None = None
+    reused: bool = False
+
+class TaskTiming(BaseModel):
+    agent: str
+    started: float
+    seconds: float
+    cache: str | None = None
+    model: str | None = None
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tokens_cached: int = 0
+    tokens_saved: int = 0
 
 class TripResponse(BaseModel):
     result: list[AgentOutput]
+    timings: list[TaskTiming] = []
+    total_seconds: float = 0.0
+    mode: str = "parallel"
+    coalesced: bool = False
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tokens_saved: int = 0
+    run_id: str | None = None
+    session_id: str | None = None
+    plan_id: str | None = None
+
+class CompareRequest(BaseModel):
+    destinations: list[str] = Field(min_length=2, max_length=5)
+    start_location: str
+    days: int
+    budget: str
+    style: str
+    itineraries: int = Field(default=1, ge=0, description="Itineraries for this many top-ranked candidates")
+
+class Candidate(BaseModel):
+    destination: str
+    rank: int
+    result: list[AgentOutput]
+    timings: list[TaskTiming] = []
+    itinerary: bool = False
+
+class CompareResponse(BaseModel):
+    candidates: list[Candidate]
+    summary: AgentOutput | None = None
+    total_seconds: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+# ---------- TASK GRAPH ----------
+# Only the itinerary and the summary read upstream output, so the first four
+# tasks run side by side. "sequential" keeps the old one-at-a-time behaviour.
+TASK_GRAPH = {
+    "destination": (),
+    "attractions": (),
+    "budget": (),
+    "tips": (),
+    "itinerary": ("attractions",),
+    "summary": ("destination", "attractions", "budget", "tips", "itinerary"),
+}
+
+# TripRequest fields each task reads directly. The destination fit sees the
+# full preference block; the summary only gets the destination plus upstream
+# output, so it reruns whenever anything upstream does.
+TASK_INPUTS = {
+    "destination": ("destination", "start_location", "days", "budget", "style"),
+    "attractions": ("destination",),
+    "budget": ("destination", "budget", "start_location"),
+    "tips": ("destination",),
+    "itinerary": ("destination", "days", "style"),
+    "summary": ("destination",),
+}
+
+EXECUTION_MODE = os.getenv("PLAN_EXECUTION_MODE", "parallel")
+
+# ---------- EARLY STOP ----------
+# JSON answers are cut as soon as they are complete: when the object closes,
+# or when a list reaches the most items the task asks for. A small sample of
+# calls runs without stopping to measure how many tokens that saves.
+ANSWER_SPECS = {
+    "destination": AnswerSpec(),
+    "attractions": AnswerSpec(limits={"attractions": 8}),
+    "budget": AnswerSpec(),
+    "tips": AnswerSpec(limits={"tips": 5}),
+    "itinerary": AnswerSpec(),
+}
+early_stop = EarlyStop(ANSWER_SPECS if EARLY_STOP else {}, sample=float(os.getenv("EARLY_STOP_SAMPLE", "0.05")))
+
+# ---------- ITINERARY WINDOWS ----------
+# Trips longer than ITINERARY_WINDOW_DAYS are planned as windows of about
+# that many days, side by side, each with its own share of the attractions;
+# the windows are stitched and checked for repeated attractions. Windows past
+# the provider's burst wait for the rate limiter rather than growing longer.
+ITINERARY_WINDOW_DAYS = int(os.getenv("ITINERARY_WINDOW_DAYS", "4"))
+chunker = ChunkedItinerary(max_workers=int(os.getenv("ITINERARY_MAX_WINDOWS", "8")))
 
 # ---------- HEALTH ----------
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
-# ---------- MAIN ENDPOINT ----------
-@app.post("/api/plan-trip", response_model=TripResponse)
-def plan_trip(request: TripRequest):
-    try:
-        
-        # GROQ (FAST, SHORT OUTPUT)
-        llm_groq = LLM(
-            model="groq/llama-3.1-8b-instant",
-            temperature=0.2,
-            
-        )
+@app.get("/api/ready")
+def ready():
+    if not startup["ready"].is_set():
+        raise HTTPException(status_code=503, detail="Loading agents and tools")
+    return {"status": "ready", "preload_seconds": startup["preload_seconds"]}
 
-        # GEMINI (REASONING)
-        llm_gemini =  LLM(
-    model="gemini/gemini-2.5-flash",
-    provider="litellm",
-    temperature=0.2,
-            # SMALL
-)
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-        # LOCAL LLAMA (LONG THINKING)
-        llm_llama = LLM(
-            model="ollama/llama3",
-            provider="litellm",
-            temperature=0.2,
-            
-        )
+@app.get("/api/cache/stats")
+def cache_stats():
+    from tools.web_tools import search_stats
+    from tools.scrape_tools import page_fetcher
+
+    return {**llm_cache.stats(), "search": dict(search_stats), "scrape": dict(page_fetcher.stats)}
 
+@app.get("/api/inflight/stats")
+def inflight_stats():
+    return inflight.stats()
 
-        # Agents
-        destination_agent = create_destination_agent(llm_llama)
-        attraction_agent  = create_attraction_agent(llm_llama)
-        budget_agent      = create_budget_agent(llm_llama)
-        tips_agent        = create_travel_tips_agent(llm_llama)
-        itinerary_agent   = create_itinerary_agent(llm_gemini)
-        summary_agent     = create_summary_agent(llm_groq)
+@app.get("/api/ratelimit/stats")
+def ratelimit_stats():
+    return limiter.stats()
 
-        # Tasks
-        user_preferences = f"""
+@app.get("/api/early-stop/stats")
+def early_stop_stats():
+    return early_stop.stats()
+
+@app.get("/api/router/stats")
+def router_stats():
+    return router.stats()
+
+@app.get("/api/semantic/stats")
+def semantic_stats():
+    return semantic_index.stats()
+
+@app.get("/api/knowledge/stats")
+def knowledge_stats():
+    return {**knowledge.stats(), "refreshed": knowledge_warmer.refreshed}
+
+# ---------- PLAN EXECUTION ----------
+def preferences_block(request: TripRequest) -> str:
+    return f"""
 Destination: {request.destination}
 Starting location: {request.start_location}
 Travel style: {request.style}
@@ -113,49 +362,573 @@ Budget: {request.budget}
 Trip duration: {request.days} days
 """
 
-        tasks = [
-            create_destination_task(destination_agent, request.destination, user_preferences),
-            create_attraction_task(attraction_agent, request.destination),
-            create_budget_task(budget_agent, request.destination, request.budget, request.start_location),
-            create_travel_tips_task(tips_agent, request.destination),
-            create_itinerary_task(itinerary_agent, request.destination, request.days, request.style),
-            create_summary_task(summary_agent, request.destination),
-        ]
-
-        crew = Crew(
-            agents=[
-                destination_agent,
-                attraction_agent,
-                budget_agent,
-                tips_agent,
-                itinerary_agent,
-                summary_agent
-            ],
-            tasks=tasks,
-            process="sequential",
-            verbose=False
+
+def build_nodes(request: TripRequest, agents: dict) -> list[TaskNode]:
+    user_preferences = preferences_block(request)
+
+    create = {name: import_object(TASK_FACTORIES[name]) for name in (*TASK_GRAPH, "itinerary_window")}
+    factories = {
+        "destination": lambda agent: create["destination"](agent, request.destination, user_preferences),
+        "attractions": lambda agent: create["attractions"](agent, request.destination),
+        "budget": lambda agent: create["budget"](agent, request.destination, request.budget, request.start_location),
+        "tips": lambda agent: create["tips"](agent, request.destination),
+        "itinerary": lambda agent: create["itinerary"](agent, request.destination, request.days, request.style),
+        "summary": lambda agent: create["summary"](agent, request.destination),
+    }
+
+    splits = {
+        "itinerary": DayWindows(
+            days=request.days,
+            size=ITINERARY_WINDOW_DAYS,
+            build=lambda agent, first, last, attractions, avoid, repeated, retry: create["itinerary_window"](
+                agent, request.destination, request.days, request.style, first, last, attractions, avoid, repeated,
+                retry,
+            ),
+            # Same LLM as the itinerary agent, so windows stream when it does.
+            agent=lambda: registry.factory("itinerary")(agents["itinerary"].llm),
+        ),
+    }
+
+    return [
+        TaskNode(
+            name=name,
+            task=factory(agents[name]),
+            depends_on=TASK_GRAPH[name],
+            factory=factory,
+            split=splits.get(name),
         )
+        for name, factory in factories.items()
+    ]
+
+
+def timing_entry(node_result) -> dict:
+    tokens = node_result.extra.get("tokens", {})
+    return {
+        "agent": node_result.agent,
+        "started": round(node_result.started_at, 3),
+        "seconds": round(node_result.seconds, 3),
+        "cache": node_result.extra.get("cache"),
+        "model": node_result.extra.get("model"),
+        "tokens_in": tokens.get("in", 0),
+        "tokens_out": tokens.get("out", 0),
+        "tokens_cached": tokens.get("cached", 0),
+        "tokens_saved": node_result.extra.get("early_stop", {}).get("tokens_saved", 0),
+    }
+
+
+def is_reused(node_result) -> bool:
+    return node_result.extra.get("cache") in ("session", "checkpoint", "knowledge", "similar")
+
+
+def section_entry(node_result) -> dict:
+    return {
+        "name": node_result.name,
+        "content": node_result.content,
+        "data": node_result.data,
+        "reused": is_reused(node_result),
+        **timing_entry(node_result),
+    }
+
 
-        result = crew.kickoff()
+# Plans running in this process, whatever started them (a request, a job, a
+# session rerun, a resume or a comparison); the knowledge warmer waits for none.
+active_runs = ActiveRuns()
 
-      
-        formatted = []
-        for i, task_output in enumerate(result.tasks_output):
-            content = task_output.raw
-            if content:
-                agent_name = (
-                    task_output.agent.role
-                    if hasattr(task_output.agent, "role")
-                    else f"Agent {i+1}"
-                )
-                formatted.append({
-                    "agent": agent_name,
-                    "content": content.strip()
-                })
 
+@active_runs.track
+def run_plan(nodes: list[TaskNode], request: TripRequest, on_complete=None, cancel=None, run_id=None, reuse=None) -> TripResponse:
+    resumed = checkpoints.load(run_id) if run_id else None
+    if resumed is None:
+        run_id = run_id or uuid.uuid4().hex
+        checkpoints.create(run_id, request.model_dump())
+        # Reused sections belong to this run too, so the next diff sees a complete plan.
+        for node_result in (reuse or {}).values():
+            checkpoints.save_output(run_id, node_result)
+    else:
+        checkpoints.finish(run_id, RUNNING)
 
+    def checkpointed(node_result):
+        checkpoints.save_output(run_id, node_result)
+        remember(request, node_result)
+        if on_complete:
+            on_complete(node_result)
+
+    max_workers = 1 if EXECUTION_MODE == "sequential" else None
+    tracer.install()
+    plan_attributes = {"plan.mode": EXECUTION_MODE, "plan.run_id": run_id, "plan.destination": request.destination}
+    with tracer.span("plan", "plan", **plan_attributes):
+        try:
+            results = run_dag(
+                nodes,
+                execute=tracer.wrap(chunker.wrap(llm_cache.wrap(router.wrap(limiter.wrap(token_budget.wrap(early_stop.wrap(execute_task))))))),
+                max_workers=max_workers,
+                on_complete=checkpointed,
+                cancel=cancel,
+                done=resumed["outputs"] if resumed else reuse,
+            )
+        except DagCancelled:
+            checkpoints.finish(run_id, CANCELLED)
+            raise
+        except Exception as e:
+            checkpoints.finish(run_id, FAILED, str(e))
+            raise RunFailed(run_id, str(e)) from e
+    checkpoints.finish(run_id, DONE)
+    if not all(is_reused(r) for r in results):
+        index_plan(run_id, request)
+
+    formatted = [
+        {"agent": r.agent, "content": r.content, "data": r.data, "reused": is_reused(r)}
+        for r in results
+        if r.content
+    ]
+    timings = [timing_entry(r) for r in results]
+    total = max((r.finished_at for r in results), default=0.0)
+
+    return TripResponse(
+        result=formatted,
+        timings=timings,
+        total_seconds=round(total, 3),
+        mode=EXECUTION_MODE,
+        tokens_in=sum(t["tokens_in"] for t in timings),
+        tokens_out=sum(t["tokens_out"] for t in timings),
+        tokens_saved=sum(t["tokens_saved"] for t in timings),
+        run_id=run_id,
+    )
+
+# ---------- SINGLE FLIGHT ----------
+# Identical requests arriving together share one crew run. Streaming callers
+# join the same run and receive its section events as they are published.
+# With shared state, callers on other workers wait for the leader's result.
+if shared_state is not None:
+    inflight = SharedSingleFlight(
+        shared_state,
+        encode=lambda response: response.model_dump(),
+        decode=lambda payload: TripResponse(**payload),
+        lease=int(os.getenv("SHARED_FLIGHT_LEASE", "600")),
+    )
+else:
+    inflight = SingleFlight()
+
+# ---------- SESSIONS ----------
+# A session remembers its latest complete run. Resubmitting with a tweaked
+# field only reruns the tasks that read it (and their dependents); the rest
+# is copied from that run and flagged as reused.
+sessions = SharedSessionStore(shared_state) if shared_state is not None else SessionStore()
+
+
+def session_outputs(session_id: str | None, request: TripRequest) -> dict:
+    run_id = sessions.get(session_id) if session_id else None
+    previous = checkpoints.load(run_id) if run_id else None
+    if previous is None or previous["status"] != DONE:
+        return {}
+
+    stale = affected_tasks(changed_fields(previous["request"], request.model_dump()), TASK_INPUTS, TASK_GRAPH)
+    reused = {}
+    for name, node_result in previous["outputs"].items():
+        if name in TASK_GRAPH and name not in stale:
+            node_result.extra["cache"] = "session"
+            reused[name] = node_result
+    return reused
+
+
+# ---------- DESTINATION KNOWLEDGE ----------
+# Attractions and tips only read the destination, so their output is kept per
+# destination and served from the store while fresh: no LLM or web tool calls.
+# Live results are written back, and the warmer refreshes the most requested
+# destinations (plus KNOWLEDGE_SEEDS) while the service is idle.
+KNOWLEDGE_TASKS = tuple(
+    name for name, fields in TASK_INPUTS.items() if set(fields) == {"destination"} and not TASK_GRAPH[name]
+)
+
+knowledge = build_knowledge(
+    os.getenv("KNOWLEDGE_PATH"),
+    max_age=float(os.getenv("KNOWLEDGE_MAX_AGE", str(7 * 24 * 3600))),
+    shared=shared_state,
+)
+
+
+def knowledge_outputs(request: TripRequest) -> dict:
+    knowledge.record_request(request.destination)
+    return knowledge.get(request.destination, KNOWLEDGE_TASKS)
+
+
+def produce_knowledge(destination: str) -> list:
+    request = TripRequest(destination=destination, start_location="", days=1, budget="", style="")
+    nodes = [node for node in build_nodes(request, registry.agents()) if node.name in KNOWLEDGE_TASKS]
+    return run_dag(nodes, execute=router.wrap(limiter.wrap(token_budget.wrap(early_stop.wrap(execute_task)))))
+
+
+knowledge_warmer = KnowledgeWarmer(
+    knowledge,
+    produce_knowledge,
+    KNOWLEDGE_TASKS,
+    top_n=int(os.getenv("KNOWLEDGE_TOP_N", "10")),
+    interval=float(os.getenv("KNOWLEDGE_WARM_INTERVAL", str(6 * 3600))),
+    seeds=[s.strip() for s in os.getenv("KNOWLEDGE_SEEDS", "").split(",") if s.strip()],
+    is_idle=lambda: len(active_runs) == 0 and job_queue.depth == 0,
+)
 
-        return TripResponse(result=formatted)
 
+# ---------- SEMANTIC REUSE ----------
+# Finished plans are indexed by destination. A new request whose destination
+# and origin name the same places ("Tokyo, Japan" / "japan tokyo") and whose
+# days, budget and style match is answered with that plan's sections. The
+# embedding only finds candidates: "Paris" and "Paris, Texas" score as high
+# as a respelling, so whole plans are never reused on similarity alone.
+# Research sections are also indexed in chunks so agents' searches can be
+# answered from them.
+PLAN_SIMILARITY = float(os.getenv("PLAN_SIMILARITY", "0.65"))
+INDEXED_TASKS = ("destination", "attractions", "budget", "tips")
+
+
+def exact_fields(request: TripRequest) -> dict:
+    return normalize_request({"days": request.days, "budget": request.budget, "style": request.style})
+
+
+def index_plan(run_id: str, request: TripRequest):
+    meta = {"run_id": run_id, "start_location": request.start_location, **exact_fields(request)}
+    semantic_index.add([request.destination], "plan", meta, key=run_id)
+
+
+def index_output(request: TripRequest, node_result):
+    if node_result.name in INDEXED_TASKS and node_result.content:
+        semantic_index.add(
+            chunk_text(node_result.content),
+            "output",
+            {"title": f"{node_result.agent}: {request.destination}", "task": node_result.name},
+            key=f"{destination_key(request.destination)}:{node_result.name}",
+        )
+
+
+def similar_outputs(request: TripRequest) -> dict:
+    wanted = exact_fields(request)
+    for match in semantic_index.search(request.destination, k=5, kinds=("plan",), min_score=PLAN_SIMILARITY):
+        meta = match.meta
+        if any(meta[field] != value for field, value in wanted.items()):
+            continue
+        if place_key(match.text) != place_key(request.destination):
+            continue
+        if place_key(meta["start_location"]) != place_key(request.start_location):
+            continue
+        previous = checkpoints.load(meta["run_id"])
+        if previous is None or previous["status"] != DONE or set(previous["outputs"]) < set(TASK_GRAPH):
+            continue
+        # Sections are reused like LLM cache entries: never for a task whose
+        # TTL is 0, and only while the plan is younger than the task's TTL.
+        age = time.time() - previous["updated_at"]
+        reused = {}
+        for name, node_result in previous["outputs"].items():
+            if age < llm_cache.ttls.get(name, 0):
+                node_result.extra["cache"] = "similar"
+                reused[name] = node_result
+        if reused:
+            return reused
+    return {}
+
+
+def remember(request: TripRequest, node_result):
+    # Freshly generated output feeds the knowledge store and the index.
+    if node_result.extra.get("cache") in (None, "miss"):
+        if node_result.name in KNOWLEDGE_TASKS:
+            knowledge.save(request.destination, node_result)
+        index_output(request, node_result)
+
+
+def prefilled_outputs(request: TripRequest, session_id: str | None = None) -> dict:
+    # A near-duplicate plan's sections win over what the knowledge store
+    # and the session can provide.
+    return {**knowledge_outputs(request), **session_outputs(session_id, request), **similar_outputs(request)}
+
+
+def execute_plan(request: TripRequest, publish, tokens: bool = False, session_id: str | None = None) -> TripResponse:
+    agents = registry.agents()
+    if tokens:
+        agents["itinerary"] = registry.agent("itinerary", stream=True)
+    nodes = build_nodes(request, agents)
+
+    def on_complete(node_result):
+        publish({"event": "section", **section_entry(node_result)})
+
+    streamed = {str(n.task.id): n.name for n in nodes if tokens and n.name == "itinerary"}
+    reuse = prefilled_outputs(request, session_id)
+    for node_result in reuse.values():
+        on_complete(node_result)
+
+    with token_stream(streamed, publish):
+        response = run_plan(nodes, request, on_complete=on_complete, reuse=reuse)
+    return store_plan(request, response)
+
+
+def plan_once(request: TripRequest, listener=None, tokens: bool = False, session_id: str | None = None) -> TripResponse:
+    session_id = session_id or uuid.uuid4().hex
+    response, shared = inflight.do(
+        request_key(request.model_dump(), tokens),
+        lambda publish: execute_plan(request, publish, tokens=tokens, session_id=session_id),
+        listener=listener,
+    )
+    sessions.save(session_id, response.run_id)
+    return response.model_copy(update={"coalesced": shared, "session_id": session_id})
+
+# ---------- MAIN ENDPOINT ----------
+@app.post("/api/plan-trip", response_model=TripResponse)
+def plan_trip(request: TripRequest, session_id: str | None = None):
+    try:
+        return plan_once(request, session_id=session_id)
+
+    except RunFailed as e:
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Run-Id": e.run_id})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ---------- STORED PLANS ----------
+# Finished plans are kept under an id derived from the normalized request and
+# the models that wrote it, so the same trip can be fetched again (repeat
+# views, shared links) without another run. GET answers 304 when the
+# client's ETag still matches, and sends brotli or gzip when accepted.
+plans = build_plans(
+    os.getenv("PLANS_PATH"),
+    max_age=float(os.getenv("PLANS_MAX_AGE", str(30 * 24 * 3600))),
+    max_plans=int(os.getenv("PLANS_MAX_ENTRIES", "10000")),
+    shared=shared_state,
+)
+
+
+def plan_models() -> dict:
+    return {task: registry.llm_configs[model]["model"] for task, model in sorted(AGENT_MODELS.items())}
+
+
+def store_plan(request: TripRequest, response: TripResponse) -> TripResponse:
+    response = response.model_copy(update={"plan_id": plan_id(request.model_dump(), plan_models())})
+    plans.save(response.plan_id, request.model_dump(), response.model_dump_json().encode("utf-8"))
+    return response
+
+
+@app.get("/api/plans/stats")
+def plan_stats():
+    return plans.stats()
+
+
+@app.get("/api/plans/{plan_id}", response_model=TripResponse)
+def get_plan(plan_id: str, if_none_match: str | None = Header(default=None),
+             accept_encoding: str | None = Header(default=None)):
+    plan = plans.get(plan_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    headers = {"ETag": plan["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, plan["etag"]):
+        plans.not_modified()
+        return Response(status_code=304, headers=headers)
+
+    encoding = pick_encoding(accept_encoding, [name for name in ("br", "gzip") if plan[name] is not None])
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=plan[encoding], media_type="application/json", headers=headers)
+
+
+# ---------- RESUME ----------
+@app.get("/api/runs/{run_id}")
+def get_run(run_id: str):
+    run = checkpoints.load(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {
+        "run_id": run_id,
+        "status": run["status"],
+        "error": run["error"],
+        "request": run["request"],
+        "completed": sorted(run["outputs"]),
+    }
+
+
+@app.post("/api/runs/{run_id}/resume", response_model=TripResponse)
+def resume_run(run_id: str):
+    run = checkpoints.load(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run["status"] == RUNNING and not is_stale(run, RUN_STALE_AFTER):
+        raise HTTPException(status_code=409, detail="Run is still in progress")
+
+    request = TripRequest(**run["request"])
+    try:
+        response = store_plan(request, run_plan(build_nodes(request, registry.agents()), request, run_id=run_id))
+    except RunFailed as e:
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Run-Id": e.run_id})
+    session_id = uuid.uuid4().hex
+    sessions.save(session_id, response.run_id)
+    return response.model_copy(update={"session_id": session_id})
+
+# ---------- STREAMING ENDPOINT ----------
+# NDJSON: one "section" event per agent as soon as it finishes, then "done".
+# With ?tokens=true the itinerary also streams "token" events while it writes.
+@app.post("/api/plan-trip/stream")
+def plan_trip_stream(request: TripRequest, tokens: bool = False, session_id: str | None = None):
+    def run(emit):
+        response = plan_once(request, listener=emit, tokens=tokens, session_id=session_id)
+        return response.model_dump(exclude={"result"})
+
+    return StreamingResponse(stream_events(run), media_type="application/x-ndjson")
+
+# ---------- JOB QUEUE ----------
+# Submit/poll API: plans run on a bounded worker pool instead of pinning a
+# request thread each, and a full queue answers 429 instead of piling up.
+# Jobs are not coalesced: each one can be cancelled on its own.
+def run_job(payload: dict, on_section, cancel_event) -> dict:
+    request = TripRequest(**payload)
+    reuse = prefilled_outputs(request)
+    for node_result in reuse.values():
+        on_section(section_entry(node_result))
+    response = run_plan(
+        build_nodes(request, registry.agents()),
+        request,
+        on_complete=lambda node_result: on_section(section_entry(node_result)),
+        cancel=cancel_event,
+        reuse=reuse,
+    )
+    return response.model_dump()
+
+
+job_queue = JobQueue(
+    run_job,
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_depth=int(os.getenv("JOB_QUEUE_DEPTH", "32")),
+    store=SharedJobStore(shared_state) if shared_state is not None else MemoryJobStore(),
+)
+
+
+@app.post("/api/trips", status_code=202)
+async def submit_trip(request: TripRequest):
+    # On the event loop, where the job queue lives; submitting does not block.
+    try:
+        job = job_queue.submit(request.model_dump())
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"id": job.id, "status": job.status}
+
+
+@app.get("/api/trips/{job_id}")
+def get_trip(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.delete("/api/trips/{job_id}")
+def cancel_trip(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+# ---------- COMPARISON ENDPOINT ----------
+# Several destinations for one origin, budget and trip length. Every
+# candidate gets the fit, attractions and budget tasks (from the knowledge
+# store, LLM cache or a similar plan when possible), all of them sharing
+# COMPARE_CONCURRENCY task slots. Only the best ranked candidates get an
+# itinerary, and a single summary call compares them all.
+COMPARE_TASKS = ("destination", "attractions", "budget")
+compare_slots = threading.BoundedSemaphore(int(os.getenv("COMPARE_CONCURRENCY", "6")))
+
+
+def capped(execute, slots):
+    def run(node, context):
+        with slots:
+            return execute(node, context)
+
+    return run
+
+
+def estimated_cost(budget: dict, days: int) -> float:
+    try:
+        mid = {name: (budget[name]["low"] + budget[name]["high"]) / 2 for name in budget if name != "currency"}
+        daily = mid["food_per_day"] + mid["local_transport_per_day"]
+        return mid["flights_round_trip"] + days * (mid["accommodation_per_night"] + daily)
+    except (KeyError, TypeError):
+        return float("inf")
+
+
+def rank_key(request: TripRequest, results: dict) -> tuple[float, float]:
+    # Better fit first (fits, more strengths, fewer limitations), then cheaper.
+    fit = results["destination"].data or {}
+    score = 2 * bool(fit.get("fits")) + len(fit.get("strengths", [])) - len(fit.get("limitations", []))
+    return -score, estimated_cost(results["budget"].data or {}, request.days)
+
+
+@active_runs.track
+def compare_destinations(compare: CompareRequest) -> CompareResponse:
+    requests, seen = [], set()
+    shared_fields = compare.model_dump(exclude={"destinations", "itineraries"})
+    for destination in compare.destinations:
+        if destination.strip() and destination_key(destination) not in seen:
+            seen.add(destination_key(destination))
+            requests.append(TripRequest(destination=destination.strip(), **shared_fields))
+    if len(requests) < 2:
+        raise HTTPException(status_code=422, detail="Give at least two different destinations")
+
+    tracer.install()
+    clock_start = time.perf_counter()
+    with tracer.span("compare", "plan", **{"plan.mode": "compare", "plan.candidates": len(requests)}):
+        execute = tracer.wrap(chunker.wrap(llm_cache.wrap(capped(router.wrap(limiter.wrap(token_budget.wrap(early_stop.wrap(execute_task)))), compare_slots))))
+
+        def research(request):
+            reuse = prefilled_outputs(request)
+            nodes = [n for n in build_nodes(request, registry.agents()) if n.name in COMPARE_TASKS]
+            results = run_dag(nodes, execute=execute, on_complete=lambda r: remember(request, r), done=reuse)
+            return {**reuse, **{r.name: r for r in results}}
+
+        def plan_days(request, results):
+            if "itinerary" not in results:
+                nodes = [n for n in build_nodes(request, registry.agents()) if n.name in ("attractions", "itinerary")]
+                results["itinerary"] = run_dag(nodes, execute=execute, done={"attractions": results["attractions"]})[-1]
+
+        with ThreadPoolExecutor(max_workers=len(requests), thread_name_prefix="compare") as pool:
+            outputs = list(pool.map(research, requests))
+            ranked = sorted(zip(requests, outputs), key=lambda pair: rank_key(*pair))
+            top = ranked[: compare.itineraries]
+            list(pool.map(lambda pair: plan_days(*pair), top))
+
+        # One block per candidate, best ranked first, in the compact form
+        # downstream tasks already get.
+        blocks = []
+        for rank, (request, results) in enumerate(ranked, start=1):
+            shown = [context_entry(results[n]) for n in (*COMPARE_TASKS, "itinerary") if n in results and results[n].content]
+            blocks.append(f"Candidate {rank}: {request.destination}\n" + "\n".join(shown))
+
+        def comparison_task(agent):
+            create = import_object(TASK_FACTORIES["comparison"])
+            return create(agent, [r.destination for r, _ in ranked], preferences_block(ranked[0][0]))
+
+        summary_node = TaskNode("summary", comparison_task(registry.agent("summary")), factory=comparison_task)
+        summary_started = time.perf_counter() - clock_start
+        summary = execute(summary_node, CONTEXT_DIVIDER.join(blocks))
+        summary.started_at, summary.finished_at = summary_started, time.perf_counter() - clock_start
+
+    candidates, timings = [], [timing_entry(summary)]
+    for rank, (request, results) in enumerate(ranked, start=1):
+        ordered = [results[n] for n in (*COMPARE_TASKS, "itinerary") if n in results]
+        entries = [timing_entry(r) for r in ordered]
+        timings += entries
+        candidates.append(Candidate(
+            destination=request.destination,
+            rank=rank,
+            result=[{"agent": r.agent, "content": r.content, "data": r.data, "reused": is_reused(r)} for r in ordered if r.content],
+            timings=entries,
+            itinerary="itinerary" in results,
+        ))
+    return CompareResponse(
+        candidates=candidates,
+        summary={"agent": summary.agent, "content": summary.content, "data": summary.data},
+        total_seconds=round(time.perf_counter() - clock_start, 3),
+        tokens_in=sum(t["tokens_in"] for t in timings),
+        tokens_out=sum(t["tokens_out"] for t in timings),
+    )
+
+
+@app.post("/api/compare", response_model=CompareResponse)
+def compare_trips(compare: CompareRequest):
+    try:
+        return compare_destinations(compare)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
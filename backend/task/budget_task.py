@@ -1,35 +1,28 @@
 from crewai import Task
+from task.prompts import build_prompt
+from task.schemas import BudgetBreakdown
 
 def create_budget_task(agent, destination: str, budget_range: str, user_location: str):
     return Task(
-        description=f"""
-        Destination: {destination}
-        Traveler origin: {user_location}
-        Budget preference: {budget_range}
+        description=build_prompt(
+            """
+            Estimate the trip cost to the destination below for the traveler below.
 
-        STRICT RULES:
-        - Use ONLY ONE currency according to the user location.
-        - Provide a clear budget breakdown for a trip to {destination}.
-        - make sure the budget aligns with the user's budget preference {budget_range}.
-        - Separate costs into:
-          Flights (round-trip estimate)
-          Accommodation (per night)
-          Food (per day)
-          Local transport (per day)
-        - Provide ranges, NOT exact numbers
-        - Do NOT exaggerate
-        -Do not ask question to user
-        -Destination: {destination}
-        -Traveler origin: {user_location}
-        -Budget preference: {budget_range}
-IMPORTANT OUTPUT RULES:
-- Do NOT include "Thought", "Action", or reasoning
-- Do NOT explain your role
-- Output ONLY the final answer
-- Do NOT mention websites or tools
-
-
-        """,
+            STRICT RULES:
+            - Use ONLY ONE currency according to the traveler origin.
+            - make sure the budget aligns with the user's budget preference.
+            - Estimate flights (round-trip), accommodation (per night),
+              food (per day) and local transport (per day).
+            - Provide ranges, NOT exact numbers
+            - Do NOT exaggerate
+            """,
+            {
+                "Destination": destination,
+                "Traveler origin": user_location,
+                "Budget preference": budget_range,
+            },
+        ),
         agent=agent,
-        expected_output="A clean budget breakdown with clear cost ranges."
+        expected_output="A budget breakdown with cost ranges in one currency.",
+        output_pydantic=BudgetBreakdown,
     )
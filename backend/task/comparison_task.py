@@ -0,0 +1,30 @@
+from crewai import Task
+from task.prompts import build_prompt
+
+def create_comparison_task(agent, destinations: list[str], user_preferences: str):
+    return Task(
+        description=build_prompt(
+            """
+            CONTEXT:
+            - Each candidate's fit analysis, attractions and budget are provided.
+            - Only the top candidates have an itinerary.
+
+            Your task:
+            - Compare ALL candidates in one markdown table:
+              destination, fit, highlights, estimated daily cost.
+            - Recommend ONE destination and explain why in 2-3 sentences.
+            - For the recommended destination, give a short itinerary overview.
+
+            STRICT RULES:
+            - Do NOT add new destinations.
+            - Do NOT add new information.
+            """,
+            {
+                "Candidate destinations (best ranked first)": ", ".join(destinations),
+                "User preferences": user_preferences,
+            },
+            rules=True,
+        ),
+        agent=agent,
+        expected_output="A comparison table of the candidates and one recommendation.",
+    )
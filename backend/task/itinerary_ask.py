@@ -1,47 +1,66 @@
+
 from crewai import Task
+from task.prompts import build_prompt
+from task.schemas import Itinerary
+
 def create_itinerary_task(agent, destination: str, days: int,style: str):
     return Task(
-        description=f"""
-        Destination: {destination}
-        Trip duration: {days} days
-        Travel style: {style}
-
-        CONTEXT:
-        - Attractions are already decided.
-        - Do NOT add new places.
-
-        TASK:
-        - Create a COMPLETE itinerary based on the travel style.
-        - Morning / Afternoon / Evening for EACH day.
-        - Use at most 2 attractions per day.
-        - Finish ALL {days} days.
-
-        STRICT RULES:
-        - DO NOT write thoughts.
-        - DO NOT explain anything.
-        - DO NOT stop early.
-        - You MUST return the full itinerary.
+        description=build_prompt(
+            """
+            CONTEXT:
+            - Attractions are already decided.
+            - Do NOT add new places.
 
-        OUTPUT FORMAT (MANDATORY):
-
-        Day 1:
-        Morning:
-        Afternoon:
-        Evening:
+            TASK:
+            - Create a COMPLETE itinerary based on the travel style.
+            - Morning / Afternoon / Evening for EACH day.
+            - Use at most 2 attractions per day.
+            - Finish EVERY day of the trip duration.
+            """,
+            {"Destination": destination, "Trip duration": f"{days} days", "Travel style": style},
+        ),
+        agent=agent,
+        expected_output="A day-wise itinerary covering every day of the trip.",
+        output_pydantic=Itinerary,
+    )
 
-        Day 2:
-        Morning:
-        Afternoon:
-        Evening:
-        IMPORTANT OUTPUT RULES:
-- Do NOT include "Thought", "Action", or reasoning
-- Do NOT explain your role
-- Output ONLY the final answer
-- Do NOT mention websites or tools
 
+def create_itinerary_window_task(agent, destination: str, days: int, style: str, first_day: int, last_day: int,
+                                 attractions: list[str], avoid: list[str] = (), repeated: list[str] = (),
+                                 retry: bool = False):
+    # One window of a long trip; the windows are planned side by side.
+    fields = {
+        "Destination": destination,
+        "Trip duration": f"{days} days",
+        "Travel style": style,
+        "Days to plan": f"{last_day - first_day + 1} (day {first_day} to day {last_day})",
+        "Attractions for these days": ", ".join(attractions) or "none",
+    }
+    if avoid:
+        fields["Do NOT visit"] = ", ".join(avoid)
+    if repeated:
+        fields["Visit on ONE day only"] = ", ".join(repeated)
+    if retry:
+        fields["Note"] = "Your previous answer was incomplete or repeated places; follow the rules exactly."
+    return Task(
+        description=build_prompt(
+            """
+            CONTEXT:
+            - You plan one part of a longer trip; other days are planned separately.
+            - Use each of the attractions for these days ONCE.
+            - With no attractions, plan neighbourhood walks, local food, markets and rest.
+            - Do NOT visit places listed under "Do NOT visit" (planned on other days).
+            - Do NOT add new named attractions.
 
-        """,
+            TASK:
+            - Plan ONLY the days to plan, numbered with their day numbers in the trip.
+            - Morning / Afternoon / Evening for EACH day.
+            - Use at most 2 attractions per day.
+            - Return EXACTLY as many days as the days to plan.
+            """,
+            fields,
+        ),
         agent=agent,
-        expected_output="A complete day-wise itinerary for all days."
+        expected_output="A day-wise itinerary for the days to plan.",
+        output_pydantic=Itinerary,
     )
-
@@ -0,0 +1,37 @@
+import os
+from textwrap import dedent
+
+# Task descriptions are laid out static-first: each task's instructions (plus
+# the output rules, for free-text tasks) come first, byte-identical for every
+# request, and the request's own fields come last. Gemini and Groq cache
+# prompt prefixes they have seen recently, and Ollama keeps the KV cache of
+# the previous prompt, so only the tail after the first differing byte is
+# processed again. "fields-first" is the old order, kept for bench.prefix.
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "static-first")
+
+OUTPUT_RULES = """IMPORTANT OUTPUT RULES:
+- Do NOT include "Thought", "Action", or reasoning
+- Do NOT explain your role
+- Do NOT ask the user questions
+- Output ONLY the final answer"""
+
+
+def build_prompt(instructions: str, fields: dict, rules: bool = False) -> str:
+    """Task description from static ``instructions`` and per-request ``fields``.
+
+    Nothing request-specific may go into ``instructions``; refer to the
+    fields by name ("the budget preference below") instead. ``rules`` adds
+    ``OUTPUT_RULES``, for free-text tasks only: tasks with ``output_pydantic``
+    get their shape from the model.
+    """
+    static = dedent(instructions).strip()
+    if rules:
+        static = f"{static}\n\n{OUTPUT_RULES}"
+    lines = []
+    for name, value in fields.items():
+        value = dedent(str(value)).strip()
+        lines.append(f"{name}:\n{value}" if "\n" in value else f"{name}: {value}")
+    request = "\n".join(lines)
+    if PROMPT_LAYOUT == "fields-first":
+        return f"{request}\n\n{static}"
+    return f"{static}\n\nREQUEST:\n{request}"
@@ -0,0 +1,97 @@
+from pydantic import BaseModel, Field
+
+# Compact typed outputs for each task. Downstream tasks receive these as
+# JSON instead of prose; to_markdown() is what the user sees.
+
+
+# ---------- DESTINATION ----------
+class Limitation(BaseModel):
+    issue: str
+    mitigation: str
+
+
+class DestinationFit(BaseModel):
+    fits: bool = Field(description="Whether the destination suits the traveler")
+    strengths: list[str] = Field(description="2-3 strengths")
+    limitations: list[Limitation] = Field(default_factory=list, description="0-2 limitations")
+
+    def to_markdown(self) -> str:
+        lines = ["**Good fit**" if self.fits else "**Possible fit, with caveats**", "", "Strengths:"]
+        lines += [f"- {s}" for s in self.strengths]
+        if self.limitations:
+            lines += ["", "Limitations:"]
+            lines += [f"- {l.issue} ({l.mitigation})" for l in self.limitations]
+        return "\n".join(lines)
+
+
+# ---------- ATTRACTIONS ----------
+class Attraction(BaseModel):
+    name: str
+    description: str = Field(description="One line")
+
+
+class AttractionList(BaseModel):
+    attractions: list[Attraction] = Field(description="6-8 attractions")
+
+    def to_markdown(self) -> str:
+        return "\n".join(f"• {a.name} – {a.description}" for a in self.attractions)
+
+
+# ---------- BUDGET ----------
+class CostRange(BaseModel):
+    low: float
+    high: float
+
+    def __str__(self) -> str:
+        return f"{self.low:,.0f}–{self.high:,.0f}"
+
+
+class BudgetBreakdown(BaseModel):
+    currency: str = Field(description="ISO code matching the traveler's origin")
+    flights_round_trip: CostRange
+    accommodation_per_night: CostRange
+    food_per_day: CostRange
+    local_transport_per_day: CostRange
+
+    def to_markdown(self) -> str:
+        c = self.currency
+        return "\n".join([
+            f"- Flights (round-trip): {self.flights_round_trip} {c}",
+            f"- Accommodation (per night): {self.accommodation_per_night} {c}",
+            f"- Food (per day): {self.food_per_day} {c}",
+            f"- Local transport (per day): {self.local_transport_per_day} {c}",
+        ])
+
+
+# ---------- TRAVEL TIPS ----------
+class Tip(BaseModel):
+    tip: str
+    source_url: str | None = None
+
+
+class TravelTips(BaseModel):
+    tips: list[Tip] = Field(description="Exactly 5 tips")
+
+    def to_markdown(self) -> str:
+        return "\n".join(
+            f"- {t.tip}" + (f" ([source]({t.source_url}))" if t.source_url else "")
+            for t in self.tips
+        )
+
+
+# ---------- ITINERARY ----------
+class DayPlan(BaseModel):
+    day: int
+    morning: str
+    afternoon: str
+    evening: str
+
+
+class Itinerary(BaseModel):
+    days: list[DayPlan]
+
+    def to_markdown(self) -> str:
+        return "\n\n".join(
+            f"Day {d.day}:\nMorning: {d.morning}\nAfternoon: {d.afternoon}\nEvening: {d.evening}"
+            for d in self.days
+        )
@@ -1,25 +1,22 @@
 from crewai import Task
+from task.prompts import build_prompt
+from task.schemas import TravelTips
 
 def create_travel_tips_task(agent, destination: str):
     return Task(
-        description=f"""
-        Destination: {destination}
-
-        Your task:
-        - Search the web for travel tips and common mistakes.
-        - Prioritize reputable travel blogs and video descriptions.
-        - Extract practical advice only.
-        - Limit output to 5 bullet points.
-        IMPORTANT OUTPUT RULES:
-- Do NOT include "Thought", "Action", or reasoning
-- Do NOT explain your role
-- Output ONLY the final answer
-- Do NOT mention websites or tools
-
-
-        """,
+        description=build_prompt(
+            """
+            Your task:
+            - Search the web for travel tips and common mistakes for the destination below.
+            - Prioritize reputable travel blogs and video descriptions.
+            - Extract practical advice only.
+            - Limit output to 5 tips, each with its source url.
+            """,
+            {"Destination": destination},
+        ),
         agent=agent,
         expected_output="""
         A list of 5 practical travel tips also provide the source url.
-        """
+        """,
+        output_pydantic=TravelTips,
     )
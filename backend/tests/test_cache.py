@@ -0,0 +1,95 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.cache import LLMCache, MemoryCache, SQLiteCache, TieredCache, build_cache, parse_ttls
+from core.dag import NodeResult, TaskNode
+
+
+def node(name="itinerary", model="gemini/gemini-2.5-flash"):
+    agent = SimpleNamespace(role="Planner", llm=SimpleNamespace(model=model))
+    return TaskNode(name, task=SimpleNamespace(agent=agent, description="Plan 3 days in Lisbon"))
+
+
+def answering(content="plan", model_id=None):
+    calls = []
+
+    def execute(n, context):
+        calls.append(n.name)
+        extra = {"model_id": model_id} if model_id else {}
+        return NodeResult(name=n.name, agent="Planner", content=content, extra=extra)
+
+    execute.calls = calls
+    return execute
+
+
+def test_parse_ttls_overrides_defaults():
+    ttls = parse_ttls(" itinerary=7200, summary=0 ,", {"itinerary": 3600, "tips": 60})
+
+    assert ttls == {"itinerary": 7200.0, "tips": 60, "summary": 0.0}
+    assert parse_ttls(None)["attractions"] == 7 * 24 * 3600
+    with pytest.raises(ValueError):
+        parse_ttls("itinerary")
+
+
+def test_memory_cache_evicts_least_recently_used_and_expired():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", {"v": 1}, 60)
+    cache.set("b", {"v": 2}, 60)
+    cache.get("a")
+    cache.set("c", {"v": 3}, 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+
+    cache.set("old", {"v": 4}, -1)
+    assert cache.get("old") is None
+
+
+def test_tiered_cache_promotes_disk_hits_with_their_remaining_ttl(tmp_path):
+    back = SQLiteCache(str(tmp_path / "cache.db"))
+    back.set("key", {"v": 1}, 60)
+    cache = TieredCache(MemoryCache(), back)
+
+    assert cache.get("key") == {"v": 1}
+    value, expires_at = cache.front._data["key"]
+    assert expires_at == pytest.approx(time.time() + 60, abs=2)
+
+
+def test_disk_tier_size_is_configurable(tmp_path):
+    cache = build_cache(path=str(tmp_path / "cache.db"), max_entries=10, disk_entries=3)
+    for i in range(5):
+        cache.backend.set(f"k{i}", {"v": i}, 60)
+
+    assert len(cache.backend) == 3
+    assert cache.backend.back.max_entries == 3
+
+
+def test_zero_ttl_skips_the_cache():
+    cache = LLMCache(ttls={"summary": 0})
+    execute = answering()
+    wrapped = cache.wrap(execute)
+
+    wrapped(node("summary"), None)
+    wrapped(node("summary"), None)
+
+    assert execute.calls == ["summary", "summary"]
+    assert len(cache.backend) == 0
+
+
+def test_outputs_are_keyed_on_the_model_that_served_them():
+    fallback = "groq/llama-3.1-8b-instant"
+    cache = LLMCache(ttls={"itinerary": 60})
+    cache.wrap(answering(model_id=fallback))(node(), "ctx")
+
+    assert cache.backend.get(cache.key_for(node(), "ctx", fallback)) is not None
+    assert cache.backend.get(cache.key_for(node(), "ctx")) is None
+
+    # The fallback's output answers a lookup only when the router may pick it,
+    # and the context still has to match.
+    routed = LLMCache(cache.backend, ttls={"itinerary": 60}, models=lambda n: [fallback])
+    hit = routed.wrap(answering("fresh"))(node(), "ctx")
+    assert (hit.content, hit.extra) == ("plan", {"cache": "hit"})
+    assert routed.wrap(answering("fresh"))(node(), "other").content == "fresh"
+    assert cache.wrap(answering("fresh"))(node(), "ctx").content == "fresh"
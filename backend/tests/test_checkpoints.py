@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from core.checkpoints import (
+    DONE, FAILED, RUNNING, MemoryCheckpointStore, SharedCheckpointStore, SQLiteCheckpointStore, is_stale,
+)
+from core.dag import NodeResult
+from core.shared import MemoryKV
+
+
+@pytest.fixture(params=["memory", "sqlite", "shared"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCheckpointStore()
+    if request.param == "shared":
+        return SharedCheckpointStore(MemoryKV())
+    return SQLiteCheckpointStore(str(tmp_path / "runs.db"))
+
+
+def test_outputs_are_restored_as_checkpoint_results(store):
+    store.create("run", {"destination": "Lisbon"})
+    store.save_output("run", NodeResult("budget", "a", "cheap", data={"total": 1}, extra={"cache": "miss", "model": "llama"}))
+    store.finish("run", FAILED, "provider down")
+
+    run = store.load("run")
+
+    assert (run["status"], run["error"], run["request"]) == (FAILED, "provider down", {"destination": "Lisbon"})
+    budget = run["outputs"]["budget"]
+    assert (budget.content, budget.data) == ("cheap", {"total": 1})
+    assert budget.extra == {"model": "llama", "cache": "checkpoint"}
+    assert store.load("missing") is None
+
+
+def test_creating_a_run_starts_it_afresh(store):
+    store.create("run", {})
+    store.save_output("run", NodeResult("budget", "a", "cheap"))
+    store.finish("run", FAILED, "boom")
+    store.create("run", {"days": 2})
+
+    run = store.load("run")
+
+    assert (run["status"], run["error"], run["request"], run["outputs"]) == (RUNNING, None, {"days": 2}, {})
+
+
+def test_old_runs_are_pruned(tmp_path):
+    memory = MemoryCheckpointStore(max_age=0.05)
+    sqlite = SQLiteCheckpointStore(str(tmp_path / "runs.db"), max_age=0.05, prune_interval=0)
+    for store in (memory, sqlite):
+        store.create("old", {})
+        store.save_output("old", NodeResult("budget", "a", "cheap"))
+    time.sleep(0.1)
+    for store in (memory, sqlite):
+        store.create("new", {})
+
+    assert memory.load("old") is None and sqlite.load("old") is None
+    assert sqlite._conn.execute("SELECT COUNT(*) FROM run_outputs").fetchone()[0] == 0
+    assert memory.load("new") and sqlite.load("new")
+
+
+def test_only_silent_running_runs_are_stale():
+    now = time.time()
+
+    assert is_stale({"status": RUNNING, "updated_at": now - 60}, stale_after=30)
+    assert not is_stale({"status": RUNNING, "updated_at": now}, stale_after=30)
+    assert not is_stale({"status": DONE, "updated_at": now - 60}, stale_after=30)
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from core.dag import CONTEXT_DIVIDER, DagCancelled, NodeResult, TaskNode, run_dag, topological_order
+
+
+def node(name, *deps):
+    return TaskNode(name, task=None, depends_on=deps)
+
+
+def recorder(seconds=0.0, log=None):
+    def execute(n, context):
+        if log is not None:
+            log.append((n.name, context))
+        time.sleep(seconds)
+        return NodeResult(name=n.name, agent="agent", content=f"{n.name} done")
+
+    return execute
+
+
+def test_topological_order_rejects_cycles_and_unknown_dependencies():
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order([node("a", "b"), node("b", "a")])
+    with pytest.raises(ValueError, match="unknown task"):
+        topological_order([node("a", "missing")])
+    with pytest.raises(ValueError, match="Duplicate"):
+        topological_order([node("a"), node("a")])
+
+
+def test_results_keep_declared_order_and_dependencies_get_context():
+    log = []
+    results = run_dag([node("summary", "a", "b"), node("a"), node("b")], execute=recorder(log=log))
+
+    assert [r.name for r in results] == ["summary", "a", "b"]
+    contexts = dict(log)
+    assert contexts["a"] is None
+    assert contexts["summary"].split(CONTEXT_DIVIDER) == ["a done", "b done"]
+
+
+def test_independent_nodes_run_in_parallel():
+    results = run_dag([node(str(i)) for i in range(4)], execute=recorder(seconds=0.2))
+
+    assert max(r.finished_at for r in results) < 0.5
+    assert all(r.seconds >= 0.2 for r in results)
+
+
+def test_done_results_are_reused_and_not_run_again():
+    log = []
+    done = {"a": NodeResult(name="a", agent="agent", content="saved")}
+    results = run_dag([node("a"), node("b", "a")], execute=recorder(log=log), done=done)
+
+    assert [name for name, _ in log] == ["b"]
+    assert results[0].content == "saved"
+    assert dict(log)["b"] == "saved"
+
+
+def test_cancel_stops_scheduling_new_nodes():
+    cancel = threading.Event()
+    log = []
+
+    def execute(n, context):
+        log.append(n.name)
+        cancel.set()
+        return NodeResult(name=n.name, agent="agent", content="")
+
+    with pytest.raises(DagCancelled):
+        run_dag([node("a"), node("b", "a")], execute=execute, cancel=cancel)
+    assert log == ["a"]
+
+
+def test_failures_propagate():
+    def execute(n, context):
+        raise RuntimeError(f"{n.name} failed")
+
+    with pytest.raises(RuntimeError, match="a failed"):
+        run_dag([node("a")], execute=execute)
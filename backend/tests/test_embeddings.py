@@ -0,0 +1,60 @@
+import numpy as np
+
+from core.embeddings import HashingEmbedder, VectorIndex, chunk_text
+
+
+def test_hashing_embeddings_are_normalised_and_stable():
+    vectors = HashingEmbedder().embed(["Tokyo, Japan", "Tokyo, Japan", ""])
+
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+
+def test_respellings_score_higher_than_other_places():
+    index = VectorIndex()
+
+    assert index.similarity("Tokyo, Japan", "japan tokyo") > index.similarity("Tokyo, Japan", "Lisbon, Portugal")
+
+
+def test_chunks_respect_paragraphs_and_size():
+    text = "First paragraph.\n\nSecond   paragraph\nwraps.\n\n" + "word " * 400
+
+    chunks = chunk_text(text, max_chars=200)
+
+    assert chunks[0] == "First paragraph. Second paragraph wraps."
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks[1:]).split() == ["word"] * 400
+
+
+def test_search_filters_by_kind_and_score_and_readding_a_key_replaces_it():
+    index = VectorIndex()
+    index.add(["Lisbon trams and viewpoints"], "output", {"task": "attractions"}, key="lisbon")
+    index.add(["Lisbon"], "plan", {"run_id": "1"}, key="run-1")
+    index.add(["Lisbon tram 28 and miradouros"], "output", {"task": "attractions"}, key="lisbon")
+
+    matches = index.search("lisbon trams", kinds=("output",))
+    assert [m.text for m in matches] == ["Lisbon tram 28 and miradouros"]
+    assert index.contains("plan", "run-1") and len(index) == 2
+    assert index.search("lisbon trams", min_score=0.99) == []
+
+
+def test_oldest_items_are_dropped_past_the_limit():
+    index = VectorIndex(max_items=3)
+    for i in range(5):
+        index.add([f"city number {i}"], "plan", key=str(i))
+
+    assert len(index) == 3
+    assert not index.contains("plan", "0") and index.contains("plan", "4")
+
+
+def test_clustered_search_still_finds_the_exact_item():
+    index = VectorIndex(ann_threshold=50, nprobe=4)
+    rng = np.random.default_rng(1)
+    words = ["harbour", "castle", "market", "museum", "garden", "bridge", "temple", "beach"]
+    for i in range(200):
+        index.add([" ".join(rng.choice(words, 4)) + f" place{i}"], "page", key=str(i))
+    index.add(["Sintra palace day trip"], "page", key="sintra")
+
+    assert index.stats()["ann"]
+    assert index.search("Sintra palace day trip", k=1)[0].text == "Sintra palace day trip"
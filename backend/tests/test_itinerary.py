@@ -0,0 +1,102 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from core.dag import CONTEXT_DIVIDER, NodeResult, TaskNode
+from core.itinerary import (
+    ChunkedItinerary, DayWindows, IncompleteItinerary, assign_attractions, attraction_names, day_windows, find_repeats,
+)
+from task.schemas import Itinerary
+
+
+def day(morning="", afternoon="", evening=""):
+    return {"morning": morning, "afternoon": afternoon, "evening": evening}
+
+
+def test_day_windows_are_evenly_sized_and_cover_the_trip():
+    assert day_windows(10, 4) == [(1, 4), (5, 7), (8, 10)]
+    assert day_windows(4, 4) == [(1, 4)]
+    assert day_windows(30, 15) == [(1, 15), (16, 30)]
+    for days in range(1, 40):
+        windows = day_windows(days, 4)
+        assert windows[0][0] == 1 and windows[-1][1] == days
+        assert all(b[0] == a[1] + 1 for a, b in zip(windows, windows[1:]))
+
+
+def test_attraction_names_from_json_and_bullets():
+    context = CONTEXT_DIVIDER.join([
+        "attractions: " + json.dumps({"attractions": [{"name": "Louvre"}, {"name": "Orsay"}]}),
+        "- Louvre – again\n* Sainte-Chapelle\n2. Pantheon",
+    ])
+
+    assert attraction_names(context) == ["Louvre", "Orsay", "Sainte-Chapelle", "Pantheon"]
+
+
+def test_attractions_are_spread_over_the_windows():
+    shares = assign_attractions(list("abcdef"), [(1, 3), (4, 6)])
+
+    assert shares == [["a", "b", "c"], ["d", "e", "f"]]
+
+
+def test_find_repeats_reports_every_day():
+    plans = [{"day": 1, **day("Louvre")}, {"day": 2, **day(evening="louvre at night")}, {"day": 3, **day("Orsay")}]
+
+    assert find_repeats(plans, ["Louvre", "Orsay"]) == {"Louvre": [1, 2]}
+
+
+def test_needs_retry_asks_other_windows_to_avoid_and_the_owner_to_visit_once():
+    windows = [(1, 2), (3, 4)]
+    shares = [["Louvre"], ["Orsay"]]
+    results = [
+        NodeResult("itinerary", "a", "", data={"days": [day("Louvre"), day("Louvre")]}),
+        NodeResult("itinerary", "a", "", data={"days": [day("Orsay"), day("Louvre")]}),
+    ]
+    avoid, repeated = [[], []], [[], []]
+
+    retry = ChunkedItinerary()._needs_retry(results, windows, shares, ["Louvre", "Orsay"], avoid, repeated)
+
+    assert retry == [0, 1]
+    assert avoid == [[], ["Louvre"]]
+    assert repeated == [["Louvre"], []]
+
+
+def test_missing_days_are_retried():
+    results = [NodeResult("itinerary", "a", "", data={"days": [day("x")]})]
+
+    assert ChunkedItinerary()._needs_retry(results, [(1, 2)], [[]], [], [[]], [[]]) == [0]
+
+
+def long_trip(days, fill):
+    """A chunked itinerary node whose windows return ``fill(first, last)`` days."""
+    build = lambda agent, first, last, *rest: SimpleNamespace(id=uuid.uuid4(), window=(first, last))
+    spec = DayWindows(days=days, size=15, build=build, agent=lambda: None)
+    windows = []
+
+    def execute(node, context):
+        first, last = node.task.window
+        windows.append((first, last))
+        return NodeResult("itinerary", "a", "", data={"days": fill(first, last)})
+
+    node = TaskNode("itinerary", SimpleNamespace(id=uuid.uuid4(), output_pydantic=Itinerary), split=spec)
+    return ChunkedItinerary().wrap(execute), node, windows
+
+
+def test_a_30_day_trip_is_planned_in_short_windows():
+    run, node, windows = long_trip(30, lambda first, last: [day(f"Day {d}") for d in range(first, last + 1)])
+
+    result = run(node, None)
+
+    assert all(last - first + 1 <= 5 for first, last in windows)
+    assert len(result.data["days"]) == 30
+    assert result.extra["chunks"] == len(windows) == 6
+
+
+def test_days_still_missing_after_the_retry_raise():
+    run, node, windows = long_trip(10, lambda first, last: [day("x")] * min(2, last - first + 1))
+
+    with pytest.raises(IncompleteItinerary) as error:
+        run(node, None)
+
+    assert error.value.missing_days == [3, 4, 5, 8, 9, 10]
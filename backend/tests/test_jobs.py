@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.dag import DagCancelled
+from core.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, Job, JobQueue, QueueFull, SharedJobStore
+from core.shared import MemoryKV
+
+
+async def until(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_jobs_run_and_report_sections():
+    def runner(request, on_section, cancel):
+        on_section({"name": "destination"})
+        return {"plan": request["destination"]}
+
+    async def main():
+        queue = JobQueue(runner, workers=1)
+        await queue.start()
+        job = queue.submit({"destination": "Lisbon"})
+        await until(lambda: queue.get(job.id).finished)
+        await queue.stop()
+        return queue.get(job.id)
+
+    job = asyncio.run(main())
+
+    assert job.status == DONE
+    assert job.result == {"plan": "Lisbon"}
+    assert job.sections == [{"name": "destination"}]
+
+
+def test_failures_are_recorded():
+    def runner(request, on_section, cancel):
+        raise RuntimeError("provider down")
+
+    async def main():
+        queue = JobQueue(runner, workers=1)
+        await queue.start()
+        job = queue.submit({})
+        await until(lambda: queue.get(job.id).finished)
+        await queue.stop()
+        return queue.get(job.id)
+
+    job = asyncio.run(main())
+
+    assert (job.status, job.error) == (FAILED, "provider down")
+
+
+def test_full_queue_refuses_and_cancelled_jobs_free_their_place():
+    release = threading.Event()
+
+    def runner(request, on_section, cancel):
+        release.wait(2)
+        return {}
+
+    async def main():
+        queue = JobQueue(runner, workers=1, max_depth=2)
+        await queue.start()
+        running = queue.submit({"n": 0})
+        await until(lambda: queue.get(running.id).status != QUEUED)
+        waiting = [queue.submit({"n": 1}), queue.submit({"n": 2})]
+        with pytest.raises(QueueFull):
+            queue.submit({"n": 3})
+
+        assert queue.cancel(waiting[0].id).status == CANCELLED
+        assert queue.depth == 1
+        late = queue.submit({"n": 3})
+
+        release.set()
+        await until(lambda: queue.get(late.id).finished)
+        await queue.stop()
+        return [queue.get(job.id).status for job in [running, *waiting, late]]
+
+    assert asyncio.run(main()) == [DONE, CANCELLED, DONE, DONE]
+
+
+def test_cancelling_a_running_job_sets_its_event():
+    def runner(request, on_section, cancel):
+        cancel.wait(2)
+        raise DagCancelled("Run cancelled")
+
+    async def main():
+        queue = JobQueue(runner, workers=1)
+        await queue.start()
+        job = queue.submit({})
+        await until(lambda: queue.get(job.id).status != QUEUED)
+        queue.cancel(job.id)
+        await until(lambda: queue.get(job.id).finished)
+        await queue.stop()
+        return queue.get(job.id)
+
+    assert asyncio.run(main()).status == CANCELLED
+
+
+def test_submit_needs_a_running_queue():
+    with pytest.raises(RuntimeError):
+        JobQueue(lambda *a: {}).submit({})
+
+
+def test_shared_store_passes_cancels_between_workers():
+    kv = MemoryKV()
+    owner = SharedJobStore(kv)
+    other_worker = JobQueue(lambda *a: {}, store=SharedJobStore(kv))
+    job = Job(id="job-1", request={"destination": "Lisbon"}, status=RUNNING)
+    owner.save(job)
+
+    seen = other_worker.get(job.id)
+    assert seen.request == {"destination": "Lisbon"} and not seen.cancel_event.is_set()
+
+    other_worker.cancel(job.id)
+    job.sections.append({"name": "destination"})
+    owner.save(job)
+
+    assert job.cancel_event.is_set()
+    assert other_worker.get(job.id).sections == [{"name": "destination"}]
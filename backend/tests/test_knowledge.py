@@ -0,0 +1,90 @@
+import threading
+import time
+
+from core.dag import NodeResult
+from core.knowledge import ActiveRuns, KnowledgeStore, KnowledgeWarmer, destination_key, place_key
+
+TASKS = ("attractions", "tips")
+
+
+def produced(destination):
+    return [NodeResult(task, "agent", f"{task} for {destination}") for task in TASKS]
+
+
+def test_keys_ignore_case_spacing_and_word_order():
+    assert destination_key("  New   York ") == destination_key("new york")
+    assert place_key("Tokyo, Japan") == place_key("japan TOKYO")
+    assert place_key("Paris") != place_key("Paris, Texas")
+
+
+def test_store_serves_fresh_artifacts_only():
+    store = KnowledgeStore(max_age=0.05)
+    for result in produced("Lisbon"):
+        store.save("Lisbon", result)
+    store.save("Lisbon", NodeResult("budget", "agent", ""))
+
+    found = store.get(" lisbon", ("attractions", "budget"))
+    assert list(found) == ["attractions"]
+    assert found["attractions"].extra == {"cache": "knowledge"}
+
+    time.sleep(0.1)
+    assert store.get("Lisbon", TASKS) == {}
+    assert store.stats()["hits"] == 1
+
+
+def test_popular_destinations_rank_by_requests():
+    store = KnowledgeStore()
+    for destination in ["Rome", "Lisbon", "lisbon", "Oslo", "Rome", "rome"]:
+        store.record_request(destination)
+
+    assert store.popular(2) == ["Rome", "Lisbon"]
+
+
+def test_refresh_covers_seeds_and_popular_but_stops_when_busy():
+    store = KnowledgeStore()
+    store.record_request("Rome")
+    for result in produced("Oslo"):
+        store.save("Oslo", result)
+    store.record_request("Oslo")
+    busy = threading.Event()
+
+    def produce(destination):
+        busy.set()
+        return produced(destination)
+
+    warmer = KnowledgeWarmer(store, produce, TASKS, seeds=["Lisbon"], is_idle=lambda: not busy.is_set())
+
+    assert warmer.due() == ["Lisbon", "Rome"]
+    assert warmer.refresh() == 1
+    assert warmer.due() == ["Rome"]
+
+
+def test_first_refresh_runs_once_idle_at_startup():
+    store = KnowledgeStore()
+    runs = ActiveRuns()
+    release = threading.Event()
+    warmer = KnowledgeWarmer(store, produced, TASKS, seeds=["Lisbon"], interval=3600, idle_poll=0.01,
+                             is_idle=lambda: len(runs) == 0)
+
+    @runs.track
+    def live_plan():
+        release.wait(2)
+
+    plan = threading.Thread(target=live_plan)
+    plan.start()
+    while not len(runs):
+        time.sleep(0.01)
+    warmer.start()
+    time.sleep(0.1)
+    assert warmer.refreshed == 0
+
+    release.set()
+    plan.join()
+    for _ in range(100):
+        if warmer.refreshed:
+            break
+        time.sleep(0.01)
+    warmer.stop()
+
+    assert warmer.refreshed == 1
+    assert len(runs) == 0
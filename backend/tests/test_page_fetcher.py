@@ -0,0 +1,114 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.page_fetcher import PageFetcher
+
+PAGE = b"<html><head><script>track()</script></head><body><p>Old town walking tour</p></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append((self.path, self.headers.get("If-None-Match")))
+        port = self.server.server_address[1]
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == "/to-local":
+            self.redirect(f"http://localhost:{port}/page")
+        elif self.path == "/to-loopback":
+            self.redirect(f"http://127.0.0.1:{port}/page")
+        elif self.path == "/loop":
+            self.redirect("/loop")
+        else:
+            self.send_error(404)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("localhost", 0), Handler)
+    httpd.hits = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://localhost:{server.server_address[1]}{path}"
+
+
+def test_stale_pages_are_revalidated_with_the_etag(server):
+    fetcher = PageFetcher(allow_hosts={"localhost"}, fresh_for=0)
+
+    first = fetcher.fetch(url(server, "/page"))
+    second = fetcher.fetch(url(server, "/page"))
+
+    assert first == second == "Old town walking tour"
+    assert fetcher.stats == {"fresh_hits": 0, "revalidated": 1, "fetched": 1}
+    assert server.hits == [("/page", None), ("/page", '"v1"')]
+
+
+def test_fresh_pages_are_served_from_memory(server):
+    fetcher = PageFetcher(allow_hosts={"localhost"})
+
+    fetcher.fetch(url(server, "/page"))
+    fetcher.fetch(url(server, "/page"))
+
+    assert fetcher.stats["fresh_hits"] == 1
+    assert len(server.hits) == 1
+
+
+def test_redirects_to_allowed_hosts_are_followed(server):
+    fetcher = PageFetcher(allow_hosts={"localhost"})
+
+    assert fetcher.fetch(url(server, "/to-local")) == "Old town walking tour"
+
+
+def test_redirects_are_checked_on_every_hop(server):
+    fetcher = PageFetcher(allow_hosts={"localhost"})
+
+    with pytest.raises(ValueError, match="non-public"):
+        fetcher.fetch(url(server, "/to-loopback"))
+    assert [path for path, _ in server.hits] == ["/to-loopback"]
+
+
+def test_redirect_loops_are_cut_off(server):
+    fetcher = PageFetcher(allow_hosts={"localhost"})
+
+    with pytest.raises(ValueError, match="Too many redirects"):
+        fetcher.fetch(url(server, "/loop"))
+
+
+def test_private_addresses_are_refused_by_default(server):
+    with pytest.raises(ValueError, match="non-public"):
+        PageFetcher().fetch(url(server, "/page"))
+    assert server.hits == []
+
+    assert PageFetcher(allow_private=True).fetch(url(server, "/to-loopback")) == "Old town walking tour"
+
+
+@pytest.mark.parametrize("bad", ["file:///etc/passwd", "ftp://example.com/x", "http:///nohost"])
+def test_unsupported_urls_are_refused(bad):
+    with pytest.raises(ValueError, match="Unsupported"):
+        PageFetcher().fetch(bad)
@@ -0,0 +1,72 @@
+import gzip
+import time
+
+from core.plans import PlanStore, etag_matches, pick_encoding, plan_id
+
+
+def test_plan_id_ignores_case_and_spacing_but_not_models():
+    request = {"destination": "Paris", "days": 3}
+    models = {"itinerary": "gemini/gemini-2.5-flash"}
+
+    assert plan_id(request, models) == plan_id({"destination": " paris ", "days": 3}, models)
+    assert plan_id(request, models) != plan_id(request, {"itinerary": "groq/llama-3.1-8b-instant"})
+    assert plan_id(request, models) != plan_id({**request, "days": 4}, models)
+
+
+def test_etag_matches():
+    etag = '"abc"'
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_pick_encoding_prefers_brotli_and_honours_q_values():
+    both = ("br", "gzip")
+
+    assert pick_encoding("gzip, deflate, br", both) == "br"
+    assert pick_encoding("gzip, deflate, br", ("gzip",)) == "gzip"
+    assert pick_encoding("br;q=0, gzip;q=0.5", both) == "gzip"
+    assert pick_encoding("*", both) == "br"
+    assert pick_encoding("identity", both) == "identity"
+    assert pick_encoding(None, both) == "identity"
+    assert pick_encoding("gzip;q=bad", both) == "identity"
+
+
+def test_store_keeps_compressed_copies_and_changes_etag_with_the_body():
+    store = PlanStore()
+    first = store.save("id", {"destination": "paris"}, b'{"plan": 1}')
+    plan = store.get("id")
+
+    assert plan["etag"] == first
+    assert gzip.decompress(plan["gzip"]) == plan["identity"] == b'{"plan": 1}'
+    assert store.save("id", {}, b'{"plan": 2}') != first
+    assert store.get("missing") is None
+    assert store.stats()["plans"] == 1
+
+
+def test_old_plans_are_not_served():
+    store = PlanStore(max_age=0.01)
+    store.save("id", {}, b"{}")
+    time.sleep(0.02)
+
+    assert store.get("id") is None
+
+
+def test_saving_deletes_expired_plans_and_caps_the_count():
+    store = PlanStore(max_age=0.05, max_plans=2, prune_interval=0)
+    ids = lambda: [row[0] for row in store._conn.execute("SELECT id FROM plans ORDER BY id")]
+    store.save("old", {}, b"{}")
+    time.sleep(0.1)
+    store.save("a", {}, b"{}")
+
+    assert ids() == ["a"]
+
+    for plan in ("b", "c"):
+        time.sleep(0.01)
+        store.save(plan, {}, b"{}")
+
+    assert ids() == ["b", "c"]
@@ -0,0 +1,115 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from core.dag import NodeResult, TaskNode
+from core.ratelimit import ProviderLimiter, TokenBucket, is_retryable, provider_of, retry_after_seconds
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.litellm_response_headers = {"retry-after": retry_after} if retry_after else {}
+
+
+class CountingLLM:
+    def __init__(self, model, failures=0):
+        self.model = model
+        self.failures = failures
+        self.calls = 0
+
+    def call(self, messages, **kwargs):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError()
+        return "ok"
+
+
+def raising(error):
+    def fn():
+        raise error
+
+    return fn
+
+
+def limiter(**kwargs):
+    return ProviderLimiter(limits={"groq": {"rate": 1000.0, "burst": 10}}, base_delay=0.001, **kwargs)
+
+
+def test_provider_is_the_model_prefix():
+    assert provider_of("gemini/gemini-2.5-flash") == "gemini"
+    assert provider_of("local") == "local"
+
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20.0, burst=2)
+
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    started = time.monotonic()
+    assert bucket.acquire()
+    assert 0.03 < time.monotonic() - started < 0.2
+
+
+def test_penalty_halves_the_rate_and_success_restores_it():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.penalize(retry_after=0.5)
+
+    assert bucket.rate == 0.5
+    assert not bucket.acquire(timeout=0.1)
+    for _ in range(20):
+        bucket.reward()
+    assert bucket.rate == 1.0
+
+
+def test_retryable_errors_and_retry_after():
+    wrapped = RuntimeError("crew failed")
+    wrapped.__cause__ = RateLimitError("7")
+
+    assert is_retryable(wrapped)
+    assert retry_after_seconds(wrapped) == 7.0
+    assert not is_retryable(ValueError("bad output"))
+    assert retry_after_seconds(RateLimitError(formatdate(time.time() + 30, usegmt=True))) == pytest.approx(30, abs=2)
+
+
+def test_calls_are_retried_until_they_succeed_or_run_out():
+    limits = limiter(max_attempts=3)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError()
+        return "ok"
+
+    assert limits.call("groq", flaky) == "ok"
+    assert limits.stats()["groq"]["retries"] == 2
+
+    with pytest.raises(RateLimitError):
+        limits.call("groq", raising(RateLimitError()))
+    with pytest.raises(ValueError):
+        limits.call("groq", raising(ValueError()))
+
+
+def test_each_llm_call_of_a_task_takes_its_own_token():
+    limits = limiter()
+    llm = CountingLLM("groq/llama-3.1-8b-instant", failures=1)
+    agent = SimpleNamespace(llm=llm)
+
+    def execute(node, context):
+        # A tool round, then the answer; only the failed call is repeated.
+        for _ in range(2):
+            node.task.agent.llm.call([])
+        return NodeResult(name=node.name, agent="a", content="ok")
+
+    limits.wrap(execute)(TaskNode("budget", task=SimpleNamespace(agent=agent)), None)
+
+    assert llm.calls == 3
+    stats = limits.stats()["groq"]
+    assert (stats["calls"], stats["retries"]) == (2, 1)
+
+    llm.call([])
+    assert limits.stats()["groq"]["calls"] == 2
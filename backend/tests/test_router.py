@@ -0,0 +1,114 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from core.dag import NodeResult, TaskNode
+from core.router import MIN_SAMPLES, BackendHealth, ModelRouter
+
+
+class FakeRegistry:
+    llm_configs = {
+        "llama": {"model": "ollama/llama3"},
+        "groq": {"model": "groq/llama-3.1-8b-instant"},
+        "gemini": {"model": "gemini/gemini-2.5-flash"},
+    }
+    agent_models = {"summary": "groq", "budget": "llama"}
+
+    def __init__(self):
+        self._llms = {}
+
+    def llm(self, name, **overrides):
+        key = (name, tuple(sorted(overrides.items())))
+        return self._llms.setdefault(key, SimpleNamespace(model=self.llm_configs[name]["model"], **overrides))
+
+    def agent(self, task_name, model=None, **overrides):
+        return SimpleNamespace(llm=self.llm(model or self.agent_models[task_name], **overrides))
+
+
+def node(registry, name="budget"):
+    factory = lambda agent: SimpleNamespace(agent=agent, id=uuid.uuid4())
+    return TaskNode(name, factory(registry.agent(name)), factory=factory)
+
+
+def answering(delays=None, failing=()):
+    seen = []
+
+    def execute(n, context):
+        model = n.task.agent.llm.model
+        seen.append((n, model))
+        time.sleep((delays or {}).get(model, 0))
+        if model in failing:
+            raise RuntimeError(f"{model} down")
+        return NodeResult(name=n.name, agent="a", content=model)
+
+    execute.seen = seen
+    return execute
+
+
+ALLOWED = {"budget": ("llama", "groq", "gemini"), "summary": ("groq", "gemini")}
+
+
+def test_preferred_model_keeps_the_original_task():
+    registry = FakeRegistry()
+    router = ModelRouter(registry, allowed=ALLOWED)
+    execute = answering()
+    original = node(registry)
+
+    result = router.wrap(execute)(original, None)
+
+    assert execute.seen[0][0] is original
+    assert (result.extra["model"], result.extra["model_id"]) == ("llama", "ollama/llama3")
+
+
+def test_failures_fall_over_to_the_next_model():
+    registry = FakeRegistry()
+    router = ModelRouter(registry, allowed=ALLOWED)
+    execute = answering(failing={"ollama/llama3"})
+
+    result = router.wrap(execute)(node(registry), None)
+
+    assert result.content == "groq/llama-3.1-8b-instant"
+    assert execute.seen[1][0].task.agent.llm is registry.llm("groq")
+
+    with pytest.raises(RuntimeError):
+        router.wrap(answering(failing=set(m["model"] for m in registry.llm_configs.values())))(node(registry), None)
+
+
+def test_unhealthy_backends_are_skipped_and_much_faster_ones_preferred():
+    router = ModelRouter(FakeRegistry(), allowed=ALLOWED)
+    for _ in range(MIN_SAMPLES):
+        router.backend("llama").start()
+        router.backend("llama").finish(1.0, ok=False)
+
+    assert router.rank("budget") == ["groq", "gemini"]
+
+    router = ModelRouter(FakeRegistry(), allowed=ALLOWED)
+    for name, seconds in (("llama", 4.0), ("groq", 1.0)):
+        router.backend(name).start()
+        router.backend(name).finish(seconds, ok=True)
+
+    assert router.rank("budget") == ["groq", "llama", "gemini"]
+
+
+def test_expected_latency_grows_with_load():
+    health = BackendHealth("llama", concurrency=1)
+    health.start()
+    health.finish(2.0, ok=True)
+    health.start()
+
+    assert health.expected_seconds() == 4.0
+
+
+def test_slow_primary_is_hedged_with_the_next_model():
+    registry = FakeRegistry()
+    router = ModelRouter(registry, allowed=ALLOWED, hedge_after=0.05)
+    execute = answering(delays={"groq/llama-3.1-8b-instant": 1.0})
+
+    started = time.perf_counter()
+    result = router.wrap(execute)(node(registry, "summary"), None)
+
+    assert result.content == "gemini/gemini-2.5-flash"
+    assert time.perf_counter() - started < 0.5
+    assert [(d["launch"], d["reason"]) for d in router.decisions if "launch" in d] == [("groq", "primary"), ("gemini", "hedge")]
@@ -0,0 +1,44 @@
+import time
+
+from core.sessions import SessionStore, SharedSessionStore, affected_tasks, changed_fields
+from core.shared import MemoryKV
+
+TASK_INPUTS = {
+    "destination": ["destination"],
+    "attractions": ["destination"],
+    "budget": ["destination", "days", "budget"],
+    "itinerary": ["days", "style"],
+    "summary": [],
+}
+GRAPH = {"itinerary": ["attractions"], "summary": ["destination", "attractions", "budget", "itinerary"]}
+
+
+def test_changed_fields_include_added_and_removed_keys():
+    assert changed_fields({"days": 3, "budget": "low"}, {"days": 4, "style": "slow"}) == {"days", "budget", "style"}
+    assert changed_fields({"days": 3}, {"days": 3}) == set()
+
+
+def test_changes_rerun_readers_and_everything_downstream():
+    assert affected_tasks({"style"}, TASK_INPUTS, GRAPH) == {"itinerary", "summary"}
+    assert affected_tasks({"destination"}, TASK_INPUTS, GRAPH) == {"destination", "attractions", "budget", "itinerary", "summary"}
+    assert affected_tasks(set(), TASK_INPUTS, GRAPH) == set()
+
+
+def test_sessions_expire_and_are_capped():
+    store = SessionStore(max_sessions=2, ttl=0.05)
+    store.save("a", "run-a")
+    store.save("b", "run-b")
+    store.get("a")
+    store.save("c", "run-c")
+
+    assert (store.get("a"), store.get("b"), store.get("c")) == ("run-a", None, "run-c")
+    time.sleep(0.1)
+    assert store.get("a") is None
+
+
+def test_shared_sessions_are_seen_by_every_worker():
+    kv = MemoryKV()
+    SharedSessionStore(kv).save("s", "run-1")
+
+    assert SharedSessionStore(kv).get("s") == "run-1"
+    assert SharedSessionStore(kv).get("other") is None
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from core.checkpoints import SharedCheckpointStore, build_checkpoints
+from core.dag import NodeResult
+from core.knowledge import SharedKnowledgeStore, build_knowledge
+from core.plans import PlanStore, SharedPlanStore, build_plans
+from core.shared import MemoryKV, SQLiteKV, build_shared_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def kv(request, tmp_path):
+    if request.param == "memory":
+        return MemoryKV(purge_interval=0)
+    return SQLiteKV(str(tmp_path / "state.db"), purge_interval=0)
+
+
+def test_set_get_delete_and_scan(kv):
+    kv.set("job:1", "a")
+    kv.set("job:2", "b")
+    kv.set("run:1", "c")
+
+    assert kv.get("job:1") == "a" and kv.get("missing") is None
+    assert sorted(kv.scan_iter(match="job:*")) == ["job:1", "job:2"]
+    assert kv.delete("job:1", "missing") == 1
+    assert kv.get("job:1") is None
+
+
+def test_nx_only_takes_a_free_or_expired_key(kv):
+    assert kv.set("lease", "a", ex=0.05, nx=True)
+    assert not kv.set("lease", "b", ex=0.05, nx=True)
+    time.sleep(0.1)
+
+    assert kv.set("lease", "b", nx=True)
+    assert kv.get("lease") == "b"
+
+
+def test_expired_keys_are_hidden_and_purged(kv):
+    kv.set("old", "x", ex=0.05)
+    time.sleep(0.1)
+    kv.set("new", "y")
+
+    assert kv.get("old") is None and list(kv.scan_iter(match="old")) == []
+    if isinstance(kv, SQLiteKV):
+        assert kv._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0] == 1
+    else:
+        assert list(kv._data) == ["new"]
+
+
+def test_workers_on_one_file_see_each_other(tmp_path):
+    first = build_shared_store(f"sqlite:///{tmp_path / 'state.db'}")
+    second = build_shared_store(f"sqlite:///{tmp_path / 'state.db'}")
+    first.set("session:s", "run-1")
+
+    assert second.get("session:s") == "run-1"
+    assert build_shared_store(None) is None
+    with pytest.raises(ValueError):
+        build_shared_store("ftp://nowhere")
+
+
+def test_stores_use_the_shared_kv_unless_given_a_path(tmp_path):
+    kv = MemoryKV()
+
+    assert isinstance(build_checkpoints(shared=kv), SharedCheckpointStore)
+    assert isinstance(build_knowledge(shared=kv), SharedKnowledgeStore)
+    assert isinstance(build_plans(shared=kv), SharedPlanStore)
+    assert isinstance(build_plans(str(tmp_path / "plans.db"), shared=kv), PlanStore)
+
+
+def test_runs_knowledge_and_plans_are_seen_by_every_worker():
+    kv = MemoryKV()
+    build_checkpoints(shared=kv).create("run", {"destination": "Lisbon"})
+    knowledge = build_knowledge(shared=kv)
+    knowledge.save("Lisbon", NodeResult("tips", "agent", "Take tram 28"))
+    for destination in ["Rome", "Lisbon", "lisbon"]:
+        knowledge.record_request(destination)
+    etag = build_plans(shared=kv).save("plan", {"destination": "Lisbon"}, b'{"summary": "ok"}')
+
+    other = build_knowledge(shared=kv)
+    assert build_checkpoints(shared=kv).load("run")["request"] == {"destination": "Lisbon"}
+    assert other.get(" LISBON", ("tips", "budget"))["tips"].content == "Take tram 28"
+    assert other.popular(1) == ["Lisbon"]
+    assert other.stats()["destinations"] == 1
+    plan = build_plans(shared=kv).get("plan")
+    assert (plan["etag"], plan["identity"]) == (etag, b'{"summary": "ok"}')
+    assert plan["gzip"]
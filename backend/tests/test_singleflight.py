@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.shared import MemoryKV
+from core.singleflight import SharedSingleFlight, SingleFlight, normalize_request, request_key
+
+
+def test_requests_differing_in_case_and_spacing_share_a_key():
+    assert normalize_request({"destination": "  Paris ", "days": 3}) == {"days": 3, "destination": "paris"}
+    assert request_key({"destination": "PARIS", "days": 3}) == request_key({"days": 3, "destination": "paris"})
+    assert request_key({"destination": "paris"}, True) != request_key({"destination": "paris"}, False)
+
+
+def test_concurrent_calls_run_once_and_share_the_result():
+    flight = SingleFlight()
+    started = threading.Event()
+    runs = []
+
+    def fn(publish):
+        runs.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "plan"
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", fn)
+        started.wait()
+        followers = [pool.submit(flight.do, "key", fn) for _ in range(3)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(runs) == 1
+    assert results[0] == ("plan", False)
+    assert all(r == ("plan", True) for r in results[1:])
+    assert flight.stats() == {"executions": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_late_joiners_get_earlier_events_replayed():
+    flight = SingleFlight()
+    published = threading.Event()
+    release = threading.Event()
+
+    def fn(publish):
+        publish("first")
+        published.set()
+        release.wait()
+        publish("second")
+        return "done"
+
+    seen = []
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", fn)
+        published.wait()
+        follower = pool.submit(flight.do, "key", fn, seen.append)
+        while not seen:
+            time.sleep(0.01)
+        release.set()
+        leader.result(), follower.result()
+
+    assert seen == ["first", "second"]
+
+
+def test_errors_reach_every_caller_and_do_not_stick():
+    flight = SingleFlight()
+
+    def fail(publish):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda publish: "ok") == ("ok", False)
+
+
+def test_shared_flight_replays_a_finished_leaders_outcome_to_waiters():
+    kv = MemoryKV()
+    workers = [SharedSingleFlight(kv, poll=0.01) for _ in range(2)]
+    started = threading.Event()
+    runs = []
+
+    def fn(publish):
+        runs.append(1)
+        publish({"event": "section"})
+        started.set()
+        time.sleep(0.1)
+        return {"plan": 1}
+
+    seen = []
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(workers[0].do, "key", fn)
+        started.wait()
+        follower = pool.submit(workers[1].do, "key", fn, seen.append)
+        assert leader.result() == ({"plan": 1}, False)
+        assert follower.result() == ({"plan": 1}, True)
+
+    assert len(runs) == 1
+    assert seen == [{"event": "section"}]
@@ -0,0 +1,68 @@
+import json
+
+from core.stopping import AnswerSpec, StructureWatcher
+
+
+def feed(spec, text, chunk=7):
+    watcher = StructureWatcher(spec)
+    for start in range(0, len(text), chunk):
+        if watcher.feed(text[start:start + chunk]):
+            break
+    return watcher
+
+
+def test_answer_ends_when_the_json_object_closes():
+    answer = {"name": "Lisbon", "note": "braces } and { in strings", "quote": "say \"hi\" {"}
+    text = "Thought: done\nFinal Answer: " + json.dumps(answer) + "\n\nHope this helps! " * 3
+
+    watcher = feed(AnswerSpec(), text)
+
+    assert watcher.complete
+    body = watcher.answer()
+    assert json.loads(body[body.index("{"):]) == answer
+    assert watcher.tail_tokens() > 0
+
+
+def test_list_limit_cuts_and_closes_the_answer():
+    items = [{"name": f"A{i}", "description": "x"} for i in range(10)]
+    text = "Final Answer: " + json.dumps({"attractions": items})
+
+    watcher = feed(AnswerSpec(limits={"attractions": 3}), text)
+
+    body = watcher.answer()
+    assert [a["name"] for a in json.loads(body[body.index("{"):])["attractions"]] == ["A0", "A1", "A2"]
+
+
+def test_limits_only_count_top_level_lists():
+    text = "Final Answer: " + json.dumps({"days": [{"tags": ["a", "b", "c"]}, {"tags": []}]})
+
+    watcher = feed(AnswerSpec(limits={"tags": 1}), text)
+
+    assert json.loads(watcher.answer().split("Final Answer: ")[1])["days"][1] == {"tags": []}
+
+
+def test_unfinished_answer_gets_closers():
+    watcher = feed(AnswerSpec(), 'Final Answer: {"days": [{"day": 1}')
+
+    assert not watcher.complete
+    assert watcher.closers() == "]}"
+    assert json.loads(watcher.answer().split("Final Answer: ")[1]) == {"days": [{"day": 1}]}
+
+
+def test_no_closers_inside_an_open_string():
+    watcher = feed(AnswerSpec(), 'Final Answer: {"name": "Lis')
+
+    assert watcher.closers() == ""
+
+
+def test_text_before_final_answer_is_ignored():
+    watcher = feed(AnswerSpec(), 'Thought: use {"tool": 1}\nAction: search')
+
+    assert watcher.start is None
+    assert not watcher.complete
+
+
+def test_bare_json_answer_is_watched():
+    watcher = feed(AnswerSpec(), '```json\n{"a": 1}\n```')
+
+    assert watcher.complete
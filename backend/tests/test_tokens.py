@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+from core.dag import CONTEXT_DIVIDER, NodeResult, TaskNode
+from core.tokens import (
+    TokenBudget,
+    compress_context,
+    count_message_tokens,
+    count_tokens,
+    dedupe_lines,
+    extractive_trim,
+    fit_messages,
+    prompt_overhead,
+)
+
+
+def paragraph(word, lines):
+    return "\n".join(f"{word} line {i} with enough words to be real content here" for i in range(lines))
+
+
+def test_context_within_budget_is_only_deduplicated():
+    repeated = "The old town is best explored on foot in the early morning."
+    context = CONTEXT_DIVIDER.join([f"{repeated}\nDay 1:", f"{repeated}\nDay 1:"])
+
+    assert compress_context(context, 10_000) == CONTEXT_DIVIDER.join([f"{repeated}\nDay 1:", "Day 1:"])
+
+
+def test_long_context_fits_the_budget_and_keeps_every_section():
+    sections = [paragraph("short", 2), paragraph("long", 200), paragraph("medium", 40)]
+
+    compressed = compress_context(CONTEXT_DIVIDER.join(sections), 600)
+
+    parts = compressed.split(CONTEXT_DIVIDER)
+    assert len(parts) == 3
+    assert parts[0] == sections[0]
+    assert count_tokens(compressed) <= 600 + 3 * count_tokens("\n[trimmed]") + count_tokens(CONTEXT_DIVIDER) * 2
+
+
+def test_trim_drops_boilerplate_and_keeps_order():
+    text = "Accept cookies to subscribe to our newsletter today\n" + paragraph("body", 30)
+
+    trimmed = extractive_trim(text, 100)
+
+    assert "cookies" not in trimmed
+    kept = [line for line in trimmed.splitlines() if line.startswith("body")]
+    assert kept == sorted(kept, key=lambda line: int(line.split()[2]))
+    assert trimmed.endswith("[trimmed]")
+
+
+def test_short_structural_lines_are_not_deduplicated():
+    assert dedupe_lines(["Morning:", "Morning:"]) == ["Morning:", "Morning:"]
+
+
+class RecordingLLM:
+    model = "ollama/llama3"
+
+    def __init__(self):
+        self.sent = []
+
+    def call(self, messages, **kwargs):
+        self.sent.append(messages)
+        return "Final Answer: ok"
+
+
+def budget_node(llm, description="Plan the trip"):
+    agent = SimpleNamespace(role="Planner", goal="Plan", backstory="Knows cities", tools=[], llm=llm)
+    return TaskNode("itinerary", task=SimpleNamespace(agent=agent, description=description, expected_output="A plan"))
+
+
+def test_prompt_overhead_counts_the_agent_and_tools():
+    llm = RecordingLLM()
+    bare = prompt_overhead(budget_node(llm).task)
+    node = budget_node(llm)
+    node.task.agent.tools = [SimpleNamespace(description=paragraph("tool", 10))]
+
+    assert prompt_overhead(node.task) > bare > count_tokens("Plan the trip A plan")
+
+
+def test_observations_are_trimmed_largest_first_and_actions_kept():
+    messages = [
+        {"role": "system", "content": paragraph("system", 5)},
+        {"role": "user", "content": paragraph("task", 5)},
+        {"role": "assistant", "content": "Thought: search\nAction: Search\nObservation:" + paragraph("small", 3)},
+        {"role": "assistant", "content": "Thought: scrape\nAction: Read\nObservation:" + paragraph("page", 200)},
+    ]
+
+    fitted = fit_messages(messages, 600)
+
+    assert count_message_tokens(fitted) <= 600
+    assert fitted[:3] == messages[:3]
+    assert fitted[3]["content"].startswith("Thought: scrape\nAction: Read\nObservation:")
+    assert messages[3]["content"].endswith("here")
+
+
+def test_every_call_is_held_to_the_budget_and_overhead_is_measured():
+    llm = RecordingLLM()
+    budget = TokenBudget(budgets={"ollama/llama3": 800})
+    system = {"role": "system", "content": paragraph("system", 20)}
+
+    def execute(node, context):
+        first = [system, {"role": "user", "content": f"{node.task.description}\n{context}"}]
+        llm.call(first)
+        page = "Thought: read\nAction: Read\nObservation:" + paragraph("page", 300)
+        llm.call([*first, {"role": "assistant", "content": page}])
+        return NodeResult(name=node.name, agent="Planner", content="ok")
+
+    result = budget.wrap(execute)(budget_node(llm), paragraph("context", 10))
+
+    assert [count_message_tokens(m) <= 800 for m in llm.sent] == [True, True]
+    assert result.extra["tokens"]["trimmed_calls"] == 1
+    assert budget.overhead(budget_node(llm)) == count_message_tokens(llm.sent[0]) - count_tokens(paragraph("context", 10))
+
+    llm.call([{"role": "user", "content": paragraph("outside", 400)}])
+    assert count_message_tokens(llm.sent[-1]) > 800
@@ -0,0 +1,146 @@
+import ipaddress
+import re
+import socket
+import threading
+import time
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+try:
+    from core.cache import MemoryCache
+    from core.singleflight import SingleFlight
+except ImportError:
+    from backend.core.cache import MemoryCache
+    from backend.core.singleflight import SingleFlight
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Page chrome that never helps an agent answer.
+NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe"]
+
+MAX_REDIRECTS = 5
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+
+
+# ---------- TEXT EXTRACTION ----------
+def html_to_text(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    root = soup.find("main") or soup.find("article") or soup.body or soup
+
+    lines, seen = [], set()
+    for line in root.get_text("\n").splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if len(line) < 3 or line in seen:
+            continue
+        seen.add(line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def normalize_url(url: str) -> str:
+    url, _ = urldefrag(url.strip())
+    return url
+
+
+# ---------- FETCHER ----------
+class PageFetcher:
+    """Pooled, cached page fetches with conditional revalidation.
+
+    Pages younger than ``fresh_for`` are served from memory. Older ones are
+    revalidated with If-None-Match / If-Modified-Since and reused on 304.
+    At most ``concurrency`` fetches are in flight; concurrent requests for the
+    same URL share one fetch.
+
+    Every hop, redirects included, must resolve to a public address, except
+    for hosts in ``allow_hosts`` (a local test server, an intranet mirror)
+    or everything with ``allow_private``.
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client | None = None,
+        concurrency: int = 4,
+        fresh_for: float = 3600,
+        keep_for: float = 7 * 24 * 3600,
+        max_pages: int = 256,
+        timeout: float = 15,
+        allow_private: bool = False,
+        allow_hosts=(),
+    ):
+        self.client = client or httpx.Client(
+            headers=HEADERS,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency),
+        )
+        self.fresh_for = fresh_for
+        self.keep_for = keep_for
+        self.allow_private = allow_private
+        self.allow_hosts = {host.lower() for host in allow_hosts}
+        self._pages = MemoryCache(max_entries=max_pages)
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._inflight = SingleFlight()
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "fetched": 0}
+
+    def _check_url(self, url: str):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        if self.allow_private or parsed.hostname.lower() in self.allow_hosts:
+            return
+        for info in socket.getaddrinfo(parsed.hostname, parsed.port or 80):
+            address = ipaddress.ip_address(info[4][0])
+            if address.is_private or address.is_loopback or address.is_link_local or address.is_reserved:
+                raise ValueError(f"Refusing to fetch non-public address: {url}")
+
+    def _get(self, url: str, headers: dict) -> httpx.Response:
+        # Redirects are followed by hand so every hop goes through _check_url.
+        for _ in range(MAX_REDIRECTS + 1):
+            self._check_url(url)
+            response = self.client.get(url, headers=headers, follow_redirects=False)
+            if response.status_code not in REDIRECT_CODES or "location" not in response.headers:
+                return response
+            url = urljoin(url, response.headers["location"])
+        raise ValueError(f"Too many redirects: {url}")
+
+    def fetch(self, url: str) -> str:
+        url = normalize_url(url)
+        entry = self._pages.get(url)
+        if entry and time.time() - entry["checked_at"] < self.fresh_for:
+            self.stats["fresh_hits"] += 1
+            return entry["text"]
+        text, _ = self._inflight.do(url, lambda publish: self._revalidate(url, entry))
+        return text
+
+    def _revalidate(self, url: str, entry: dict | None) -> str:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self._slots:
+            response = self._get(url, headers)
+
+        if response.status_code == 304 and entry:
+            self.stats["revalidated"] += 1
+            entry = {**entry, "checked_at": time.time()}
+        else:
+            response.raise_for_status()
+            self.stats["fetched"] += 1
+            entry = {
+                "text": html_to_text(response.text),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "checked_at": time.time(),
+            }
+        self._pages.set(url, entry, self.keep_for)
+        return entry["text"]
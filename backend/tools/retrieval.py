@@ -0,0 +1,43 @@
+import os
+
+try:
+    from core.embeddings import VectorIndex, build_embedder, chunk_text
+except ImportError:
+    from backend.core.embeddings import VectorIndex, build_embedder, chunk_text
+
+# Scraped pages and finished task outputs, searchable by meaning. Set
+# EMBEDDING_MODEL to a local sentence-transformers model to replace the
+# hashing embedder; everything runs on CPU.
+semantic_index = VectorIndex(
+    build_embedder(os.getenv("EMBEDDING_MODEL")),
+    max_items=int(os.getenv("SEMANTIC_INDEX_MAX_ITEMS", "20000")),
+)
+
+# A search is answered from the index when this many snippets score at least
+# RETRIEVAL_MIN_SCORE; otherwise it goes to Serper as before.
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.45"))
+RETRIEVAL_MIN_RESULTS = int(os.getenv("RETRIEVAL_MIN_RESULTS", "3"))
+
+
+def index_page(url: str, text: str):
+    if not semantic_index.contains("page", url):
+        semantic_index.add(chunk_text(text), "page", {"url": url}, key=url)
+
+
+def retrieve(query: str, k: int):
+    matches = semantic_index.search(query, k=k, min_score=RETRIEVAL_MIN_SCORE, kinds=("page", "output"))
+    if len(matches) < min(k, RETRIEVAL_MIN_RESULTS):
+        return None
+    # Same shape as a Serper response, so agents read it the same way.
+    return {
+        "searchParameters": {"q": query, "source": "local-index"},
+        "organic": [
+            {
+                "title": m.meta.get("title") or m.meta.get("url", "Earlier research"),
+                "link": m.meta.get("url", ""),
+                "snippet": m.text,
+                "position": i + 1,
+            }
+            for i, m in enumerate(matches)
+        ],
+    }
@@ -1,3 +1,32 @@
+import os
+from typing import Any
+
 from crewai_tools import ScrapeWebsiteTool
 
-scrape_tool = ScrapeWebsiteTool()
+try:
+    from core.tokens import extractive_trim
+    from tools.page_fetcher import PageFetcher
+    from tools.retrieval import index_page
+except ImportError:
+    from backend.core.tokens import extractive_trim
+    from backend.tools.page_fetcher import PageFetcher
+    from backend.tools.retrieval import index_page
+
+# Agents only need the gist of a page; whole pages blow up the prompt.
+SCRAPE_MAX_TOKENS = int(os.getenv("SCRAPE_MAX_TOKENS", "1500"))
+
+page_fetcher = PageFetcher(concurrency=int(os.getenv("SCRAPE_CONCURRENCY", "4")))
+
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        if website_url is None:
+            raise ValueError("Website URL must be provided.")
+
+        text = page_fetcher.fetch(website_url)
+        index_page(website_url, text)
+        return "The following text is scraped website content:\n\n" + extractive_trim(text, SCRAPE_MAX_TOKENS)
+
+
+scrape_tool = CachedScrapeWebsiteTool()
@@ -1,3 +1,57 @@
+import os
+import re
+from typing import Any
+
 from crewai_tools import SerperDevTool
 
-serper_tool = SerperDevTool()
+try:
+    from core.cache import MemoryCache
+    from core.singleflight import SingleFlight
+    from tools.retrieval import retrieve
+except ImportError:
+    from backend.core.cache import MemoryCache
+    from backend.core.singleflight import SingleFlight
+    from backend.tools.retrieval import retrieve
+
+SEARCH_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+
+_search_cache = MemoryCache(max_entries=512)
+_search_inflight = SingleFlight()
+search_stats = {"hits": 0, "misses": 0, "retrieved": 0}
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query).strip().strip("\"'").casefold()
+    return query.rstrip("?.!")
+
+
+class CachedSerperDevTool(SerperDevTool):
+    # Four agents search for overlapping things within one plan and across
+    # plans; identical queries (after normalization) hit Serper once.
+    def _run(self, **kwargs: Any) -> Any:
+        query = kwargs.get("search_query") or kwargs.get("query")
+        if not query:
+            return super()._run(**kwargs)
+
+        search_type = kwargs.get("search_type", self.search_type)
+        key = f"{search_type}|{self.n_results}|{normalize_query(query)}"
+        hit = _search_cache.get(key)
+        if hit is not None:
+            search_stats["hits"] += 1
+            return hit
+
+        def search(publish):
+            result = retrieve(query, self.n_results) if search_type == "search" else None
+            if result is not None:
+                search_stats["retrieved"] += 1
+                return result
+            search_stats["misses"] += 1
+            result = super(CachedSerperDevTool, self)._run(**kwargs)
+            _search_cache.set(key, result, SEARCH_TTL)
+            return result
+
+        result, _ = _search_inflight.do(key, search)
+        return result
+
+
+serper_tool = CachedSerperDevTool()
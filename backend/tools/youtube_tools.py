@@ -1,3 +0,0 @@
-from crewai_tools import YoutubeVideoSearchTool
-
-youtube_search_tool = YoutubeVideoSearchTool()
@@ -1,24 +1,91 @@
 import { useState } from 'react';
 import { TravelForm } from './components/TravelForm';
 import { TripResult } from './components/TripResult';
-import { planTrip, type TripRequest, type TripResponse } from './api/trips';
+import { cachedPlan, planTripStream, rememberPlan, resumeRun, type TripRequest, type TripResponse } from './api/trips';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Plane } from 'lucide-react';
 
+interface TripSection {
+  name: string;
+  agent: string;
+  content: string;
+  draft?: boolean;
+}
+
 function App() {
-  const [result, setResult] = useState<TripResponse['result'] | null>(null);
+  const [result, setResult] = useState<TripSection[] | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
+  // Resubmitting within a session only regenerates what the changed fields affect.
+  const [sessionId, setSessionId] = useState<string | undefined>();
+
+  // Finished sections replace any token draft with the same name.
+  const upsertSection = (section: TripSection) => {
+    setResult((prev) => {
+      const sections = prev ?? [];
+      const index = sections.findIndex((s) => s.name === section.name);
+      if (index === -1) return [...sections, section];
+      if (section.draft && !sections[index].draft) return sections;
+      const next = [...sections];
+      next[index] = section.draft
+        ? { ...sections[index], content: sections[index].content + section.content }
+        : section;
+      return next;
+    });
+  };
+
+  const showPlan = (plan: TripResponse) => {
+    setResult(plan.result.map((section) => ({ name: section.agent, agent: section.agent, content: section.content })));
+  };
 
   const handlePlanTrip = async (data: TripRequest) => {
+    setResult(null);
     setIsLoading(true);
+    setIsStreaming(true);
+    // Set when the run failed after saving some sections, so it can be resumed.
+    const failed: { runId?: string } = {};
     try {
-      const response = await planTrip(data);
-      setResult(response.result);
+      const plan = await cachedPlan(data).catch(() => null);
+      if (plan) {
+        showPlan(plan);
+        return;
+      }
+      await planTripStream(
+        data,
+        (event) => {
+          if (event.event === 'section') {
+            upsertSection({ name: event.name, agent: event.agent, content: event.content });
+            setIsLoading(false);
+          } else if (event.event === 'token') {
+            upsertSection({ name: event.name, agent: 'Itinerary Planner', content: event.chunk, draft: true });
+            setIsLoading(false);
+          } else if (event.event === 'done') {
+            setSessionId(event.session_id ?? undefined);
+            rememberPlan(data, event.plan_id);
+          } else if (event.event === 'error') {
+            failed.runId = event.run_id;
+            throw new Error(event.detail);
+          }
+        },
+        { tokens: true, sessionId },
+      );
     } catch (error) {
       console.error(error);
-      alert("Failed to plan trip. Please try again.");
+      if (failed.runId && confirm("Planning failed partway. Resume from the finished sections?")) {
+        try {
+          const plan = await resumeRun(data, failed.runId);
+          showPlan(plan);
+          setSessionId(plan.session_id ?? undefined);
+        } catch (resumeError) {
+          console.error(resumeError);
+          alert("Failed to plan trip. Please try again.");
+        }
+      } else {
+        alert("Failed to plan trip. Please try again.");
+      }
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -63,7 +130,7 @@ function App() {
                 </div>
               </motion.div>
             ) : result ? (
-              <TripResult key="result" result={result} onReset={() => setResult(null)} />
+              <TripResult key="result" result={result} isComplete={!isStreaming} onReset={() => setResult(null)} />
             ) : (
               <motion.div
                 key="form"
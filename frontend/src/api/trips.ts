@@ -10,14 +10,165 @@ export interface TripRequest {
     style: string;
 }
 
+export interface TaskTiming {
+    agent: string;
+    started: number;
+    seconds: number;
+    cache?: string | null;
+    model?: string | null;
+    tokens_in?: number;
+    tokens_out?: number;
+    tokens_cached?: number;
+    tokens_saved?: number;
+}
+
 export interface TripResponse {
     result: Array<{
         agent: string;
         content: string;
+        data?: Record<string, unknown> | null;
+        reused?: boolean;
     }>;
+    timings?: TaskTiming[];
+    total_seconds?: number;
+    mode?: string;
+    coalesced?: boolean;
+    tokens_in?: number;
+    tokens_out?: number;
+    tokens_saved?: number;
+    run_id?: string | null;
+    session_id?: string | null;
+    plan_id?: string | null;
 }
 
-export const planTrip = async (data: TripRequest): Promise<TripResponse> => {
-    const response = await axios.post<TripResponse>(`${API_Base}/plan-trip`, data);
+// Plans already generated for a request are fetched by id instead of being
+// planned again. The server answers with an ETag and `no-cache`, so the
+// browser revalidates its copy and gets a 304 when the plan is unchanged.
+const PLAN_IDS_KEY = 'trip-plan-ids';
+
+const requestKey = (data: TripRequest): string =>
+    JSON.stringify([
+        data.destination.trim().toLowerCase(),
+        data.start_location.trim().toLowerCase(),
+        data.days,
+        data.budget.trim().toLowerCase(),
+        data.style.trim().toLowerCase(),
+    ]);
+
+const loadPlanIds = (): Record<string, string> => {
+    try {
+        return JSON.parse(localStorage.getItem(PLAN_IDS_KEY) ?? '{}');
+    } catch {
+        return {};
+    }
+};
+
+const savePlanIds = (ids: Record<string, string>) => {
+    try {
+        localStorage.setItem(PLAN_IDS_KEY, JSON.stringify(ids));
+    } catch {
+        // Storage full or unavailable: plans are just not reused.
+    }
+};
+
+export const rememberPlan = (data: TripRequest, planId?: string | null) => {
+    if (planId) savePlanIds({ ...loadPlanIds(), [requestKey(data)]: planId });
+};
+
+const forgetPlan = (data: TripRequest) => {
+    const ids = loadPlanIds();
+    delete ids[requestKey(data)];
+    savePlanIds(ids);
+};
+
+export const getPlan = async (planId: string): Promise<TripResponse> => {
+    const response = await axios.get<TripResponse>(`${API_Base}/plans/${encodeURIComponent(planId)}`);
     return response.data;
 };
+
+// The stored plan for this request, or null when there is none (anymore).
+export const cachedPlan = async (data: TripRequest): Promise<TripResponse | null> => {
+    const planId = loadPlanIds()[requestKey(data)];
+    if (!planId) return null;
+    try {
+        return await getPlan(planId);
+    } catch (error) {
+        if (axios.isAxiosError(error) && error.response?.status === 404) {
+            forgetPlan(data);
+            return null;
+        }
+        throw error;
+    }
+};
+
+// Passing the previous response's session_id only reruns the sections
+// affected by the changed fields.
+export const planTrip = async (data: TripRequest, sessionId?: string): Promise<TripResponse> => {
+    const cached = await cachedPlan(data);
+    if (cached) return cached;
+    const response = await axios.post<TripResponse>(`${API_Base}/plan-trip`, data, {
+        params: sessionId ? { session_id: sessionId } : undefined,
+    });
+    rememberPlan(data, response.data.plan_id);
+    return response.data;
+};
+
+// Reruns only the sections a failed run did not finish.
+export const resumeRun = async (data: TripRequest, runId: string): Promise<TripResponse> => {
+    const response = await axios.post<TripResponse>(`${API_Base}/runs/${encodeURIComponent(runId)}/resume`);
+    rememberPlan(data, response.data.plan_id);
+    return response.data;
+};
+
+export type PlanEvent =
+    | {
+        event: 'section';
+        name: string;
+        agent: string;
+        content: string;
+        data?: Record<string, unknown> | null;
+        started: number;
+        seconds: number;
+        cache?: string | null;
+        reused?: boolean;
+    }
+    | { event: 'token'; name: string; chunk: string }
+    | ({ event: 'done' } & Omit<TripResponse, 'result'>)
+    | { event: 'error'; detail: string; run_id?: string };
+
+// Reads the NDJSON stream and hands each event to `onEvent` as it arrives.
+export const planTripStream = async (
+    data: TripRequest,
+    onEvent: (event: PlanEvent) => void,
+    options: { tokens?: boolean; sessionId?: string; signal?: AbortSignal } = {},
+): Promise<void> => {
+    const params = new URLSearchParams();
+    if (options.tokens) params.set('tokens', 'true');
+    if (options.sessionId) params.set('session_id', options.sessionId);
+    const query = params.toString() ? `?${params}` : '';
+    const response = await fetch(`${API_Base}/plan-trip/stream${query}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(data),
+        signal: options.signal,
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Plan stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
+        for (const line of lines) {
+            if (line.trim()) onEvent(JSON.parse(line));
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+};
@@ -1,14 +1,15 @@
 import React from 'react';
 import ReactMarkdown from 'react-markdown';
 import { motion } from 'framer-motion';
-import { ArrowLeft, Bot, CheckCircle } from 'lucide-react';
+import { ArrowLeft, Bot, CheckCircle, Loader2 } from 'lucide-react';
 
 interface TripResultProps {
     result: Array<{ agent: string; content: string }>;
+    isComplete?: boolean;
     onReset: () => void;
 }
 
-export const TripResult: React.FC<TripResultProps> = ({ result, onReset }) => {
+export const TripResult: React.FC<TripResultProps> = ({ result, isComplete = true, onReset }) => {
     return (
         <div className="max-w-5xl mx-auto p-6 pb-20">
             <motion.button
@@ -49,13 +50,20 @@ export const TripResult: React.FC<TripResultProps> = ({ result, onReset }) => {
             <motion.div
                 initial={{ opacity: 0 }}
                 animate={{ opacity: 1 }}
-                transition={{ delay: result.length * 0.2 }}
+                transition={{ delay: isComplete ? result.length * 0.2 : 0 }}
                 className="mt-12 text-center"
             >
-                <div className="inline-flex items-center gap-2 px-6 py-3 bg-emerald-500/10 text-emerald-400 rounded-full border border-emerald-500/20">
-                    <CheckCircle size={20} />
-                    <span className="font-semibold">Itinerary Complete</span>
-                </div>
+                {isComplete ? (
+                    <div className="inline-flex items-center gap-2 px-6 py-3 bg-emerald-500/10 text-emerald-400 rounded-full border border-emerald-500/20">
+                        <CheckCircle size={20} />
+                        <span className="font-semibold">Itinerary Complete</span>
+                    </div>
+                ) : (
+                    <div className="inline-flex items-center gap-2 px-6 py-3 bg-sky-500/10 text-sky-400 rounded-full border border-sky-500/20">
+                        <Loader2 size={20} className="animate-spin" />
+                        <span className="font-semibold">Agents are still working...</span>
+                    </div>
+                )}
             </motion.div>
         </div>
     );
@@ -1,8 +1,5 @@
 import streamlit as st
-import time
 from dotenv import load_dotenv
-from litellm.exceptions import RateLimitError
-from crewai import Crew, LLM
 
 # ---------------- LOAD ENV ----------------
 load_dotenv()
@@ -16,23 +13,39 @@ st.set_page_config(
 st.title("🌍 AI Trip Planner using CrewAI")
 st.write("Plan a complete trip using a team of AI agents.")
 
-# ---------------- SAFE CREW RUNNER ----------------
-def run_crew_safely(crew, retries=2, wait=20):
-    last_error = None
-    for attempt in range(retries + 1):
-        try:
-            result = crew.kickoff()
-            if result and hasattr(result, "tasks_output"):
-                return result
-            raise ValueError("Empty LLM response")
-        except (ValueError, RateLimitError) as e:
-            last_error = e
-            if attempt < retries:
-                st.warning(f"⚠️ LLM issue. Retrying in {wait}s...")
-                time.sleep(wait)
-            else:
-                break
-    return f"❌ Trip plan could not be generated.\n\nError: {last_error}"
+# ---------------- SAFE TASK RUNNER ----------------
+# Tasks run one by one, each seeing every earlier output like the old
+# sequential crew. A rate-limited task backs off per provider and is retried
+# on its own instead of rerunning the whole crew. Finished tasks are
+# checkpointed, so pressing the button again after a failure with the same
+# inputs only runs what is missing. Long itineraries are planned a few days
+# at a time (``splits``), so they are not cut off by the model's max_tokens.
+def run_tasks_safely(tasks, run_id, splits=None):
+    names = list(tasks)
+    nodes = [
+        TaskNode(name=name, task=tasks[name], depends_on=tuple(names[:i]), split=(splits or {}).get(name))
+        for i, name in enumerate(names)
+    ]
+
+    store = get_checkpoints()
+    saved = store.load(run_id)
+    if saved is None or saved["status"] == DONE:
+        store.create(run_id, {})
+        saved = None
+
+    try:
+        results = run_dag(
+            nodes,
+            execute=ChunkedItinerary().wrap(get_limiter().wrap(execute_task)),
+            max_workers=1,
+            on_complete=lambda result: store.save_output(run_id, result),
+            done=saved["outputs"] if saved else None,
+        )
+    except Exception as e:
+        store.finish(run_id, FAILED, str(e))
+        return f"❌ Trip plan could not be generated.\n\nError: {e}"
+    store.finish(run_id, DONE)
+    return results
 
 # ---------------- CLEAN RAW OUTPUT ----------------
 def extract_final_answer(raw: str) -> str:
@@ -48,19 +61,12 @@ def extract_final_answer(raw: str) -> str:
 
 # ---------------- FORMAT OUTPUT ----------------
 def format_full_trip_output(result):
-    if not hasattr(result, "tasks_output"):
-        return str(result)
+    if isinstance(result, str):
+        return result
 
     sections = []
-    for task in result.tasks_output:
-        content = None
-
-        if task.pydantic:
-            content = str(task.pydantic)
-        elif task.json_dict:
-            content = str(task.json_dict)
-        elif task.raw:
-            content = extract_final_answer(task.raw)
+    for task in result:
+        content = extract_final_answer(task.content) if task.content else None
 
         if content:
             sections.append(
@@ -97,29 +103,59 @@ travel_style = st.selectbox(
     ["Relaxed", "Balanced", "Adventure"]
 )
 
-# ---------------- LLM CONFIG ----------------
-llm = LLM(
-    model="ollama/llama3",
-    provider="litellm",
-    temperature=0.2,
-    max_tokens=600,
-)
+# ---------------- IMPORTS ----------------
+# Agents and tasks pull in crewai and crewai_tools, which take seconds to
+# import; they are loaded on the first button press so the page renders at once.
+from core.checkpoints import DONE, FAILED, MemoryCheckpointStore
+from core.dag import TaskNode, execute_task, run_dag
+from core.itinerary import ChunkedItinerary, DayWindows
+from core.ratelimit import ProviderLimiter
+from core.registry import OLLAMA_KEEP_ALIVE, AgentRegistry, import_object
+from core.singleflight import request_key
+
+# ---------------- AGENT REGISTRY ----------------
+# Built once per server process instead of on every button press.
+@st.cache_resource
+def get_registry():
+    registry = AgentRegistry(
+        {
+            "destination": "agents.destination_agent:create_destination_agent",
+            "attractions": "agents.attraction_agent:create_attraction_agent",
+            "budget": "agents.budget_agent:create_budget_agent",
+            "tips": "agents.travels_trips_agent:create_travel_tips_agent",
+            "itinerary": "agents.itinerary_agent:create_itinerary_agent",
+            "summary": "agents.summary_agent:create_summary_agent",
+        },
+        {
+            "destination": "llama",
+            "attractions": "llama",
+            "budget": "llama",
+            "tips": "llama",
+            "itinerary": "llama",
+            "summary": "llama",
+        },
+        llm_configs={
+            "llama": {
+                "model": "ollama/llama3",
+                "provider": "litellm",
+                "temperature": 0.2,
+                "max_tokens": 600,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+            },
+        },
+    )
+    registry.load()
+    registry.warm_up()
+    return registry
+
+# Shared by every Streamlit session so they stay under provider quotas together.
+@st.cache_resource
+def get_limiter():
+    return ProviderLimiter()
 
-# ---------------- IMPORT AGENTS ----------------
-from agents.destination_agent import create_destination_agent
-from agents.attraction_agent import create_attraction_agent
-from agents.budget_agent import create_budget_agent
-from agents.travels_trips_agent import create_travel_tips_agent
-from agents.itinerary_agent import create_itinerary_agent
-from agents.summary_agent import create_summary_agent
-
-# ---------------- IMPORT TASKS ----------------
-from task.destination_task import create_destination_task
-from task.attraction_task import create_attraction_task
-from task.budget_task import create_budget_task
-from task.travels_tips_task import create_travel_tips_task
-from task.itinerary_ask import create_itinerary_task
-from task.summary_task import create_summary_task
+@st.cache_resource
+def get_checkpoints():
+    return MemoryCheckpointStore()
 
 # ---------------- RUN BUTTON ----------------
 if st.button("🚀 Plan My Trip"):
@@ -129,14 +165,23 @@ if st.button("🚀 Plan My Trip"):
         st.stop()
 
     # -------- AGENTS --------
-    destination_agent = create_destination_agent(llm)
-    attraction_agent = create_attraction_agent(llm)
-    budget_agent = create_budget_agent(llm)
-    tips_agent = create_travel_tips_agent(llm)
-    itinerary_agent = create_itinerary_agent(llm)
-    summary_agent = create_summary_agent(llm)
+    agents = get_registry().agents()
+    destination_agent = agents["destination"]
+    attraction_agent = agents["attractions"]
+    budget_agent = agents["budget"]
+    tips_agent = agents["tips"]
+    itinerary_agent = agents["itinerary"]
+    summary_agent = agents["summary"]
 
     # -------- TASKS --------
+    create_destination_task = import_object("task.destination_task:create_destination_task")
+    create_attraction_task = import_object("task.attraction_task:create_attraction_task")
+    create_budget_task = import_object("task.budget_task:create_budget_task")
+    create_travel_tips_task = import_object("task.travels_tips_task:create_travel_tips_task")
+    create_itinerary_task = import_object("task.itinerary_ask:create_itinerary_task")
+    create_itinerary_window_task = import_object("task.itinerary_ask:create_itinerary_window_task")
+    create_summary_task = import_object("task.summary_task:create_summary_task")
+
     user_preferences = f"""
     Destination: {destination_pref}
     Starting location: {user_location}
@@ -157,35 +202,37 @@ if st.button("🚀 Plan My Trip"):
     task5 = create_itinerary_task(
         itinerary_agent,
         destination_pref,
-        days
+        days,
+        travel_style
     )
     task6 = create_summary_task(summary_agent, destination_pref)
 
-    # -------- CREW --------
-    crew = Crew(
-        agents=[
-            destination_agent,
-            attraction_agent,
-            budget_agent,
-            tips_agent,
-            itinerary_agent,
-            summary_agent
-        ],
-        tasks=[
-            task1,
-            task2,
-            task3,
-            task4,
-            task5,
-            task6
-        ],
-        process="sequential",
-        verbose=False
-    )
-
     # -------- EXECUTION --------
     with st.spinner("🧠 AI agents are planning your trip..."):
-        result = run_crew_safely(crew)
+        run_id = request_key({
+            "destination": destination_pref,
+            "start_location": user_location,
+            "days": days,
+            "budget": budget_range,
+            "style": travel_style,
+        })
+        result = run_tasks_safely({
+            "destination": task1,
+            "attractions": task2,
+            "budget": task3,
+            "tips": task4,
+            "itinerary": task5,
+            "summary": task6,
+        }, run_id, splits={
+            "itinerary": DayWindows(
+                days=days,
+                size=3,
+                build=lambda agent, first, last, attractions, avoid, repeated, retry: create_itinerary_window_task(
+                    agent, destination_pref, days, travel_style, first, last, attractions, avoid, repeated, retry
+                ),
+                agent=lambda: get_registry().agent("itinerary"),
+            ),
+        })
 
     # -------- OUTPUT --------
     st.success("✅ Trip plan generated!")